@@ -1,15 +1,67 @@
 #!/usr/bin/env python3
 """
 Web API runner for Grade Prediction System
+
+    python run_api.py                              development server
+    python run_api.py --production --workers 4     multi-process server
 """
 
+import argparse
 import os
 import sys
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
-from web_api import start_api
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Grade Prediction web API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--model-version", default=None, help="Model version to serve (default: newest)")
+    parser.add_argument("--production", action="store_true", help="Pre-fork multi-worker server")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--timeout", type=int, default=60,
+                        help="Seconds a request may run before its worker is killed and replaced "
+                             "(--production only, 0 = no limit)")
+    parser.add_argument("--socket-timeout", type=int, default=30,
+                        help="Seconds a connection may sit idle on a socket read or write")
+    parser.add_argument("--graceful-timeout", type=int, default=30,
+                        help="Seconds in-flight requests get to finish on shutdown")
+    parser.add_argument("--micro-batch", action="store_true",
+                        help="Group concurrent /predict calls into vectorized batches")
+    parser.add_argument("--max-batch-size", type=int, default=32, help="Micro-batch size limit")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="Longest wait for a micro-batch to fill")
+    parser.add_argument("--tenants-dir", default=None, help="Per-tenant model directories (default: ./tenants)")
+    parser.add_argument("--max-tenant-models", type=int, default=8, help="Tenant models kept loaded")
+    parser.add_argument("--max-tenant-memory-mb", type=float, default=None,
+                        help="Approximate memory budget for loaded tenant models")
+    parser.add_argument("--lookup", action="store_true",
+                        help="Serve on-grid inputs from prediction_lookup.npy (build it with run_cli.py lookup)")
+    parser.add_argument("--metrics", action="store_true", help="Record stage timings for /metrics")
+    parser.add_argument("--profiling", action="store_true", help="Enable the /debug/profile sampling profiler")
+    return parser.parse_args()
+
 
 if __name__ == "__main__":
-    start_api()
\ No newline at end of file
+    args = parse_args()
+    if args.metrics:
+        os.environ['GRADE_METRICS'] = '1'
+    if args.profiling:
+        os.environ['GRADE_PROFILING'] = '1'
+    app_options = {
+        'micro_batching': args.micro_batch,
+        'max_batch_size': args.max_batch_size,
+        'max_wait_ms': args.max_wait_ms,
+        'tenants_dir': args.tenants_dir,
+        'max_tenant_models': args.max_tenant_models,
+        'max_tenant_memory_mb': args.max_tenant_memory_mb,
+        'use_lookup': args.lookup
+    }
+    if args.production:
+        from production_server import serve
+        serve(args.host, args.port, args.workers, args.socket_timeout, args.graceful_timeout, args.model_version,
+              request_timeout=args.timeout, **app_options)
+    else:
+        from web_api import start_api
+        start_api(args.host, args.port, args.model_version, **app_options)
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+Benchmark runner for Grade Prediction System
+
+    python run_benchmark.py --output results.json
+    python run_benchmark.py --compare baseline.json
+"""
+
+import os
+import sys
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from benchmark import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,15 @@
 #!/usr/bin/env python3
 """
 Command-line interface runner for Grade Prediction System
+
+    python run_cli.py                          interactive predictions
+    python run_cli.py score in.csv out.csv     bulk scoring
+    python run_cli.py update new_grades.csv    incremental model update
+    python run_cli.py compile                  fast-loading single-file model artifact
+    python run_cli.py startup                  import / model load timing report
+    python run_cli.py lookup                   precomputed prediction lookup tensor
+    python run_cli.py evaluate                 recompute test / CV metrics and check the metadata
+    python run_cli.py reference                drift monitor reference profile
 """
 
 import os
@@ -9,7 +18,7 @@ import sys
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
-from cli_interface import interactive_predictor
+from cli_interface import main
 
 if __name__ == "__main__":
-    interactive_predictor()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
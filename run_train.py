@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+Training runner for Grade Prediction System
+
+    python run_train.py                                 synthetic data -> ML/versions/<timestamp>
+    python run_train.py --data-dir data --version v2    train on CSVs as version v2
+"""
+
+import os
+import sys
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from training_pipeline import main
+
+if __name__ == "__main__":
+    sys.exit(main())
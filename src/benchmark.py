@@ -0,0 +1,228 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src.predictor import GradePredictor, DEFAULT_MODELS_DIR
+from src.synthetic_data import prediction_records, DEFAULT_SEED
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+DEFAULT_TOLERANCE = 0.25
+
+
+def _percentiles_ms(samples):
+    samples = np.asarray(samples) * 1000.0
+    return {
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p95_ms': float(np.percentile(samples, 95)),
+        'p99_ms': float(np.percentile(samples, 99)),
+        'mean_ms': float(samples.mean())
+    }
+
+
+def _single_row_inputs(records, i):
+    row = records.iloc[i % len(records)]
+    student = {key: row[key] for key in ['cgpa', 'attendance', 'previous_avg', 'branch_code']}
+    course = {key: row[key] for key in ['difficulty_level', 'credits', 'theory_weight', 'domain_tags']}
+    interests = [domain for domain in row['interests'].split(',') if domain]
+    return student, course, interests
+
+
+def bench_model_load(models_dir, repeats):
+    """Seconds to construct a GradePredictor (artifacts read, engine compiled)"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        GradePredictor(models_dir)
+        timings.append(time.perf_counter() - start)
+    return {'median_seconds': float(np.median(timings)), 'min_seconds': float(np.min(timings))}
+
+
+def bench_single_row(predictor, records, iterations):
+    """predict_grade latency with the cache disabled"""
+    inputs = [_single_row_inputs(records, i) for i in range(iterations)]
+    for student, course, interests in inputs[:20]:
+        predictor.predict_grade(student, course, interests)
+
+    samples = []
+    for student, course, interests in inputs:
+        start = time.perf_counter()
+        predictor.predict_grade(student, course, interests)
+        samples.append(time.perf_counter() - start)
+    return _percentiles_ms(samples)
+
+
+def bench_batch(predictor, records, batch_sizes, min_rows):
+    """predict_batch throughput at several batch sizes"""
+    results = {}
+    for batch_size in batch_sizes:
+        batch = records.iloc[:batch_size]
+        n_calls = max(3, min_rows // batch_size)
+        predictor.predict_batch(batch)
+
+        start = time.perf_counter()
+        for _ in range(n_calls):
+            predictor.predict_batch(batch)
+        elapsed = time.perf_counter() - start
+        results[str(batch_size)] = {
+            'rows_per_sec': batch_size * n_calls / elapsed,
+            'ms_per_call': elapsed / n_calls * 1000.0
+        }
+    return results
+
+
+def bench_http(records, iterations, batch_size):
+    """End-to-end /predict and /predict/batch through the Flask test client"""
+    import src.web_api as web_api
+
+    web_api.init_app()
+    client = web_api.app.test_client()
+    payloads = []
+    for i in range(iterations):
+        student, course, interests = _single_row_inputs(records, i)
+        payloads.append({
+            'student': {key: _plain(value) for key, value in student.items()},
+            'course': {key: _plain(value) for key, value in course.items()},
+            'interests': interests
+        })
+
+    samples = []
+    start = time.perf_counter()
+    for payload in payloads:
+        request_start = time.perf_counter()
+        response = client.post('/predict', json=payload)
+        samples.append(time.perf_counter() - request_start)
+        if response.status_code != 200:
+            raise RuntimeError(f"/predict failed: {response.get_json()}")
+    elapsed = time.perf_counter() - start
+
+    body = "\n".join(json.dumps(payloads[i % len(payloads)]) for i in range(batch_size)) + "\n"
+    batch_start = time.perf_counter()
+    response = client.post('/predict/batch', data=body, content_type='application/x-ndjson')
+    n_lines = len(response.get_data().splitlines())
+    batch_elapsed = time.perf_counter() - batch_start
+
+    return {
+        'predict': dict(_percentiles_ms(samples), requests_per_sec=iterations / elapsed),
+        'predict_batch': {'rows_per_sec': n_lines / batch_elapsed, 'rows': n_lines}
+    }
+
+
+def _plain(value):
+    """NumPy scalars to plain Python for JSON payloads"""
+    return value.item() if hasattr(value, 'item') else value
+
+
+def run_benchmarks(models_dir=DEFAULT_MODELS_DIR, quick=False, seed=DEFAULT_SEED, include_http=True):
+    """Run every benchmark and return a JSON-serializable result dict"""
+    iterations = 300 if quick else 3000
+    records = prediction_records(max(BATCH_SIZES), seed=seed)
+
+    results = {
+        'environment': _environment(),
+        'settings': {'quick': quick, 'seed': seed, 'models_dir': models_dir},
+        'model_load': bench_model_load(models_dir, 1 if quick else 3)
+    }
+
+    predictor = GradePredictor(models_dir, cache_size=0)
+    results['single_row'] = bench_single_row(predictor, records, iterations)
+    results['batch'] = bench_batch(predictor, records, BATCH_SIZES, 20000 if quick else 200000)
+    if include_http:
+        results['http'] = bench_http(records, iterations, 1000 if quick else 10000)
+    return results
+
+
+def _environment():
+    import sklearn
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+
+def flatten_metrics(results, prefix=''):
+    """Numeric leaves as {'batch.100.rows_per_sec': value, ...}"""
+    metrics = {}
+    for key, value in results.items():
+        if key in ('environment', 'settings'):
+            continue
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            metrics.update(flatten_metrics(value, name + '.'))
+        elif isinstance(value, (int, float)):
+            metrics[name] = float(value)
+    return metrics
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Metrics that got worse than the baseline by more than tolerance (fraction)
+
+    Throughput metrics (*_per_sec) must not drop, time metrics (*_ms,
+    *_seconds) must not rise.
+    """
+    regressions = []
+    current_metrics = flatten_metrics(current)
+    for name, base_value in flatten_metrics(baseline).items():
+        if name not in current_metrics or base_value <= 0:
+            continue
+        value = current_metrics[name]
+        if name.endswith('_per_sec'):
+            change = (base_value - value) / base_value
+        elif name.endswith('_ms') or name.endswith('_seconds'):
+            change = (value - base_value) / base_value
+        else:
+            continue
+        if change > tolerance:
+            regressions.append({'metric': name, 'baseline': base_value, 'current': value, 'worse_by': change})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prediction and serving benchmarks")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON results")
+    parser.add_argument("--compare", default=None, help="Baseline JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative slowdown before a metric counts as a regression")
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations")
+    parser.add_argument("--no-http", action="store_true", help="Skip the Flask benchmarks")
+    parser.add_argument("--models-dir", default=DEFAULT_MODELS_DIR)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.models_dir, args.quick, args.seed, not args.no_http)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print("\n" + "⏱️ " * 20)
+    print("BENCHMARK RESULTS:")
+    print("⏱️ " * 20)
+    for name, value in flatten_metrics(results).items():
+        print(f"  {name:<40} {value:12.3f}")
+    print(f"\n📄 Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n🚨 {len(regressions)} regression(s) against {args.compare}:")
+            for regression in regressions:
+                print(f"  {regression['metric']}: {regression['baseline']:.3f} -> "
+                      f"{regression['current']:.3f} ({regression['worse_by']:+.0%})")
+            return 1
+        print(f"\n✅ No regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from src.predictor import GradePredictor, DEFAULT_MODELS_DIR
+
+DEFAULT_CHUNK_SIZE = 50000
+OUTPUT_COLUMN = 'predicted_grade'
+
+# Loaded once per worker process by _init_worker
+_worker_predictor = None
+
+
+def _init_worker(models_dir, data_dir):
+    """Process pool initializer: load the model (and feature store) once per worker"""
+    global _worker_predictor
+    feature_store = None
+    if data_dir:
+        from src.feature_store import FeatureStore
+        feature_store = FeatureStore.from_csv(data_dir)
+    _worker_predictor = GradePredictor(models_dir, cache_size=0, feature_store=feature_store,
+                                       monitor_drift=False)
+
+
+def _score_chunk(chunk):
+    """Predict one chunk; rows that cannot be scored get NaN instead of failing the chunk"""
+    try:
+        return _worker_predictor.predict_batch(chunk)
+    except Exception:
+        grades = np.full(len(chunk), np.nan)
+        for i, row in enumerate(chunk.to_dict('records')):
+            try:
+                grades[i] = _worker_predictor.predict_batch([_worker_predictor.validate_record(row)])[0]
+            except Exception:
+                pass
+        return grades
+
+
+def read_chunks(input_path, chunk_size):
+    """Yield DataFrames of at most chunk_size rows from a CSV or Parquet file"""
+    if input_path.endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading Parquet requires pyarrow (pip install pyarrow)")
+        for batch in pq.ParquetFile(input_path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(input_path, chunksize=chunk_size)
+
+
+class ChunkWriter:
+    """Append scored chunks to a CSV or Parquet file as they complete"""
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.parquet = output_path.endswith('.parquet')
+        self._parquet_writer = None
+        self._wrote_header = False
+
+    def write(self, chunk):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.output_path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            chunk.to_csv(self.output_path, mode='a' if self._wrote_header else 'w',
+                         header=not self._wrote_header, index=False)
+            self._wrote_header = True
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def score_file(input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE, workers=None,
+               models_dir=DEFAULT_MODELS_DIR, data_dir=None, progress=True):
+    """
+    Score every row of input_path and stream the results to output_path
+
+    The input is read chunk by chunk and the chunks are scored on a process
+    pool. At most 2 * workers chunks are in flight, and results are written
+    in input order, so memory stays flat and the output is deterministic.
+
+    Returns the number of rows scored.
+    """
+    workers = workers or os.cpu_count() or 1
+    writer = ChunkWriter(output_path)
+    start = time.perf_counter()
+    rows_done = 0
+
+    def finish(chunk, grades):
+        nonlocal rows_done
+        chunk = chunk.copy()
+        chunk[OUTPUT_COLUMN] = grades
+        writer.write(chunk)
+        rows_done += len(chunk)
+        if progress:
+            elapsed = time.perf_counter() - start
+            rate = rows_done / elapsed if elapsed > 0 else 0.0
+            print(f"\r📈 {rows_done:,} rows scored ({rate:,.0f} rows/sec)", end='', file=sys.stderr, flush=True)
+
+    try:
+        if workers == 1:
+            _init_worker(models_dir, data_dir)
+            for chunk in read_chunks(input_path, chunk_size):
+                finish(chunk, _score_chunk(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(models_dir, data_dir)) as pool:
+                pending = deque()
+                for chunk in read_chunks(input_path, chunk_size):
+                    pending.append((chunk, pool.submit(_score_chunk, chunk)))
+                    if len(pending) >= 2 * workers:
+                        chunk, future = pending.popleft()
+                        finish(chunk, future.result())
+                while pending:
+                    chunk, future = pending.popleft()
+                    finish(chunk, future.result())
+    finally:
+        writer.close()
+
+    if progress:
+        elapsed = time.perf_counter() - start
+        print(f"\n✅ Scored {rows_done:,} rows in {elapsed:.1f}s -> {output_path}", file=sys.stderr)
+    return rows_done
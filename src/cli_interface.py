@@ -1,8 +1,10 @@
+import argparse
 import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.predictor import GradePredictor
+from src.feature_store import DEFAULT_DATA_DIR
+from src.predictor import GradePredictor, DEFAULT_MODELS_DIR
 
 def interactive_predictor():
     """Interactive command-line interface for grade prediction"""
@@ -101,5 +103,195 @@ def interactive_predictor():
             print("\nThank you for using the Grade Prediction System! 👋")
             break
 
+def bulk_score(args):
+    """Non-interactive scoring of a CSV/Parquet file"""
+    from src.bulk_scoring import score_file, DEFAULT_CHUNK_SIZE
+    
+    score_file(
+        args.input,
+        args.output,
+        chunk_size=args.chunk_size or DEFAULT_CHUNK_SIZE,
+        workers=args.workers,
+        models_dir=args.models_dir,
+        data_dir=args.data_dir
+    )
+
+def compile_models(args):
+    """Write compiled_model.bin for the models root and every version under it"""
+    from src.model_artifact import compile_artifact
+    from src.model_registry import ModelRegistry
+    
+    registry = ModelRegistry(args.models_dir)
+    versions = registry.list_versions() if args.all_versions else [args.version or registry.latest_version()]
+    written = [compile_artifact(registry.version_path(version)) for version in versions]
+    return 0 if all(written) else 1
+
+def build_lookup_tensor(args):
+    """Precompute the prediction lookup tensor of a model version"""
+    import json
+    from src.model_registry import ModelRegistry
+    from src.prediction_lookup import build_lookup
+    
+    registry = ModelRegistry(args.models_dir)
+    grid = json.loads(args.grid) if args.grid else None
+    report = build_lookup(registry.version_path(args.version or registry.latest_version()), grid,
+                          args.sample_students, args.data_dir, args.models_dir)
+    if args.max_error is not None and report['max_abs_error'] > args.max_error:
+        print(f"❌ Max error {report['max_abs_error']:.4f} exceeds {args.max_error}")
+        return 1
+    return 0
+
+def write_drift_reference(args):
+    """Profile a model version's inputs and predictions for the drift monitor"""
+    from src.drift_monitor import reference_from_dataset
+    from src.model_registry import ModelRegistry
+    from src.training_pipeline import load_dataset
+    from src.synthetic_data import generate_dataset, DEFAULT_SEED
+    
+    registry = ModelRegistry(args.models_dir)
+    if os.path.isdir(args.data_dir):
+        dataset, source = load_dataset(args.data_dir), args.data_dir
+    else:
+        # Say so in the profile: synthetic rows are not the data the model was trained on
+        dataset = generate_dataset(args.students, args.courses)
+        source = (f"synthetic (src/synthetic_data.py, {args.students} students x {args.courses} courses, "
+                  f"seed {DEFAULT_SEED}; not the model's training data)")
+    reference_from_dataset(registry.version_path(args.version or registry.latest_version()), dataset, source)
+    return 0
+
+def main(argv=None):
+    """
+    Entry point: interactive mode by default, 'score' for bulk scoring, 'update' for
+    incremental training, 'compile' for fast-loading artifacts, 'startup' for a timing report,
+    'lookup' for the precomputed prediction tensor, 'evaluate' to recheck recorded metrics,
+    'reference' for the drift monitor's training profile
+    
+    Subcommand modules (pandas, sklearn) are only imported once their subcommand runs.
+    """
+    parser = argparse.ArgumentParser(description="Grade Prediction System")
+    subcommands = parser.add_subparsers(dest="command")
+    
+    score_parser = subcommands.add_parser(
+        "score",
+        help="Score a CSV/Parquet file of student-course rows",
+        description="Columns: cgpa, attendance, previous_avg, branch_code, difficulty_level, "
+                    "credits, theory_weight, domain_tags, interests (comma/semicolon separated). "
+                    "With --data-dir, student_id/course_id may replace the profile columns."
+    )
+    score_parser.add_argument("input", help="Input .csv or .parquet file")
+    score_parser.add_argument("output", help="Output .csv or .parquet file")
+    score_parser.add_argument("--chunk-size", type=int, default=None, help="Rows per chunk")
+    score_parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    score_parser.add_argument("--models-dir", default=DEFAULT_MODELS_DIR, help="Model artifact directory")
+    score_parser.add_argument("--data-dir", default=None, help="Feature store tables for ID-only rows")
+    
+    update_parser = subcommands.add_parser(
+        "update",
+        help="Add boosting stages fitted on new grade records",
+        description="Warm-starts the model on new grades (CSV: student_id, course_id, grade) and writes "
+                    "a new version under ML/versions only if the held-out test_ids metrics do not get worse."
+    )
+    update_parser.add_argument("new_grades", help="CSV of new grade records")
+    update_parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR,
+                               help="Students/courses/interests and the grades recorded so far")
+    update_parser.add_argument("--base-version", default=None, help="Version to update (default: newest)")
+    update_parser.add_argument("--version", default=None, help="Name of the new version (default: timestamp)")
+    update_parser.add_argument("--stages", type=int, default=None, help="Boosting stages to add")
+    update_parser.add_argument("--tolerance", type=float, default=None,
+                               help="Allowed metric slack before the update is rejected")
+    update_parser.add_argument("--models-dir", default=DEFAULT_MODELS_DIR, help="Model artifact directory")
+    
+    compile_parser = subcommands.add_parser(
+        "compile",
+        help="Write compiled_model.bin, a single-file model that loads without sklearn",
+        description="Packs the trees, scaler parameters and feature list of a model version into one "
+                    "memory-mappable file. GradePredictor uses it when it matches the pickles."
+    )
+    compile_parser.add_argument("--models-dir", default=DEFAULT_MODELS_DIR, help="Model artifact directory")
+    compile_parser.add_argument("--version", default=None, help="Version to compile (default: newest)")
+    compile_parser.add_argument("--all-versions", action="store_true", help="Compile every version")
+    
+    startup_parser = subcommands.add_parser(
+        "startup",
+        help="Report where import and model load time goes",
+        description="Times imports, model loading and the first prediction in fresh interpreters, "
+                    "with and without the compiled artifact."
+    )
+    startup_parser.add_argument("--models-dir", default=DEFAULT_MODELS_DIR, help="Model artifact directory")
+    startup_parser.add_argument("--api", action="store_true", help="Include importing the web API (Flask)")
+    
+    lookup_parser = subcommands.add_parser(
+        "lookup",
+        help="Precompute predictions on a grid of inputs (prediction_lookup.npy)",
+        description="Builds a dense, memory-mapped tensor of predictions over a grid of the inputs and "
+                    "reports its interpolation error on the model's train pairs (with --data-dir) or on "
+                    "synthetic rows. Enable it for serving "
+                    "with run_api.py --lookup."
+    )
+    lookup_parser.add_argument("--models-dir", default=DEFAULT_MODELS_DIR, help="Model artifact directory")
+    lookup_parser.add_argument("--version", default=None, help="Version to build for (default: newest)")
+    lookup_parser.add_argument("--grid", default=None,
+                               help='JSON overrides of the grid, e.g. \'{"cgpa": {"min": 5, "max": 10, "step": 0.25}}\'')
+    lookup_parser.add_argument("--sample-students", type=int, default=2000,
+                               help="Synthetic students used for the error report without --data-dir")
+    lookup_parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR,
+                               help="Feature store CSVs; the error is measured on the model's train pairs")
+    lookup_parser.add_argument("--max-error", type=float, default=None,
+                               help="Fail when the max error on the sample rows is above this")
+    
+    evaluate_parser = subcommands.add_parser(
+        "evaluate",
+        help="Recompute a model's test and CV metrics and check them against its metadata",
+        description="Scores the held-out test_ids with per-domain, per-branch and per-difficulty breakdowns, "
+                    "runs k-fold CV on a process pool and exits with 1 when a metric differs from "
+                    "improved_model_metadata.json by more than the tolerance. id_mappings.json is converted "
+                    "to id_mappings.npz on first use."
+    )
+    evaluate_parser.add_argument("--models-dir", default=DEFAULT_MODELS_DIR, help="Model artifact directory")
+    evaluate_parser.add_argument("--version", default=None, help="Version to evaluate (default: newest)")
+    evaluate_parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR,
+                                 help="Students/courses/interests/grades CSVs (synthetic models regenerate theirs)")
+    evaluate_parser.add_argument("--students", type=int, default=1000, help="Synthetic students")
+    evaluate_parser.add_argument("--courses", type=int, default=30, help="Synthetic courses")
+    evaluate_parser.add_argument("--folds", type=int, default=None, help="CV folds, 0 to skip (default: 5)")
+    evaluate_parser.add_argument("--workers", type=int, default=None, help="CV processes (default: CPU count)")
+    evaluate_parser.add_argument("--tolerance", type=float, default=None,
+                                 help="Allowed absolute metric difference (default: 0.01)")
+    evaluate_parser.add_argument("--output", default=None, help="Write the full results as JSON")
+    
+    reference_parser = subcommands.add_parser(
+        "reference",
+        help="Write the drift reference profile (drift_reference.json) of a model version",
+        description="Training writes it automatically; this builds it for models trained elsewhere from "
+                    "the feature store CSVs, or from synthetic data when --data-dir does not exist."
+    )
+    reference_parser.add_argument("--models-dir", default=DEFAULT_MODELS_DIR, help="Model artifact directory")
+    reference_parser.add_argument("--version", default=None, help="Version to profile (default: newest)")
+    reference_parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR,
+                                  help="Students/courses/interests/grades CSVs")
+    reference_parser.add_argument("--students", type=int, default=1000, help="Synthetic students")
+    reference_parser.add_argument("--courses", type=int, default=30, help="Synthetic courses")
+    
+    args = parser.parse_args(argv)
+    if args.command == "score":
+        bulk_score(args)
+    elif args.command == "update":
+        from src.incremental_update import run_update
+        return run_update(args)
+    elif args.command == "compile":
+        return compile_models(args)
+    elif args.command == "lookup":
+        return build_lookup_tensor(args)
+    elif args.command == "reference":
+        return write_drift_reference(args)
+    elif args.command == "evaluate":
+        from src.evaluation import run_evaluation
+        return run_evaluation(args)
+    elif args.command == "startup":
+        from src.startup_report import print_report
+        print_report(args.models_dir, include_api=args.api)
+    else:
+        interactive_predictor()
+
 if __name__ == "__main__":
-    interactive_predictor()
\ No newline at end of file
+    main()
\ No newline at end of file
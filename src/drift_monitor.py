@@ -0,0 +1,499 @@
+import json
+import os
+import sys
+import threading
+import time
+import weakref
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src.feature_plan import AGGREGATE_DEFAULTS, parse_interests
+
+# Reference profile written next to the model at training time
+DRIFT_REFERENCE = "drift_reference.json"
+FORMAT_VERSION = 1
+PREDICTION_COLUMN = 'predicted_grade'
+# Features only a feature store fills in; without a store they are the constant defaults
+STORE_COLUMNS = list(AGGREGATE_DEFAULTS)
+# Raw categorical inputs watched for unseen values (a new branch, a new domain)
+CATEGORICAL_INPUTS = ['branch_code', 'domain_tags']
+# Quantile bins per numeric column; columns with at most this many distinct values get one bin per value
+REFERENCE_BINS = 10
+MAX_DISCRETE_VALUES = 10
+# Distinct values counted per categorical input, later ones share one bucket
+MAX_CATEGORIES = 32
+OTHER_CATEGORY = '__other__'
+# Population stability index thresholds (the usual 0.1 / 0.25 rule of thumb)
+PSI_WARNING = 0.1
+PSI_DRIFT = 0.25
+# Smallest window compared on its own; smaller windows report the cumulative sketch only
+MIN_WINDOW_ROWS = 200
+DEFAULT_CHECK_INTERVAL = 60.0
+PSI_EPSILON = 1e-4
+
+
+def _column_bins(values):
+    """Bin edges [low, inner..., high] and per-value kind of one reference column"""
+    distinct = np.unique(values)
+    if len(distinct) <= MAX_DISCRETE_VALUES:
+        # One bin per value, split halfway between neighbours
+        return 'discrete', np.concatenate([distinct[:1], (distinct[1:] + distinct[:-1]) / 2, distinct[-1:]])
+    edges = np.unique(np.quantile(values, np.linspace(0, 1, REFERENCE_BINS + 1)))
+    return 'numeric', edges
+
+
+def _bin_codes(matrix, inner, low, high, n_bins):
+    """
+    Bin of every value: 0 below the reference range, n_bins - 1 above it
+
+    inner: (n_columns, max_inner) inner edges padded with +inf
+    """
+    codes = 1 + (matrix[:, :, None] >= inner[None]).sum(axis=2)
+    codes[matrix < low] = 0
+    above = matrix > high
+    codes[above] = np.broadcast_to(n_bins - 1, matrix.shape)[above]
+    return codes
+
+
+def _profile(values):
+    """Bins, per-bin fractions, mean and std of one reference column"""
+    kind, edges = _column_bins(values)
+    inner = np.full((1, max(len(edges) - 2, 1)), np.inf)
+    inner[0, :len(edges) - 2] = edges[1:-1]
+    n_bins = len(edges) + 1
+    codes = _bin_codes(values[:, None], inner, edges[:1], edges[-1:], np.array([n_bins]))[:, 0]
+    return {
+        'kind': kind,
+        'edges': edges.tolist(),
+        'fractions': (np.bincount(codes, minlength=n_bins) / len(values)).tolist(),
+        'mean': float(values.mean()),
+        'std': float(values.std())
+    }
+
+
+def storeless_matrix(X, features):
+    """Copy of a feature matrix with the STORE_COLUMNS set to what serving uses without a feature store"""
+    X = np.array(X, dtype=np.float64)
+    for j, name in enumerate(features):
+        if name in AGGREGATE_DEFAULTS:
+            X[:, j] = AGGREGATE_DEFAULTS[name]
+    return X
+
+
+def build_reference(X, predictions, features, branch_codes=None, domain_tags=None, source=None,
+                    storeless_predictions=None):
+    """
+    Reference profile of the training inputs and predictions
+
+    Every selected feature and the predicted grade get bin edges (quantile
+    bins, or one bin per value for discrete columns), the fraction of rows
+    per bin, mean and std. Raw branch / domain values get their frequencies.
+    STORE_COLUMNS are flagged requires_store. storeless_predictions (the
+    model's output on storeless_matrix(X)) profile the predicted grade of a
+    server running without a feature store.
+    """
+    matrix = np.column_stack([np.asarray(X, dtype=np.float64), np.asarray(predictions, dtype=np.float64)])
+    columns = {}
+    for j, name in enumerate(list(features) + [PREDICTION_COLUMN]):
+        columns[name] = dict(_profile(matrix[:, j]), requires_store=name in STORE_COLUMNS)
+
+    categories = {}
+    for name, labels in (('branch_code', branch_codes), ('domain_tags', domain_tags)):
+        if labels is not None:
+            values, counts = np.unique(np.asarray(labels).astype(str), return_counts=True)
+            categories[name] = {str(value): float(count / len(labels)) for value, count in zip(values, counts)}
+
+    return {
+        'format_version': FORMAT_VERSION,
+        'rows': int(len(matrix)),
+        'source': source,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'columns': columns,
+        'storeless': ({PREDICTION_COLUMN: _profile(np.asarray(storeless_predictions, dtype=np.float64))}
+                      if storeless_predictions is not None else {}),
+        'categories': categories
+    }
+
+
+def save_reference(models_dir, reference):
+    path = os.path.join(models_dir, DRIFT_REFERENCE)
+    with open(path, 'w') as f:
+        json.dump(reference, f)
+    return path
+
+
+def load_reference(models_dir):
+    """Reference profile of a model directory, or None"""
+    path = os.path.join(models_dir, DRIFT_REFERENCE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        reference = json.load(f)
+    if reference.get('format_version') != FORMAT_VERSION:
+        return None
+    return reference
+
+
+def _psi(expected, actual):
+    """Population stability index between two fraction vectors"""
+    expected = np.maximum(np.asarray(expected, dtype=np.float64), PSI_EPSILON)
+    actual = np.maximum(np.asarray(actual, dtype=np.float64), PSI_EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def _status(psi):
+    return 'drift' if psi >= PSI_DRIFT else 'warning' if psi >= PSI_WARNING else 'ok'
+
+
+class StreamSketch:
+    """
+    Fixed-size running summary of a stream of feature rows
+
+    Per column: counts over the reference bins (plus one bin below and one
+    above the reference range), Welford mean / M2 and min / max. Per raw
+    categorical input: counts of at most MAX_CATEGORIES values. Memory does
+    not depend on how many rows were added.
+    """
+
+    def __init__(self, n_columns, n_bins_max):
+        self.n = 0
+        self.counts = np.zeros((n_columns, n_bins_max), dtype=np.int64)
+        self._column_index = np.arange(n_columns)
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+        self.min = np.full(n_columns, np.inf)
+        self.max = np.full(n_columns, -np.inf)
+        self.categories = {name: {} for name in CATEGORICAL_INPUTS}
+
+    def add_row(self, values, codes, labels):
+        """Fold one row in (its values, their bin codes, {input: label}) in constant time"""
+        self.n += 1
+        self.counts[self._column_index, codes] += 1
+        delta = values - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (values - self.mean)
+        np.minimum(self.min, values, out=self.min)
+        np.maximum(self.max, values, out=self.max)
+        for name, value in labels.items():
+            counts = self.categories[name]
+            if value not in counts and len(counts) >= MAX_CATEGORIES:
+                value = OTHER_CATEGORY
+            counts[value] = counts.get(value, 0) + 1
+
+    def add(self, matrix, codes, categorical):
+        """Fold a block of rows in (matrix and its bin codes, {input: labels})"""
+        n = len(matrix)
+        if n == 0:
+            return
+        n_columns = matrix.shape[1]
+        flat = codes + np.arange(n_columns) * self.counts.shape[1]
+        self.counts += np.bincount(flat.ravel(), minlength=self.counts.size).reshape(self.counts.shape)
+
+        # Chan et al. merge of the block's mean / M2 into the running ones
+        block_mean = matrix.mean(axis=0)
+        block_m2 = ((matrix - block_mean) ** 2).sum(axis=0)
+        total = self.n + n
+        delta = block_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += block_m2 + delta ** 2 * self.n * n / total
+        self.n = total
+        np.minimum(self.min, matrix.min(axis=0), out=self.min)
+        np.maximum(self.max, matrix.max(axis=0), out=self.max)
+
+        for name, labels in categorical.items():
+            counts = self.categories[name]
+            values, value_counts = np.unique(np.asarray(labels).astype(str), return_counts=True)
+            for value, count in zip(values.tolist(), value_counts):
+                if value not in counts and len(counts) >= MAX_CATEGORIES:
+                    value = OTHER_CATEGORY
+                counts[value] = counts.get(value, 0) + int(count)
+
+
+class DriftMonitor:
+    """
+    Online comparison of served inputs and predictions with the training profile
+
+    Two StreamSketches are kept, the current window and the cumulative one.
+    observe() (one prediction) updates them in constant time, a malformed
+    row is only counted as dropped; observe_batch() blocks update them in
+    vectorized steps. Every check_interval seconds a background thread runs
+    check(): the window is scored against the reference (PSI per column,
+    mean shift in reference standard deviations, share of values outside
+    the reference range, unseen categories), the report is kept and a new
+    window starts. The thread is (re)started lazily in whichever process
+    observes, so forked server workers each monitor their own share of the
+    traffic, and requests never pay for a check.
+
+    has_store=False (a predictor without a feature store) skips the
+    requires_store columns, whose served values are constant defaults, and
+    compares predictions with the reference's storeless profile (or skips
+    them too when the reference has none).
+    """
+
+    def __init__(self, reference, feature_plan, check_interval=DEFAULT_CHECK_INTERVAL, has_store=True):
+        self.reference = reference
+        self.check_interval = check_interval
+        self.feature_plan = feature_plan
+        features = list(feature_plan.features)
+        missing = [name for name in features + [PREDICTION_COLUMN] if name not in reference['columns']]
+        if missing:
+            raise ValueError(f"Drift reference has no profile for: {', '.join(missing)}")
+
+        # Feature matrix columns that are watched, and the reference profile of each
+        self.positions = [j for j, name in enumerate(features)
+                          if has_store or not reference['columns'][name].get('requires_store')]
+        self._position_index = np.array(self.positions, dtype=np.intp)
+        self.columns = [features[j] for j in self.positions]
+        specs = [reference['columns'][name] for name in self.columns]
+        prediction_spec = (reference['columns'][PREDICTION_COLUMN] if has_store
+                           else reference.get('storeless', {}).get(PREDICTION_COLUMN))
+        self.watch_predictions = prediction_spec is not None
+        if self.watch_predictions:
+            self.columns.append(PREDICTION_COLUMN)
+            specs.append(prediction_spec)
+        self.skipped = [name for name in features + [PREDICTION_COLUMN] if name not in self.columns]
+        self.specs = specs
+
+        self.n_bins = np.array([len(spec['edges']) + 1 for spec in specs])
+        n_inner = max(max(len(spec['edges']) - 2 for spec in specs), 1)
+        self.inner = np.full((len(specs), n_inner), np.inf)
+        for j, spec in enumerate(specs):
+            self.inner[j, :len(spec['edges']) - 2] = spec['edges'][1:-1]
+        self.low = np.array([spec['edges'][0] for spec in specs])
+        self.high = np.array([spec['edges'][-1] for spec in specs])
+        self.reference_fractions = np.zeros((len(specs), self.n_bins.max()))
+        for j, spec in enumerate(specs):
+            self.reference_fractions[j, :len(spec['fractions'])] = spec['fractions']
+        self.reference_mean = np.array([spec['mean'] for spec in specs])
+        self.reference_std = np.array([spec['std'] for spec in specs])
+
+        self.window = StreamSketch(len(self.columns), self.n_bins.max())
+        self.total = StreamSketch(len(self.columns), self.n_bins.max())
+        self.window_started = time.time()
+        self.last_check = self.window_started
+        self.last_report = None
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._pid = None
+
+    @classmethod
+    def for_predictor(cls, predictor):
+        """Monitor of a predictor's model directory, or None without a reference profile"""
+        reference = load_reference(predictor.models_dir)
+        if reference is None:
+            return None
+        return cls(reference, predictor.feature_plan, has_store=predictor.feature_store is not None)
+
+    # Feeding
+
+    def observe(self, student_data, course_data, interests_data, predicted_grade):
+        """Record one prediction (resolved inputs as passed to the feature plan)"""
+        if self._pid != os.getpid():
+            self._ensure_worker()
+        try:
+            feature_row = self.feature_plan.build_row(student_data, course_data, parse_interests(interests_data))
+            values = np.empty(len(self.columns))
+            values[:len(self.positions)] = feature_row[0, self._position_index]
+            if self.watch_predictions:
+                values[-1] = float(predicted_grade)
+            labels = {'branch_code': str(student_data['branch_code']), 'domain_tags': str(course_data['domain_tags'])}
+        except (KeyError, TypeError, ValueError):
+            # Monitoring never fails a prediction; malformed rows are only counted
+            with self._lock:
+                self.dropped += 1
+            return
+        codes = 1 + (self.inner <= values[:, None]).sum(axis=1)
+        codes = np.where(values < self.low, 0, np.where(values > self.high, self.n_bins - 1, codes))
+        with self._lock:
+            self.window.add_row(values, codes, labels)
+            self.total.add_row(values, codes, labels)
+
+    def observe_batch(self, columns, predictions, feature_matrix=None):
+        """Record a block of predictions (normalized columns, optionally their feature matrix)"""
+        if self._pid != os.getpid():
+            self._ensure_worker()
+        if feature_matrix is None:
+            feature_matrix = self.feature_plan.build_matrix(columns)
+        categorical = {name: columns[name] for name in CATEGORICAL_INPUTS}
+        with self._lock:
+            self._add(feature_matrix, predictions, categorical)
+
+    def _ensure_worker(self):
+        """Start the scheduled check thread in this process (threads do not survive a fork)"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            threading.Thread(target=_check_loop, args=(weakref.ref(self),), name="drift-monitor",
+                             daemon=True).start()
+            self._pid = os.getpid()
+
+    def _add(self, feature_matrix, predictions, categorical):
+        """Update both sketches with a featurized block (lock held)"""
+        matrix = np.asarray(feature_matrix, dtype=np.float64)[:, self.positions]
+        if self.watch_predictions:
+            matrix = np.column_stack([matrix, np.asarray(predictions, dtype=np.float64)])
+        codes = _bin_codes(matrix, self.inner, self.low, self.high, self.n_bins)
+        self.window.add(matrix, codes, categorical)
+        self.total.add(matrix, codes, categorical)
+
+    # Scoring
+
+    def _score(self, sketch):
+        if sketch.n == 0:
+            return None
+        fractions = sketch.counts / sketch.n
+        std = np.sqrt(sketch.m2 / sketch.n)
+        columns = {}
+        for j, name in enumerate(self.columns):
+            n_bins = self.n_bins[j]
+            psi = _psi(self.reference_fractions[j, :n_bins], fractions[j, :n_bins])
+            shift = ((sketch.mean[j] - self.reference_mean[j]) / self.reference_std[j]
+                     if self.reference_std[j] > 0 else None)
+            columns[name] = {
+                'psi': psi,
+                'status': _status(psi),
+                'mean': float(sketch.mean[j]),
+                'std': float(std[j]),
+                'reference_mean': float(self.reference_mean[j]),
+                'mean_shift_std': None if shift is None else float(shift),
+                'min': float(sketch.min[j]),
+                'max': float(sketch.max[j]),
+                'out_of_range': float((fractions[j, 0] + fractions[j, n_bins - 1])),
+                'quantiles': self._quantiles(sketch, j)
+            }
+
+        categories = {}
+        for name, counts in sketch.categories.items():
+            expected = self.reference['categories'].get(name)
+            if not expected or not counts:
+                continue
+            values = sorted(set(expected) | set(counts))
+            total = sum(counts.values())
+            live = [counts.get(value, 0) / total for value in values]
+            psi = _psi([expected.get(value, 0.0) for value in values], live)
+            categories[name] = {
+                'psi': psi,
+                'status': _status(psi),
+                'unseen': {value: count / total for value, count in counts.items() if value not in expected}
+            }
+
+        scores = [column['psi'] for column in columns.values()] + [c['psi'] for c in categories.values()]
+        worst = max(scores)
+        return {
+            'rows': int(sketch.n),
+            'status': _status(worst),
+            'max_psi': worst,
+            'drifted': sorted([name for name, column in list(columns.items()) + list(categories.items())
+                               if column['status'] == 'drift']),
+            'columns': columns,
+            'categories': categories
+        }
+
+    def _quantiles(self, sketch, j, probabilities=(0.05, 0.5, 0.95)):
+        """Quantiles interpolated inside the bins (the outer bins span the observed min / max)"""
+        spec_edges = self.specs[j]['edges']
+        n_bins = self.n_bins[j]
+        # The outer bins only hold values between the live extremes and the reference range
+        bounds = np.concatenate([[sketch.min[j], min(sketch.max[j], spec_edges[0])], spec_edges[1:-1],
+                                 [max(sketch.min[j], spec_edges[-1]), sketch.max[j]]])
+        cumulative = np.cumsum(sketch.counts[j, :n_bins]) / sketch.n
+        result = {}
+        for p in probabilities:
+            b = int(np.searchsorted(cumulative, p))
+            b = min(b, n_bins - 1)
+            below = cumulative[b - 1] if b > 0 else 0.0
+            inside = cumulative[b] - below
+            share = (p - below) / inside if inside > 0 else 0.0
+            result[f"p{int(p * 100):02d}"] = float(bounds[b] + share * (bounds[b + 1] - bounds[b]))
+        return result
+
+    def check(self):
+        """Score the current window and the cumulative stream, keep the report and start a new window"""
+        with self._lock:
+            return self._check()
+
+    def _check(self):
+        """check() with the lock held"""
+        now = time.time()
+        self.last_check = now
+        report = {
+            'checked_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(now)),
+            'window_seconds': now - self.window_started,
+            'reference': {'rows': self.reference.get('rows'), 'source': self.reference.get('source'),
+                          'created_at': self.reference.get('created_at')},
+            'window': self._score(self.window) if self.window.n >= MIN_WINDOW_ROWS else None,
+            'total': self._score(self.total),
+            'skipped_columns': self.skipped,
+            'dropped_rows': self.dropped
+        }
+        current = report['window'] or report['total']
+        report['status'] = current['status'] if current else 'no_data'
+        if self.window.n >= MIN_WINDOW_ROWS:
+            self.window = StreamSketch(len(self.columns), self.n_bins.max())
+            self.window_started = now
+        self.last_report = report
+        return report
+
+    def report(self):
+        """Last scheduled report, or a fresh one when none has run yet"""
+        return self.last_report or self.check()
+
+    def reset(self):
+        """Forget everything observed so far (e.g. warm-up traffic)"""
+        with self._lock:
+            self.window = StreamSketch(len(self.columns), self.n_bins.max())
+            self.total = StreamSketch(len(self.columns), self.n_bins.max())
+            self.window_started = self.last_check = time.time()
+            self.last_report = None
+            self.dropped = 0
+
+
+def _check_loop(monitor_ref):
+    """Scheduled checks of a DriftMonitor, off the request path; ends once the monitor is collected"""
+    while True:
+        monitor = monitor_ref()
+        if monitor is None:
+            return
+        wait = max(monitor.last_check + monitor.check_interval - time.time(), 0.0)
+        # Only the weak reference is held while sleeping, so a swapped-out model can be collected
+        del monitor
+        time.sleep(wait)
+        monitor = monitor_ref()
+        if monitor is None:
+            return
+        if time.time() - monitor.last_check >= monitor.check_interval:
+            try:
+                monitor.check()
+            except Exception as e:
+                print(f"⚠️  Drift check failed: {e}")
+        del monitor
+
+
+def reference_from_dataset(models_dir, dataset, source=None, progress=print):
+    """
+    Write the drift reference of an existing model from a grades dataset
+
+    Every grade row is featurized with aggregates over all grades (what a
+    serving feature store holds) and predicted by the model, once as is and
+    once with the storeless defaults for servers without a feature store.
+    """
+    from src.feature_store import FeatureStore
+    from src.predictor import GradePredictor
+    from src.training_pipeline import feature_matrix
+
+    predictor = GradePredictor(models_dir, cache_size=0, monitor_drift=False)
+    grades = dataset['grades']
+    store = FeatureStore(dataset['students'], dataset['courses'], dataset['interests'], grades)
+    student_ids = grades['student_id'].astype(str).to_numpy()
+    course_ids = grades['course_id'].astype(str).to_numpy()
+    X = feature_matrix(store, predictor.feature_plan, student_ids, course_ids)
+    predictions = predictor._predict_matrix(X)
+    storeless_predictions = predictor._predict_matrix(storeless_matrix(X, predictor.selected_features))
+    reference = build_reference(X, predictions, predictor.selected_features,
+                                store.branch_code[store.student_codes(student_ids)],
+                                store.domain_tags[store.course_codes(course_ids)], source,
+                                storeless_predictions)
+    path = save_reference(models_dir, reference)
+    progress(f"💾 Drift reference of {len(X)} rows written to {path}")
+    return reference
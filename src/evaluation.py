@@ -0,0 +1,226 @@
+import json
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src.id_mappings import load_id_mappings
+from src.predictor import GradePredictor
+from src.synthetic_data import generate_dataset, DEFAULT_SEED
+from src.training_pipeline import DEFAULT_CV_FOLDS, build_features, load_dataset, search
+
+# Allowed absolute difference between recomputed and recorded metrics
+DEFAULT_TOLERANCE = 0.01
+# Rows per engine call while scoring the test split
+DEFAULT_BATCH_SIZE = 65536
+CHECKED_METRICS = ['test_rmse', 'test_mae', 'test_r2', 'cv_mean_r2']
+# Breakdown name -> (table, column) the group label comes from
+BREAKDOWNS = {
+    'domain': ('courses', 'domain_tags'),
+    'branch': ('students', 'branch_code'),
+    'difficulty': ('courses', 'difficulty_level')
+}
+
+
+def split_rows(grades, mappings):
+    """
+    Row indices of the train and test pairs in a grades table
+
+    Pairs keep their id_mappings order. A pair graded more than once uses its
+    last record; pairs without any grade raise ValueError.
+    """
+    keys = mappings.encode(grades['student_id'].to_numpy(), grades['course_id'].to_numpy())
+    # Last record of each pair wins
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    last = np.append(sorted_keys[1:] != sorted_keys[:-1], True)
+    sorted_keys, order = sorted_keys[last], order[last]
+
+    rows = []
+    for split in ('train', 'test'):
+        wanted = mappings.pair_keys(split)
+        positions = np.minimum(np.searchsorted(sorted_keys, wanted), max(len(sorted_keys) - 1, 0))
+        found = (sorted_keys[positions] == wanted) if len(sorted_keys) else np.zeros(len(wanted), dtype=bool)
+        if not found.all():
+            raise ValueError(f"{int((~found).sum())} of {len(wanted)} {split} pairs have no recorded grade")
+        rows.append(order[positions])
+    return rows[0], rows[1]
+
+
+def raw_predictions(predictor, X, batch_size=DEFAULT_BATCH_SIZE):
+    """Unrounded model output for a feature matrix, in batches"""
+    predictions = np.empty(len(X))
+    for start in range(0, len(X), batch_size):
+        batch = X[start:start + batch_size]
+        if predictor.engine is not None:
+            predictions[start:start + batch_size] = predictor.engine.predict(batch)
+        else:
+            import pandas as pd
+            scaled = predictor.scaler.transform(pd.DataFrame(batch, columns=predictor.selected_features))
+            predictions[start:start + batch_size] = predictor.model.predict(scaled)
+    return predictions
+
+
+def regression_metrics(y, predictions):
+    """RMSE / MAE / R² / mean error of one set of predictions"""
+    errors = predictions - y
+    total = float(np.sum((y - y.mean()) ** 2))
+    return {
+        'n': int(len(y)),
+        'rmse': float(np.sqrt(np.mean(errors ** 2))),
+        'mae': float(np.mean(np.abs(errors))),
+        'r2': float(1 - np.sum(errors ** 2) / total) if total > 0 else None,
+        'bias': float(np.mean(errors))
+    }
+
+
+def grouped_metrics(y, predictions, labels):
+    """regression_metrics per label, all groups at once with bincount"""
+    groups, codes = np.unique(np.asarray(labels).astype(str), return_inverse=True)
+    count = np.bincount(codes, minlength=len(groups))
+    errors = predictions - y
+    sse = np.bincount(codes, errors ** 2, len(groups))
+    group_mean = np.bincount(codes, y, len(groups)) / count
+    sst = np.bincount(codes, (y - group_mean[codes]) ** 2, len(groups))
+    mae = np.bincount(codes, np.abs(errors), len(groups)) / count
+    bias = np.bincount(codes, errors, len(groups)) / count
+    return {
+        group: {
+            'n': int(count[i]),
+            'rmse': float(np.sqrt(sse[i] / count[i])),
+            'mae': float(mae[i]),
+            'r2': float(1 - sse[i] / sst[i]) if sst[i] > 0 else None,
+            'bias': float(bias[i])
+        }
+        for i, group in enumerate(groups)
+    }
+
+
+def model_params(predictor):
+    """Hyperparameters to refit the model with during cross-validation"""
+    if predictor.metadata.get('hyperparameters'):
+        return dict(predictor.metadata['hyperparameters'])
+    params = predictor.model.get_params()
+    params.pop('random_state', None)
+    return params
+
+
+def evaluate_model(predictor, dataset, mappings, folds=DEFAULT_CV_FOLDS, workers=None,
+                   batch_size=DEFAULT_BATCH_SIZE, progress=print):
+    """
+    Recompute the held-out and cross-validation metrics of a model
+
+    Features are built the way training builds them (aggregates from the
+    train pairs only), the test split is scored in batches, and k-fold CV of
+    the model's hyperparameters runs on the train pairs on a process pool,
+    with the seed and search rows recorded in the metadata. folds=0 skips CV.
+
+    Returns:
+    dict with test_rmse / test_mae / test_r2, cv_mean_r2 / cv_scores,
+    breakdowns {name: {group: metrics}} and timings
+    """
+    timings = {}
+    start = time.perf_counter()
+    grades = dataset['grades']
+    train_rows, test_rows = split_rows(grades, mappings)
+    X_train, X_test = build_features(dataset, train_rows, test_rows, predictor.selected_features)
+    y = grades['grade'].to_numpy(dtype=np.float64)
+    y_train, y_test = y[train_rows], y[test_rows]
+    timings['build_features_seconds'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predictions = raw_predictions(predictor, X_test, batch_size)
+    overall = regression_metrics(y_test, predictions)
+    results = {
+        'test_samples': overall['n'],
+        'test_rmse': overall['rmse'],
+        'test_mae': overall['mae'],
+        'test_r2': overall['r2'],
+        'breakdowns': {}
+    }
+    student_ids, course_ids = mappings.pairs('test')
+    for name, (table, column) in BREAKDOWNS.items():
+        frame = dataset[table]
+        id_column = 'student_id' if table == 'students' else 'course_id'
+        labels = frame.set_index(frame[id_column].astype(str))[column].reindex(
+            student_ids if table == 'students' else course_ids
+        ).to_numpy()
+        results['breakdowns'][name] = grouped_metrics(y_test, predictions, labels)
+    timings['score_test_seconds'] = time.perf_counter() - start
+    progress(f"🎯 Test split ({overall['n']} rows): R² {overall['r2']:.4f}, RMSE {overall['rmse']:.4f}, "
+             f"MAE {overall['mae']:.4f}")
+
+    if folds:
+        start = time.perf_counter()
+        seed = predictor.metadata.get('seed', DEFAULT_SEED)
+        search_idx = np.arange(len(X_train))
+        search_rows = predictor.metadata.get('search_rows')
+        if search_rows and len(search_idx) > search_rows:
+            search_idx = np.sort(np.random.RandomState(seed).choice(search_idx, search_rows, replace=False))
+        cv = search(X_train[search_idx], y_train[search_idx], [model_params(predictor)], folds, workers, seed)[0]
+        results['cv_mean_r2'] = cv['cv_mean_r2']
+        results['cv_scores'] = cv['cv_scores']
+        timings['cross_validation_seconds'] = time.perf_counter() - start
+        progress(f"🔁 {folds}-fold CV R² {cv['cv_mean_r2']:.4f} in {timings['cross_validation_seconds']:.2f}s")
+
+    results['timings'] = timings
+    return results
+
+
+def compare_with_metadata(results, metadata, tolerance=DEFAULT_TOLERANCE):
+    """(metric, recorded, recomputed) for every metric off by more than tolerance"""
+    mismatches = []
+    for name in CHECKED_METRICS:
+        if name in results and metadata.get(name) is not None:
+            if results[name] is None or abs(results[name] - metadata[name]) > tolerance:
+                mismatches.append((name, metadata[name], results[name]))
+    return mismatches
+
+
+def print_breakdowns(breakdowns):
+    for name, groups in breakdowns.items():
+        print(f"\n📊 By {name}")
+        print(f"   {'group':<14}{'n':>7}{'RMSE':>9}{'MAE':>9}{'R²':>9}{'bias':>9}")
+        for group, metrics in groups.items():
+            r2 = f"{metrics['r2']:9.4f}" if metrics['r2'] is not None else f"{'-':>9}"
+            print(f"   {group:<14}{metrics['n']:>7}{metrics['rmse']:9.4f}{metrics['mae']:9.4f}"
+                  f"{r2}{metrics['bias']:9.4f}")
+
+
+def run_evaluation(args):
+    """CLI entry point for `run_cli.py evaluate`"""
+    from src.model_registry import ModelRegistry
+
+    folds = DEFAULT_CV_FOLDS if args.folds is None else args.folds
+    tolerance = DEFAULT_TOLERANCE if args.tolerance is None else args.tolerance
+    registry = ModelRegistry(args.models_dir)
+    version_dir = registry.version_path(args.version or registry.latest_version())
+    predictor = GradePredictor(version_dir, cache_size=0, monitor_drift=False)
+    mappings = load_id_mappings(version_dir, args.models_dir)
+
+    if args.data_dir and os.path.isdir(args.data_dir):
+        dataset = load_dataset(args.data_dir)
+    elif predictor.metadata.get('data_source') == 'synthetic':
+        dataset = generate_dataset(args.students, args.courses,
+                                   seed=predictor.metadata.get('seed', DEFAULT_SEED))
+    else:
+        print(f"❌ No grade data: {args.data_dir} does not exist and the model was not trained on synthetic data")
+        return 1
+
+    results = evaluate_model(predictor, dataset, mappings, folds, args.workers)
+    print_breakdowns(results['breakdowns'])
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+    mismatches = compare_with_metadata(results, predictor.metadata, tolerance)
+    for name, recorded, recomputed in mismatches:
+        print(f"❌ {name}: recorded {recorded:.4f}, recomputed "
+              f"{'n/a' if recomputed is None else f'{recomputed:.4f}'} (tolerance {tolerance})")
+    if mismatches:
+        return 1
+    print(f"\n✅ Metrics match the metadata within {tolerance}")
+    return 0
@@ -0,0 +1,238 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src.feature_store import DEFAULT_COURSE_AVG_GRADE, DEFAULT_GRADE_CONSISTENCY, DOMAINS
+
+# Branch codes used at training time
+BRANCHES = ['CE', 'CSE', 'ECE', 'ME', 'EE']
+
+# Raw input columns the kernels read
+NUMERIC_COLUMNS = ['cgpa', 'attendance', 'previous_avg', 'difficulty_level', 'credits', 'theory_weight']
+INPUT_COLUMNS = NUMERIC_COLUMNS + ['branch_code', 'domain_tags', 'interests']
+# Historical aggregates, filled from the feature store when IDs are given
+AGGREGATE_DEFAULTS = {
+    'grade_consistency': DEFAULT_GRADE_CONSISTENCY,
+    'course_avg_grade': DEFAULT_COURSE_AVG_GRADE
+}
+
+
+# Bit of each domain in an interest bitmask (same layout as FeatureStore.interest_mask)
+DOMAIN_BITS = {domain: bit for bit, domain in enumerate(DOMAINS)}
+
+
+def interest_masks(interest_lists):
+    """Per-row interest bitmasks from lists of domains (unknown domains are ignored)"""
+    return np.fromiter(
+        (sum(1 << DOMAIN_BITS[domain] for domain in set(row) if domain in DOMAIN_BITS) for row in interest_lists),
+        dtype=np.int64, count=len(interest_lists)
+    )
+
+
+def parse_interests(interests):
+    """Accept a list of domains or a comma/semicolon-separated string (empty for missing values)"""
+    if isinstance(interests, str):
+        return [interest.strip() for interest in interests.replace(';', ',').split(',') if interest.strip()]
+    if interests is None or (isinstance(interests, float) and np.isnan(interests)):
+        return []
+    return list(interests)
+
+
+def normalize_columns(raw):
+    """
+    Typed column arrays for FeaturePlan.build_matrix
+
+    raw: dict with every INPUT_COLUMNS key and the AGGREGATE_DEFAULTS keys,
+    each a sequence of equal length. 'interests' may be replaced by an
+    'interest_mask' array (FeatureStore.fill_columns). Shared by serving and
+    training so both feed the kernels exactly the same dtypes.
+    """
+    columns = {}
+    for key in AGGREGATE_DEFAULTS:
+        columns[key] = np.asarray(raw[key], dtype=np.float64)
+    for key in NUMERIC_COLUMNS:
+        columns[key] = np.asarray(raw[key], dtype=np.float64)
+    columns['branch_code'] = np.asarray(raw['branch_code'], dtype=object)
+    columns['domain_tags'] = np.asarray(raw['domain_tags'], dtype=object)
+    if 'interests' in raw:
+        columns['interests'] = [parse_interests(interests) for interests in raw['interests']]
+        columns['interest_mask'] = interest_masks(columns['interests'])
+    else:
+        columns['interests'] = None
+        columns['interest_mask'] = np.asarray(raw['interest_mask'], dtype=np.int64)
+
+    n_rows = len(columns['cgpa'])
+    for key, values in columns.items():
+        if values is not None and len(values) != n_rows:
+            raise ValueError(f"Column '{key}' has {len(values)} rows, expected {n_rows}")
+    return columns
+
+
+def _field(source, key):
+    """Kernels reading one raw field straight through"""
+    if source == 'student':
+        return (lambda student, course, interests: student[key]), (lambda columns: columns[key])
+    return (lambda student, course, interests: course[key]), (lambda columns: columns[key])
+
+
+def _domain_match_column(columns):
+    tags = columns['domain_tags']
+    bits = np.full(len(tags), -1)
+    for bit, domain in enumerate(DOMAINS):
+        bits[tags == domain] = bit
+    known = bits >= 0
+    match = known & ((columns['interest_mask'] >> np.maximum(bits, 0)) & 1).astype(bool)
+    if not known.all() and columns.get('interests') is not None:
+        # Domains outside DOMAINS have no bit; check the raw lists for those rows
+        for i in np.flatnonzero(~known):
+            match[i] = columns['domain_tags'][i] in columns['interests'][i]
+    return match.astype(np.float64)
+
+
+# name -> (row kernel, column kernel)
+#   row kernel:    (student_data, course_data, interests_data) -> float
+#   column kernel: dict of column arrays (see GradePredictor._records_to_columns) -> array
+KERNELS = {
+    'cgpa': _field('student', 'cgpa'),
+    'attendance': _field('student', 'attendance'),
+    'previous_avg': _field('student', 'previous_avg'),
+    'difficulty_level': _field('course', 'difficulty_level'),
+    'credits': _field('course', 'credits'),
+    'theory_weight': _field('course', 'theory_weight'),
+    'domain_match': (
+        lambda student, course, interests: 1.0 if course['domain_tags'] in interests else 0.0,
+        _domain_match_column
+    ),
+    'grade_consistency': (
+        lambda student, course, interests: student.get('grade_consistency', DEFAULT_GRADE_CONSISTENCY),
+        lambda columns: columns['grade_consistency']
+    ),
+    'course_avg_grade': (
+        lambda student, course, interests: course.get('course_avg_grade', DEFAULT_COURSE_AVG_GRADE),
+        lambda columns: columns['course_avg_grade']
+    ),
+    'cgpa_difficulty_interaction': (
+        lambda student, course, interests: student['cgpa'] * (6 - course['difficulty_level']),
+        lambda columns: columns['cgpa'] * (6 - columns['difficulty_level'])
+    ),
+    'attendance_difficulty_interaction': (
+        lambda student, course, interests: student['attendance'] * (6 - course['difficulty_level']),
+        lambda columns: columns['attendance'] * (6 - columns['difficulty_level'])
+    ),
+    'cgpa_attendance_interaction': (
+        lambda student, course, interests: student['cgpa'] * student['attendance'] / 100,
+        lambda columns: columns['cgpa'] * columns['attendance'] / 100
+    ),
+}
+
+
+def _branch_kernels(branch):
+    return (
+        lambda student, course, interests: 1.0 if student['branch_code'] == branch else 0.0,
+        lambda columns: (columns['branch_code'] == branch).astype(np.float64)
+    )
+
+
+def _domain_kernels(domain):
+    return (
+        lambda student, course, interests: 1.0 if course['domain_tags'] == domain else 0.0,
+        lambda columns: (columns['domain_tags'] == domain).astype(np.float64)
+    )
+
+
+def _interest_kernels(domain):
+    return (
+        lambda student, course, interests: 1.0 if domain in interests else 0.0,
+        lambda columns: ((columns['interest_mask'] >> DOMAIN_BITS[domain]) & 1).astype(np.float64)
+    )
+
+
+# Raw input fields each kernel reads (what-if grids recompute only kernels touching a varied field)
+KERNEL_INPUTS = {
+    'cgpa': ('cgpa',),
+    'attendance': ('attendance',),
+    'previous_avg': ('previous_avg',),
+    'difficulty_level': ('difficulty_level',),
+    'credits': ('credits',),
+    'theory_weight': ('theory_weight',),
+    'domain_match': ('domain_tags', 'interests'),
+    'grade_consistency': ('grade_consistency',),
+    'course_avg_grade': ('course_avg_grade',),
+    'cgpa_difficulty_interaction': ('cgpa', 'difficulty_level'),
+    'attendance_difficulty_interaction': ('attendance', 'difficulty_level'),
+    'cgpa_attendance_interaction': ('cgpa', 'attendance'),
+}
+
+for _branch in BRANCHES:
+    KERNELS[f'branch_{_branch}'] = _branch_kernels(_branch)
+    KERNEL_INPUTS[f'branch_{_branch}'] = ('branch_code',)
+for _domain in DOMAINS:
+    KERNELS[f'domain_{_domain}'] = _domain_kernels(_domain)
+    KERNEL_INPUTS[f'domain_{_domain}'] = ('domain_tags',)
+    KERNELS[f'interest_{_domain}'] = _interest_kernels(_domain)
+    KERNEL_INPUTS[f'interest_{_domain}'] = ('interests',)
+
+
+class FeaturePlan:
+    """
+    Ordered feature kernels compiled from selected_features.json
+
+    Only the features the model uses are computed, each written straight
+    into its column of a float64 row or matrix (no dicts, no DataFrames).
+    A selected feature without a kernel raises ValueError when the plan
+    is compiled, i.e. when the model is loaded.
+    """
+
+    def __init__(self, selected_features):
+        unknown = [feature for feature in selected_features if feature not in KERNELS]
+        if unknown:
+            raise ValueError(f"No feature kernel for selected feature(s): {', '.join(unknown)}")
+        self.features = list(selected_features)
+        self.row_kernels = [KERNELS[feature][0] for feature in self.features]
+        self.column_kernels = [KERNELS[feature][1] for feature in self.features]
+        self.kernel_inputs = [KERNEL_INPUTS[feature] for feature in self.features]
+
+    def __len__(self):
+        return len(self.features)
+
+    def build_row(self, student_data, course_data, interests_data):
+        """One (1, n_features) row for predict_grade"""
+        row = np.empty((1, len(self.row_kernels)))
+        out = row[0]
+        for j, kernel in enumerate(self.row_kernels):
+            out[j] = kernel(student_data, course_data, interests_data)
+        return row
+
+    def build_matrix(self, columns):
+        """(n_rows, n_features) matrix from a dict of column arrays"""
+        if 'interest_mask' not in columns:
+            columns = dict(columns, interest_mask=interest_masks(columns['interests']))
+        matrix = np.empty((len(columns['cgpa']), len(self.column_kernels)))
+        for j, kernel in enumerate(self.column_kernels):
+            matrix[:, j] = kernel(columns)
+        return matrix
+
+    def build_grid(self, base_row, base_values, varied):
+        """
+        Rows that differ from base_row only in some numeric input fields
+
+        base_row: (1, n_features) row from build_row
+        base_values: the record's numeric input fields {field: value}
+        varied: {field: array of grid values}, all arrays the same length
+
+        The base row is copied down the grid and only the kernels that read
+        a varied field are evaluated, on column arrays.
+        """
+        n_rows = len(next(iter(varied.values())))
+        matrix = np.repeat(base_row, n_rows, axis=0)
+        columns = None
+        for j, inputs in enumerate(self.kernel_inputs):
+            if not any(field in varied for field in inputs):
+                continue
+            if columns is None:
+                columns = {field: np.full(n_rows, float(value)) for field, value in base_values.items()}
+                columns.update(varied)
+            matrix[:, j] = self.column_kernels[j](columns)
+        return matrix
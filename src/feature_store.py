@@ -0,0 +1,320 @@
+import os
+import threading
+import numpy as np
+
+# Student/course/grade tables, using the file names written by the training notebook
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+STUDENTS_FILE = "students.csv"
+COURSES_FILE = "courses.csv"
+INTERESTS_FILE = "interests.csv"
+GRADES_FILE = "student_course_data.csv"
+
+DOMAINS = ['AI', 'Web', 'DBMS', 'ML', 'Networks', 'Security', 'Data_Science', 'Cloud']
+STUDENT_COLUMNS = ['cgpa', 'attendance', 'previous_avg']
+COURSE_COLUMNS = ['difficulty_level', 'credits', 'theory_weight']
+
+# Values the model was served with before real aggregates existed
+DEFAULT_GRADE_CONSISTENCY = 0.5
+DEFAULT_COURSE_AVG_GRADE = 7.5
+
+
+class FeatureStore:
+    """
+    In-memory student/course features addressed by ID
+
+    Students and courses are integer-coded; every attribute is a NumPy column
+    indexed by that code. Interests are a bitmask over DOMAINS. Grade history
+    is kept as running count/sum/sum-of-squares per student and per course,
+    so new grade records update the aggregates in O(new records):
+
+        course_avg_grade  = mean grade of the course
+        grade_consistency = 1 / (1 + sample std of the student's grades)
+
+    Upserts replace several parallel arrays at once, so writers and readers
+    share one re-entrant lock: a lookup never mixes arrays from before and
+    after a write.
+    """
+
+    def __init__(self, students, courses, interests=None, grades=None):
+        """
+        students: DataFrame with student_id, branch_code, cgpa, attendance, previous_avg
+        courses: DataFrame with course_id, domain_tags, difficulty_level, credits, theory_weight
+        interests: DataFrame with student_id, domain
+        grades: DataFrame with student_id, course_id, grade
+        """
+        self._lock = threading.RLock()
+        _require_columns(students, ['student_id', 'branch_code'] + STUDENT_COLUMNS, STUDENTS_FILE)
+        _require_columns(courses, ['course_id', 'domain_tags'] + COURSE_COLUMNS, COURSES_FILE)
+
+        self.student_ids = students['student_id'].astype(str).to_numpy(copy=True)
+        self.branch_code = students['branch_code'].astype(str).to_numpy(dtype=object, copy=True)
+        self.student_columns = {key: students[key].to_numpy(dtype=np.float64, copy=True) for key in STUDENT_COLUMNS}
+        self.interest_mask = np.zeros(len(self.student_ids), dtype=np.int64)
+
+        self.course_ids = courses['course_id'].astype(str).to_numpy(copy=True)
+        self.domain_tags = courses['domain_tags'].astype(str).to_numpy(dtype=object, copy=True)
+        self.course_columns = {key: courses[key].to_numpy(dtype=np.float64, copy=True) for key in COURSE_COLUMNS}
+
+        self._reindex()
+        self.student_grade_count = np.zeros(len(self.student_ids))
+        self.student_grade_sum = np.zeros(len(self.student_ids))
+        self.student_grade_sumsq = np.zeros(len(self.student_ids))
+        self.course_grade_count = np.zeros(len(self.course_ids))
+        self.course_grade_sum = np.zeros(len(self.course_ids))
+
+        if interests is not None and len(interests):
+            codes = self.student_codes(interests['student_id'].astype(str).to_numpy())
+            bits = np.array([DOMAINS.index(d) if d in DOMAINS else -1 for d in interests['domain']])
+            known = bits >= 0
+            np.bitwise_or.at(self.interest_mask, codes[known], np.left_shift(1, bits[known]))
+
+        if grades is not None and len(grades):
+            self.add_grades(grades['student_id'], grades['course_id'], grades['grade'])
+
+    @classmethod
+    def from_csv(cls, data_dir=DEFAULT_DATA_DIR):
+        """Build the store from the CSV tables in data_dir"""
+        import pandas as pd
+
+        def read(name, required=True):
+            path = os.path.join(data_dir, name)
+            if not os.path.exists(path):
+                if required:
+                    raise FileNotFoundError(f"Missing feature store table: {path}")
+                return None
+            return pd.read_csv(path)
+
+        store = cls(read(STUDENTS_FILE), read(COURSES_FILE), read(INTERESTS_FILE, False), read(GRADES_FILE, False))
+        print(f"🗂️  Feature store loaded: {len(store.student_ids)} students, {len(store.course_ids)} courses")
+        return store
+
+    def _reindex(self):
+        """Sorted views used to turn IDs into integer codes with searchsorted"""
+        self._student_order = np.argsort(self.student_ids, kind='stable')
+        self._sorted_student_ids = self.student_ids[self._student_order]
+        self._course_order = np.argsort(self.course_ids, kind='stable')
+        self._sorted_course_ids = self.course_ids[self._course_order]
+
+    @staticmethod
+    def _codes(ids, sorted_ids, order, kind):
+        ids = np.atleast_1d(np.asarray(ids).astype(str))
+        if len(sorted_ids) == 0:
+            if len(ids):
+                raise ValueError(f"Unknown {kind}: {ids[0]}")
+            return np.empty(0, dtype=np.intp)
+        positions = np.clip(np.searchsorted(sorted_ids, ids), 0, len(sorted_ids) - 1)
+        found = sorted_ids[positions] == ids
+        if not found.all():
+            raise ValueError(f"Unknown {kind}: {ids[~found][0]}")
+        return order[positions]
+
+    def student_codes(self, student_ids):
+        """Integer codes for student IDs (ValueError for unknown IDs)"""
+        with self._lock:
+            return self._codes(student_ids, self._sorted_student_ids, self._student_order, 'student_id')
+
+    def course_codes(self, course_ids):
+        """Integer codes for course IDs (ValueError for unknown IDs)"""
+        with self._lock:
+            return self._codes(course_ids, self._sorted_course_ids, self._course_order, 'course_id')
+
+    def has_student(self, student_id):
+        try:
+            self.student_codes([student_id])
+            return True
+        except ValueError:
+            return False
+
+    # Aggregates
+
+    def grade_consistency(self, codes):
+        """1 / (1 + std) of each student's grades, default for fewer than two grades"""
+        with self._lock:
+            return _consistency(self.student_grade_count[codes], self.student_grade_sum[codes],
+                                self.student_grade_sumsq[codes])
+
+    def course_avg_grade(self, codes):
+        """Mean grade of each course, default for courses without grades"""
+        with self._lock:
+            return _course_average(self.course_grade_count[codes], self.course_grade_sum[codes])
+
+    def leave_one_out(self, student_ids, course_ids, grades):
+        """
+        (grade_consistency, course_avg_grade) of recorded grade rows, each without its own grade
+
+        Every (student_id, course_id, grade) row must already be in the store.
+        Training uses this so a row's aggregates never contain its own label.
+        """
+        grades = np.asarray(grades, dtype=np.float64)
+        with self._lock:
+            student_codes = self.student_codes(student_ids)
+            course_codes = self.course_codes(course_ids)
+            return (
+                _consistency(self.student_grade_count[student_codes] - 1,
+                             self.student_grade_sum[student_codes] - grades,
+                             self.student_grade_sumsq[student_codes] - grades ** 2),
+                _course_average(self.course_grade_count[course_codes] - 1,
+                                self.course_grade_sum[course_codes] - grades)
+            )
+
+    def interests_for(self, code):
+        """Interest domains of one student"""
+        mask = int(self.interest_mask[code])
+        return [domain for bit, domain in enumerate(DOMAINS) if mask >> bit & 1]
+
+    # Incremental updates
+
+    def add_grades(self, student_ids, course_ids, grades):
+        """Fold new grade records into the per-student and per-course aggregates"""
+        student_codes = self.student_codes(student_ids)
+        course_codes = self.course_codes(course_ids)
+        grades = np.asarray(grades, dtype=np.float64)
+        if not (len(student_codes) == len(course_codes) == len(grades)):
+            raise ValueError("student_ids, course_ids and grades must have the same length")
+
+        with self._lock:
+            np.add.at(self.student_grade_count, student_codes, 1)
+            np.add.at(self.student_grade_sum, student_codes, grades)
+            np.add.at(self.student_grade_sumsq, student_codes, grades ** 2)
+            np.add.at(self.course_grade_count, course_codes, 1)
+            np.add.at(self.course_grade_sum, course_codes, grades)
+        return len(grades)
+
+    def upsert_student(self, student_id, branch_code, cgpa, attendance, previous_avg, interests=()):
+        """Add a student or replace their profile"""
+        mask = 0
+        for domain in interests:
+            if domain in DOMAINS:
+                mask |= 1 << DOMAINS.index(domain)
+        values = {'cgpa': cgpa, 'attendance': attendance, 'previous_avg': previous_avg}
+
+        with self._lock:
+            if self.has_student(student_id):
+                code = self.student_codes([student_id])[0]
+                self.branch_code[code] = branch_code
+                self.interest_mask[code] = mask
+                for key, value in values.items():
+                    self.student_columns[key][code] = float(value)
+                return code
+
+            self.student_ids = np.append(self.student_ids, str(student_id))
+            self.branch_code = np.append(self.branch_code, np.array([branch_code], dtype=object))
+            self.interest_mask = np.append(self.interest_mask, mask)
+            for key, value in values.items():
+                self.student_columns[key] = np.append(self.student_columns[key], float(value))
+            for name in ['student_grade_count', 'student_grade_sum', 'student_grade_sumsq']:
+                setattr(self, name, np.append(getattr(self, name), 0.0))
+            self._reindex()
+            return len(self.student_ids) - 1
+
+    def upsert_course(self, course_id, domain_tags, difficulty_level, credits, theory_weight):
+        """Add a course or replace its attributes"""
+        values = {'difficulty_level': difficulty_level, 'credits': credits, 'theory_weight': theory_weight}
+
+        with self._lock:
+            try:
+                code = self.course_codes([course_id])[0]
+            except ValueError:
+                code = None
+
+            if code is not None:
+                self.domain_tags[code] = domain_tags
+                for key, value in values.items():
+                    self.course_columns[key][code] = float(value)
+                return code
+
+            self.course_ids = np.append(self.course_ids, str(course_id))
+            self.domain_tags = np.append(self.domain_tags, np.array([domain_tags], dtype=object))
+            for key, value in values.items():
+                self.course_columns[key] = np.append(self.course_columns[key], float(value))
+            self.course_grade_count = np.append(self.course_grade_count, 0.0)
+            self.course_grade_sum = np.append(self.course_grade_sum, 0.0)
+            self._reindex()
+            return len(self.course_ids) - 1
+
+    # Filling prediction inputs
+
+    def resolve(self, student_data, course_data, interests_data):
+        """
+        Complete single-prediction inputs from the store
+
+        Values sent by the caller win; anything missing is taken from the
+        student_id / course_id records, together with the grade aggregates.
+        """
+        student_data = dict(student_data or {})
+        course_data = dict(course_data or {})
+
+        with self._lock:
+            if 'student_id' in student_data:
+                code = self.student_codes([student_data['student_id']])[0]
+                student_data.setdefault('branch_code', self.branch_code[code])
+                for key in STUDENT_COLUMNS:
+                    student_data.setdefault(key, float(self.student_columns[key][code]))
+                student_data.setdefault('grade_consistency', float(self.grade_consistency([code])[0]))
+                if interests_data is None:
+                    interests_data = self.interests_for(code)
+
+            if 'course_id' in course_data:
+                code = self.course_codes([course_data['course_id']])[0]
+                course_data.setdefault('domain_tags', self.domain_tags[code])
+                for key in COURSE_COLUMNS:
+                    course_data.setdefault(key, float(self.course_columns[key][code]))
+                course_data.setdefault('course_avg_grade', float(self.course_avg_grade([code])[0]))
+
+        return student_data, course_data, interests_data
+
+    def resolve_record(self, row):
+        """Complete one flat batch row"""
+        student, course, interests = self.resolve(
+            {key: row[key] for key in row if key not in ('course_id', 'interests')},
+            {key: row[key] for key in ('course_id',) if key in row},
+            row.get('interests')
+        )
+        resolved = dict(row)
+        for source in (student, course):
+            for key, value in source.items():
+                resolved.setdefault(key, value)
+        if interests is not None:
+            resolved['interests'] = interests
+        return resolved
+
+    def fill_columns(self, raw):
+        """Vectorized version of resolve for column input (DataFrame / dict of arrays)"""
+        raw = dict(raw)
+        with self._lock:
+            if 'student_id' in raw:
+                codes = self.student_codes(raw['student_id'])
+                raw.setdefault('branch_code', self.branch_code[codes])
+                for key in STUDENT_COLUMNS:
+                    raw.setdefault(key, self.student_columns[key][codes])
+                raw.setdefault('grade_consistency', self.grade_consistency(codes))
+                if 'interests' not in raw:
+                    # Bitmask instead of per-row lists; the feature plan reads it directly
+                    raw['interest_mask'] = self.interest_mask[codes]
+
+            if 'course_id' in raw:
+                codes = self.course_codes(raw['course_id'])
+                raw.setdefault('domain_tags', self.domain_tags[codes])
+                for key in COURSE_COLUMNS:
+                    raw.setdefault(key, self.course_columns[key][codes])
+                raw.setdefault('course_avg_grade', self.course_avg_grade(codes))
+        return raw
+
+
+def _consistency(count, total, sumsq):
+    """grade_consistency from per-student grade count / sum / sum of squares"""
+    mean = np.divide(total, count, out=np.zeros(len(count)), where=count > 0)
+    sum_sq_dev = np.maximum(sumsq - count * mean ** 2, 0.0)
+    variance = np.divide(sum_sq_dev, count - 1, out=np.zeros(len(count)), where=count > 1)
+    return np.where(count > 1, 1.0 / (1.0 + np.sqrt(variance)), DEFAULT_GRADE_CONSISTENCY)
+
+
+def _course_average(count, total):
+    """course_avg_grade from per-course grade count / sum"""
+    return np.divide(total, count, out=np.full(len(count), DEFAULT_COURSE_AVG_GRADE), where=count > 0)
+
+
+def _require_columns(frame, columns, name):
+    missing = [column for column in columns if column not in frame.columns]
+    if missing:
+        raise ValueError(f"{name} is missing columns: {', '.join(missing)}")
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+ID_MAPPINGS_JSON = "id_mappings.json"
+# Integer-coded copy written next to the JSON the first time it is read (a cache, not versioned)
+ID_MAPPINGS_COLUMNAR = "id_mappings.npz"
+SPLITS = ('train', 'test')
+
+
+def _digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _code_dtype(n_ids):
+    return np.uint16 if n_ids <= np.iinfo(np.uint16).max else np.uint32
+
+
+class IdMappings:
+    """
+    Train/test (student_id, course_id) pairs as integer-coded columns
+
+    student_ids / course_ids are the sorted vocabularies; every pair is a
+    (student_code, course_code) into them. Pairs keep their id_mappings.json
+    order, train pairs first: the first n_train rows are the train split.
+    """
+
+    def __init__(self, student_ids, course_ids, student_codes, course_codes, n_train):
+        self.student_ids = np.asarray(student_ids, dtype=str)
+        self.course_ids = np.asarray(course_ids, dtype=str)
+        self.student_codes = np.asarray(student_codes)
+        self.course_codes = np.asarray(course_codes)
+        self.n_train = int(n_train)
+
+    @classmethod
+    def from_json(cls, mappings):
+        """Encode the {'train_ids': [...], 'test_ids': [...]} layout written by training"""
+        pairs = mappings.get('train_ids', []) + mappings.get('test_ids', [])
+        student_ids, student_codes = np.unique(np.array([str(p['student_id']) for p in pairs], dtype=str),
+                                               return_inverse=True)
+        course_ids, course_codes = np.unique(np.array([str(p['course_id']) for p in pairs], dtype=str),
+                                             return_inverse=True)
+        return cls(student_ids, course_ids, student_codes.astype(_code_dtype(len(student_ids))),
+                   course_codes.astype(_code_dtype(len(course_ids))), len(mappings.get('train_ids', [])))
+
+    def _rows(self, split):
+        if split == 'train':
+            return slice(0, self.n_train)
+        if split == 'test':
+            return slice(self.n_train, len(self.student_codes))
+        if split is None:
+            return slice(None)
+        raise ValueError(f"Unknown split '{split}', expected one of {SPLITS}")
+
+    def __len__(self):
+        return len(self.student_codes)
+
+    def codes(self, split=None):
+        """(student_codes, course_codes) of a split (None = all pairs)"""
+        rows = self._rows(split)
+        return self.student_codes[rows], self.course_codes[rows]
+
+    def pairs(self, split=None):
+        """(student_ids, course_ids) string arrays of a split"""
+        student_codes, course_codes = self.codes(split)
+        return self.student_ids[student_codes], self.course_ids[course_codes]
+
+    def pair_keys(self, split=None):
+        """One int64 key per pair, student_code * n_courses + course_code"""
+        student_codes, course_codes = self.codes(split)
+        return student_codes.astype(np.int64) * len(self.course_ids) + course_codes
+
+    def encode(self, student_ids, course_ids):
+        """Pair keys for arbitrary ID columns, -1 where either ID is not in the vocabulary"""
+        keys = np.full(len(student_ids), -1, dtype=np.int64)
+        student_ids = np.asarray(student_ids).astype(str)
+        course_ids = np.asarray(course_ids).astype(str)
+        if len(self.student_ids) == 0 or len(self.course_ids) == 0:
+            return keys
+        s = np.minimum(np.searchsorted(self.student_ids, student_ids), len(self.student_ids) - 1)
+        c = np.minimum(np.searchsorted(self.course_ids, course_ids), len(self.course_ids) - 1)
+        known = (self.student_ids[s] == student_ids) & (self.course_ids[c] == course_ids)
+        keys[known] = s[known].astype(np.int64) * len(self.course_ids) + c[known]
+        return keys
+
+    def save(self, path, source_digest=None):
+        temp_path = path + ".tmp.npz"
+        np.savez(temp_path, student_ids=self.student_ids, course_ids=self.course_ids,
+                 student_codes=self.student_codes, course_codes=self.course_codes,
+                 n_train=np.int64(self.n_train), source_digest=np.array(source_digest or ''))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """(IdMappings, digest of the JSON it was converted from)"""
+        with np.load(path, allow_pickle=False) as data:
+            mappings = cls(data['student_ids'], data['course_ids'], data['student_codes'],
+                           data['course_codes'], data['n_train'])
+            return mappings, str(data['source_digest'])
+
+
+def load_id_mappings(models_dir, root_dir=None, convert=True):
+    """
+    Columnar id mappings of a model directory (falls back to root_dir)
+
+    The first read of an id_mappings.json converts it to id_mappings.npz in
+    the same directory; later reads load the npz unless the JSON changed.
+    """
+    for directory in (models_dir, root_dir):
+        if not directory:
+            continue
+        json_path = os.path.join(directory, ID_MAPPINGS_JSON)
+        columnar_path = os.path.join(directory, ID_MAPPINGS_COLUMNAR)
+        has_json = os.path.exists(json_path)
+        digest = _digest(json_path) if has_json else None
+        if os.path.exists(columnar_path):
+            mappings, source_digest = IdMappings.load(columnar_path)
+            if not has_json or source_digest == digest:
+                return mappings
+        if has_json:
+            with open(json_path, 'r') as f:
+                mappings = IdMappings.from_json(json.load(f))
+            if convert:
+                try:
+                    mappings.save(columnar_path, digest)
+                except OSError:
+                    pass
+            return mappings
+    raise FileNotFoundError(f"No {ID_MAPPINGS_JSON} for {models_dir}")
@@ -0,0 +1,186 @@
+import copy
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from src.drift_monitor import build_reference, storeless_matrix
+from src.feature_store import FeatureStore, DEFAULT_DATA_DIR
+from src.id_mappings import load_id_mappings
+from src.model_registry import ModelRegistry
+from src.predictor import GradePredictor, DEFAULT_MODELS_DIR
+from src.training_pipeline import TOP_FEATURES, evaluate, feature_matrix, load_dataset, save_artifacts
+
+# Boosting stages added per update
+DEFAULT_STAGES = 20
+# Allowed metric slack before an update counts as worse (0 = must not get worse at all)
+DEFAULT_TOLERANCE = 0.0
+METRIC_DIRECTIONS = {'test_rmse': 'lower', 'test_mae': 'lower', 'test_r2': 'higher'}
+# Cross-validation results of the parent; a warm-started model was never cross-validated
+CV_FIELDS = ['cv_mean_r2', 'cv_std_r2', 'cv_scores']
+
+
+def _pair_keys(student_ids, course_ids):
+    return pd.Index([f"{s}|{c}" for s, c in zip(student_ids, course_ids)])
+
+
+def worse_metrics(before, after, tolerance=DEFAULT_TOLERANCE):
+    """Names of the held-out metrics that got worse by more than tolerance"""
+    worse = []
+    for name, direction in METRIC_DIRECTIONS.items():
+        if direction == 'lower' and after[name] > before[name] + tolerance:
+            worse.append(name)
+        elif direction == 'higher' and after[name] < before[name] - tolerance:
+            worse.append(name)
+    return worse
+
+
+def update_model(new_grades, dataset, base_version=None, new_version=None, stages=DEFAULT_STAGES,
+                 tolerance=DEFAULT_TOLERANCE, models_dir=DEFAULT_MODELS_DIR, progress=print):
+    """
+    Warm-start a GradientBoosting version on new grade records
+
+    The existing trees and the scaler are kept; `stages` new trees are fitted
+    on the residuals of the current model on the new records only. Both the
+    old and the updated model are scored on the held-out test_ids, and the
+    new version is written to <models_dir>/versions/<new_version> only if no
+    metric got worse.
+
+    Parameters:
+    new_grades: DataFrame with student_id, course_id, grade
+    dataset: dict of DataFrames 'students', 'courses', 'interests', 'grades'
+             (grades = everything recorded so far, used for aggregates and test labels)
+
+    Returns:
+    (accepted, metadata) - metadata of the new version, or of the rejected candidate
+    """
+    start = time.perf_counter()
+    registry = ModelRegistry(models_dir)
+    base_version = base_version or registry.latest_version()
+    base_dir = registry.version_path(base_version)
+    base = GradePredictor(base_dir, use_compiled_engine=False, cache_size=0)
+    if base.metadata.get('model_type') != 'GradientBoosting':
+        raise ValueError(f"Incremental updates need a GradientBoosting model, got {base.metadata.get('model_type')}")
+
+    mappings = load_id_mappings(base_dir, models_dir)
+    test_keys = _pair_keys(*mappings.pairs('test'))
+
+    # Held-out labels: test pairs found in the recorded or new grades
+    all_grades = pd.concat([dataset['grades'], new_grades], ignore_index=True)
+    all_grades = all_grades.drop_duplicates(['student_id', 'course_id'], keep='last')
+    all_keys = _pair_keys(all_grades['student_id'], all_grades['course_id'])
+    test_grades = all_grades[all_keys.isin(test_keys)]
+    if len(test_grades) == 0:
+        raise ValueError("None of the test_ids have a recorded grade")
+
+    # Test pairs never train the model, not even as aggregates
+    old_grades = dataset['grades'][~_pair_keys(dataset['grades']['student_id'],
+                                               dataset['grades']['course_id']).isin(test_keys)]
+    new_grades = new_grades[~_pair_keys(new_grades['student_id'], new_grades['course_id']).isin(test_keys)]
+    if len(new_grades) == 0:
+        raise ValueError("No new grade records outside the held-out test set")
+
+    store = FeatureStore(dataset['students'], dataset['courses'], dataset['interests'], old_grades)
+    plan = base.feature_plan
+    columns = base.selected_features
+    # New rows see the aggregates as they were before their own grade arrived
+    X_new = feature_matrix(store, plan, new_grades['student_id'].astype(str).to_numpy(),
+                           new_grades['course_id'].astype(str).to_numpy())
+    y_new = new_grades['grade'].to_numpy(dtype=np.float64)
+    store.add_grades(new_grades['student_id'], new_grades['course_id'], new_grades['grade'])
+    X_test = feature_matrix(store, plan, test_grades['student_id'].astype(str).to_numpy(),
+                            test_grades['course_id'].astype(str).to_numpy())
+    y_test = test_grades['grade'].to_numpy(dtype=np.float64)
+    prepare_seconds = time.perf_counter() - start
+
+    fit_start = time.perf_counter()
+    model = copy.deepcopy(base.model)
+    base_stages = len(model.estimators_)
+    model.set_params(warm_start=True, n_estimators=base_stages + stages)
+    model.fit(base.scaler.transform(pd.DataFrame(X_new, columns=columns)), y_new)
+    model.set_params(warm_start=False)
+    fit_seconds = time.perf_counter() - fit_start
+
+    X_test = pd.DataFrame(X_test, columns=columns)
+    before = evaluate(base.model, base.scaler, X_test, y_test)
+    after = evaluate(model, base.scaler, X_test, y_test)
+    worse = worse_metrics(before, after, tolerance)
+    progress(f"🎯 Held-out ({len(y_test)} rows) R² {before['test_r2']:.4f} -> {after['test_r2']:.4f}, "
+             f"RMSE {before['test_rmse']:.4f} -> {after['test_rmse']:.4f}")
+
+    new_version = new_version or time.strftime('v%Y%m%d-%H%M%S')
+    metadata = copy.deepcopy(base.metadata)
+    metadata.update(after)
+    metadata['model_version'] = new_version
+    metadata['parent_version'] = base_version
+    metadata['training_samples'] = int(metadata.get('training_samples', 0) + len(y_new))
+    metadata['test_samples'] = int(len(y_test))
+    # hyperparameters stay the parent's search result; the added stages are recorded in the lineage
+    for name in CV_FIELDS:
+        if name in metadata:
+            metadata[name] = None
+    metadata.pop('search_results', None)
+    importances = sorted(zip(columns, model.feature_importances_), key=lambda item: -item[1])
+    metadata['top_features'] = [{'feature': feature, 'importance': float(importance)}
+                                for feature, importance in importances[:TOP_FEATURES]]
+    metadata['lineage'] = list(base.metadata.get('lineage', [])) + [{
+        'parent_version': base_version,
+        'update': 'warm_start',
+        'added_stages': stages,
+        'total_stages': base_stages + stages,
+        'new_records': int(len(y_new)),
+        'metrics_before': before,
+        'metrics_after': after,
+        'fit_seconds': fit_seconds,
+        'total_seconds': time.perf_counter() - start,
+        'prepare_seconds': prepare_seconds,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }]
+
+    if worse:
+        progress(f"🚫 Update rejected, worse on: {', '.join(worse)}")
+        return False, metadata
+
+    train_students, train_courses = mappings.pairs('train')
+    train_pairs = (np.concatenate([train_students, new_grades['student_id'].astype(str).to_numpy()]),
+                   np.concatenate([train_courses, new_grades['course_id'].astype(str).to_numpy()]))
+    id_mappings = {
+        name: [{'student_id': str(s), 'course_id': str(c)} for s, c in zip(student_ids, course_ids)]
+        for name, (student_ids, course_ids) in (('train_ids', train_pairs), ('test_ids', mappings.pairs('test')))
+    }
+    output_dir = os.path.join(models_dir, "versions", new_version)
+    if os.path.exists(output_dir):
+        raise FileExistsError(f"Model version '{new_version}' already exists")
+    # The updated model predicts differently, so its reference is profiled on the update and gate rows
+    def served(X):
+        return np.clip(np.round(model.predict(base.scaler.transform(pd.DataFrame(X, columns=columns))), 2), 5.0, 10.0)
+
+    X_reference = np.vstack([X_new, X_test.to_numpy()])
+    reference_students = np.concatenate([new_grades['student_id'].astype(str).to_numpy(),
+                                         test_grades['student_id'].astype(str).to_numpy()])
+    reference_courses = np.concatenate([new_grades['course_id'].astype(str).to_numpy(),
+                                        test_grades['course_id'].astype(str).to_numpy()])
+    drift_reference = build_reference(
+        X_reference, served(X_reference), columns,
+        store.branch_code[store.student_codes(reference_students)],
+        store.domain_tags[store.course_codes(reference_courses)],
+        source=f"update of {base_version}", storeless_predictions=served(storeless_matrix(X_reference, columns))
+    )
+    save_artifacts(output_dir, model, base.scaler, columns, metadata, id_mappings, drift_reference)
+    progress(f"💾 Version '{new_version}' written to {output_dir} "
+             f"({stages} stages on {len(y_new)} records in {fit_seconds:.2f}s)")
+    return True, metadata
+
+
+def run_update(args):
+    """CLI entry point for `run_cli.py update`"""
+    new_grades = pd.read_csv(args.new_grades)
+    dataset = load_dataset(args.data_dir)
+    stages = DEFAULT_STAGES if args.stages is None else args.stages
+    tolerance = DEFAULT_TOLERANCE if args.tolerance is None else args.tolerance
+    accepted, _ = update_model(new_grades, dataset, args.base_version, args.version, stages,
+                               tolerance, args.models_dir)
+    return 0 if accepted else 1
@@ -0,0 +1,187 @@
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Latency buckets in seconds (10us .. 5s)
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+                   0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+HELP = {
+    'grade_stage_duration_seconds': 'Time spent in each stage of the prediction hot path',
+    'grade_http_request_duration_seconds': 'End-to-end Flask request latency',
+    'grade_http_requests_total': 'HTTP requests by endpoint and status code',
+    'grade_http_errors_total': 'HTTP requests that returned a 4xx/5xx status',
+    'grade_prediction_fallback_total': 'predict_grade calls answered by the CGPA fallback',
+}
+
+
+class _NullSpan:
+    """Shared no-op context manager returned while metrics are disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('registry', 'metric', 'labels', 'start')
+
+    def __init__(self, registry, metric, labels):
+        self.registry = registry
+        self.metric = metric
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.metric, time.perf_counter() - self.start, self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """
+    Minimal Prometheus-style counters and latency histograms
+
+    Disabled by default. While disabled, span() returns a shared no-op
+    context manager and inc()/observe() return immediately, so the
+    instrumentation left in the hot path costs a function call at most.
+    Each process keeps its own numbers (forked workers report separately).
+    """
+
+    def __init__(self, enabled=False, buckets=LATENCY_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def span(self, stage, metric='grade_stage_duration_seconds', **labels):
+        """Time a block: `with METRICS.span('build_features'): ...`"""
+        if not self.enabled:
+            return _NULL_SPAN
+        labels['stage'] = stage
+        return _Span(self, metric, tuple(sorted(labels.items())))
+
+    def observe(self, metric, seconds, labels=()):
+        if not self.enabled:
+            return
+        if isinstance(labels, dict):
+            labels = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._histograms.get((metric, labels))
+            if series is None:
+                series = self._histograms[(metric, labels)] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def inc(self, metric, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render_prometheus(self, extra_counters=None):
+        """Text exposition format; extra_counters adds {name: value} counters"""
+        lines = []
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (list(value[0]), value[1], value[2]) for key, value in self._histograms.items()}
+
+        for name in sorted({metric for metric, _ in counters}):
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for name in sorted({metric for metric, _ in histograms}):
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, labels), (counts, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', repr(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        for name, value in sorted((extra_counters or {}).items()):
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    body = ",".join(f'{key}="{str(value)}"' for key, value in labels)
+    return "{" + body + "}"
+
+
+class SamplingProfiler:
+    """
+    Opt-in statistical profiler
+
+    A background thread samples the stacks of all other threads every
+    `interval` seconds. Nothing runs until start() is called.
+    """
+
+    def __init__(self, interval=0.005, max_depth=30):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.samples.clear()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self, top=None):
+        """Folded stacks ('a;b;c count' per line), ready for flamegraph tools"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common(top)) + "\n"
+
+
+# Process-wide registry; enable with GRADE_METRICS=1 or run_api.py --metrics
+METRICS = MetricsRegistry(enabled=os.environ.get('GRADE_METRICS') == '1')
@@ -0,0 +1,153 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+DEFAULT_MAX_BATCH_SIZE = 32
+DEFAULT_MAX_WAIT_MS = 2.0
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single predictions into vectorized batches
+
+    Request threads enqueue a validated feature row and block on a Future.
+    Rows already in the predictor's cache are answered without queueing,
+    and every batch result is put into that cache. A background worker
+    takes the first queued row, keeps collecting until max_batch_size rows
+    are queued or max_wait_ms has passed, runs one predict_batch call and
+    hands every caller its own result.
+
+    The worker thread is (re)started lazily in whichever process uses the
+    batcher, so it also works in forked server workers.
+    """
+
+    def __init__(self, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.requests = 0
+        self.batches = 0
+        self.cache_hits = 0
+        self.max_queue_depth = 0
+        # Upper bounds of the batch size histogram buckets: 1, 2, 4, ... max_batch_size
+        self.histogram_bounds = []
+        bound = 1
+        while bound < self.max_batch_size:
+            self.histogram_bounds.append(bound)
+            bound *= 2
+        self.histogram_bounds.append(self.max_batch_size)
+        self.histogram_counts = [0] * len(self.histogram_bounds)
+
+    def reset_stats(self):
+        with self._lock:
+            self._reset_stats()
+
+    def _ensure_worker(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._reset_stats()
+            threading.Thread(target=self._run, name="micro-batcher", daemon=True).start()
+            self._pid = os.getpid()
+
+    def submit(self, predictor, row):
+        """Queue one flat, validated row for predictor; returns a Future of the grade"""
+        self._ensure_worker()
+        future = Future()
+        cache_key, grade = predictor.cached_row(row)
+        if grade is not None:
+            with self._lock:
+                self.cache_hits += 1
+            future.set_result(grade)
+            return future
+        self._queue.put((predictor, row, future, cache_key))
+        depth = self._queue.qsize()
+        with self._lock:
+            if depth > self.max_queue_depth:
+                self.max_queue_depth = depth
+        return future
+
+    def predict(self, predictor, row, timeout=None):
+        """Blocking helper around submit"""
+        return self.submit(predictor, row).result(timeout)
+
+    def _run(self):
+        work_queue = self._queue
+        while True:
+            items = [work_queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(items) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(work_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # A model swap can put rows for two predictors into one window
+            by_predictor = {}
+            for item in items:
+                by_predictor.setdefault(id(item[0]), []).append(item)
+            for group in by_predictor.values():
+                self._score(group)
+
+            with self._lock:
+                self.requests += len(items)
+                self.batches += 1
+                for i, bound in enumerate(self.histogram_bounds):
+                    if len(items) <= bound:
+                        self.histogram_counts[i] += 1
+                        break
+
+    @staticmethod
+    def _score(items):
+        predictor = items[0][0]
+        try:
+            grades = predictor.predict_batch([row for _, row, _, _ in items])
+        except Exception:
+            # Isolate the failing row(s) instead of failing the whole batch
+            for _, row, future, cache_key in items:
+                try:
+                    grade = float(predictor.predict_batch([row])[0])
+                except Exception as e:
+                    future.set_exception(e)
+                    continue
+                predictor.cache_grade(cache_key, grade)
+                future.set_result(grade)
+            return
+        for (_, _, future, cache_key), grade in zip(items, grades):
+            predictor.cache_grade(cache_key, float(grade))
+            future.set_result(float(grade))
+
+    def stats(self):
+        """Queue depth and batch size distribution (counters read as one consistent snapshot)"""
+        with self._lock:
+            requests, batches = self.requests, self.batches
+            stats = {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+                'max_queue_depth': self.max_queue_depth,
+                'requests': requests,
+                'batches': batches,
+                'cache_hits': self.cache_hits,
+                'mean_batch_size': requests / batches if batches else 0.0,
+                'batch_size_histogram': {
+                    f"le_{bound}": count for bound, count in zip(self.histogram_bounds, self.histogram_counts)
+                }
+            }
+        return stats
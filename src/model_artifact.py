@@ -0,0 +1,179 @@
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src.tree_engine import CompiledGradientBoosting, SUPPORTED_MODEL_TYPES
+
+# Optional single-file artifact next to the pickles of a model directory
+ARTIFACT_NAME = "compiled_model.bin"
+MAGIC = b"GRADEMDL"
+FORMAT_VERSION = 1
+# Array offsets are aligned so every array can be viewed straight from the map
+ALIGNMENT = 64
+# Files the artifact was compiled from (any change makes the artifact stale)
+SOURCE_FILES = ["improved_feature_model.pkl", "feature_scaler.pkl", "selected_features.json"]
+ENGINE_ARRAYS = ['feature', 'threshold', 'left', 'right', 'value', 'roots']
+
+# File layout:
+#   MAGIC, header length (8 bytes, little-endian), JSON header
+#   (format_version, selected_features, init_value, max_depth, n_features,
+#   max_abs_error, sources, source_stats, arrays {name: {dtype, shape, offset}}), then every
+#   array's raw bytes at an ALIGNMENT-aligned offset from the first aligned
+#   byte after the header. Engine arrays plus scaler_mean / scaler_scale.
+
+
+def source_digests(models_dir):
+    """sha256 of each source file, used to detect a stale artifact"""
+    digests = {}
+    for name in SOURCE_FILES:
+        with open(os.path.join(models_dir, name), 'rb') as f:
+            digests[name] = hashlib.sha256(f.read()).hexdigest()
+    return digests
+
+
+def source_stats(models_dir):
+    """Size and mtime of each source file, a cheap check before hashing"""
+    stats = {}
+    for name in SOURCE_FILES:
+        stat = os.stat(os.path.join(models_dir, name))
+        stats[name] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    return stats
+
+
+def write_artifact(path, engine, selected_features, scaler_mean, scaler_scale, sources, max_abs_error,
+                   stats=None):
+    """Write a compiled engine and its feature list / scaler parameters to one file"""
+    arrays = {name: np.ascontiguousarray(getattr(engine, name)) for name in ENGINE_ARRAYS}
+    arrays['scaler_mean'] = np.asarray(scaler_mean, dtype=np.float64)
+    arrays['scaler_scale'] = np.asarray(scaler_scale, dtype=np.float64)
+
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+    header = {
+        'format_version': FORMAT_VERSION,
+        'selected_features': list(selected_features),
+        'init_value': engine.init_value,
+        'max_depth': int(engine.max_depth),
+        'n_features': int(engine.n_features),
+        'max_abs_error': max_abs_error,
+        'sources': sources,
+        'source_stats': stats,
+        'arrays': layout
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = -(-(len(MAGIC) + 8 + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+
+    temp_path = path + ".tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(len(header_bytes).to_bytes(8, 'little'))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.write(b"\0" * (data_start + layout[name]['offset'] - f.tell()))
+            f.write(array.tobytes())
+    os.replace(temp_path, path)
+
+
+def read_artifact(path):
+    """
+    Map an artifact file and view its arrays without copying
+
+    Returns:
+    (header dict, {name: read-only array backed by the map})
+    """
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if buffer[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a compiled model artifact")
+    header_length = int.from_bytes(buffer[len(MAGIC):len(MAGIC) + 8], 'little')
+    header_end = len(MAGIC) + 8 + header_length
+    header = json.loads(buffer[len(MAGIC) + 8:header_end].decode('utf-8'))
+    if header.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format {header.get('format_version')}")
+
+    data_start = -(-header_end // ALIGNMENT) * ALIGNMENT
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count,
+                                     offset=data_start + spec['offset']).reshape(spec['shape'])
+    return header, arrays
+
+
+def load_engine(path):
+    """(CompiledGradientBoosting, header) from an artifact, without importing sklearn"""
+    header, arrays = read_artifact(path)
+    engine = CompiledGradientBoosting(
+        feature=arrays['feature'],
+        threshold=arrays['threshold'],
+        left=arrays['left'],
+        right=arrays['right'],
+        value=arrays['value'],
+        roots=arrays['roots'],
+        init_value=header['init_value'],
+        max_depth=header['max_depth'],
+        n_features=header['n_features']
+    )
+    return engine, header
+
+
+def is_fresh(models_dir, header):
+    """
+    True when the artifact was compiled from the pickles currently in models_dir
+
+    Unchanged sizes and mtimes are trusted; the sources are only hashed when
+    those differ (copied or touched files) or the artifact predates them.
+    """
+    try:
+        if header.get('source_stats') and header['source_stats'] == source_stats(models_dir):
+            return True
+        return header.get('sources') == source_digests(models_dir)
+    except OSError:
+        return False
+
+
+def compile_artifact(models_dir, tolerance=1e-6, progress=print):
+    """
+    Compile the pickled model of a directory into ARTIFACT_NAME
+
+    Only supported model types are compiled, and only when the engine agrees
+    with sklearn within tolerance. Returns the artifact path, or None.
+    """
+    with open(os.path.join(models_dir, "improved_model_metadata.json"), 'r') as f:
+        metadata = json.load(f)
+    if metadata.get('model_type') not in SUPPORTED_MODEL_TYPES:
+        progress(f"⚠️  {models_dir}: {metadata.get('model_type')} models have no compiled artifact")
+        return None
+
+    with open(os.path.join(models_dir, "improved_feature_model.pkl"), 'rb') as f:
+        model = pickle.load(f)
+    with open(os.path.join(models_dir, "feature_scaler.pkl"), 'rb') as f:
+        scaler = pickle.load(f)
+    with open(os.path.join(models_dir, "selected_features.json"), 'r') as f:
+        selected_features = json.load(f)
+
+    engine = CompiledGradientBoosting.from_sklearn(model, scaler)
+    error = engine.max_abs_error(model, scaler)
+    if error > tolerance:
+        progress(f"⚠️  {models_dir}: compiled engine differs from sklearn by {error:.2e}, not written")
+        return None
+
+    path = os.path.join(models_dir, ARTIFACT_NAME)
+    n_features = engine.n_features
+    mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(n_features)
+    scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n_features)
+    write_artifact(path, engine, selected_features, mean, scale, source_digests(models_dir), error,
+                   source_stats(models_dir))
+    progress(f"💾 Compiled artifact written to {path} ({os.path.getsize(path) / 1024:.0f} KB)")
+    return path
@@ -0,0 +1,201 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.predictor import GradePredictor, DEFAULT_MODELS_DIR
+
+# Artifacts every model version directory must contain
+REQUIRED_FILES = [
+    "improved_feature_model.pkl",
+    "feature_scaler.pkl",
+    "selected_features.json",
+    "improved_model_metadata.json"
+]
+
+# Name of the version served straight from the models root (the original flat layout)
+BASE_VERSION = "base"
+
+# Record scored once on every freshly loaded predictor before it goes live
+WARMUP_RECORD = {
+    'student': {'cgpa': 8.0, 'attendance': 85.0, 'previous_avg': 8.0, 'branch_code': 'CSE'},
+    'course': {'difficulty_level': 3, 'credits': 3, 'theory_weight': 0.6, 'domain_tags': 'ML'},
+    'interests': ['ML']
+}
+
+
+def _natural_key(name):
+    """Sort v2 before v10"""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+
+class ModelRegistry:
+    """
+    Versioned model directories with atomic hot swap
+
+    Layout:
+        <root>/                     artifacts of the 'base' version
+        <root>/versions/<version>/  one directory per additional version
+
+    The live predictor is a single attribute (`active`). Request handlers read
+    it once per request, so swapping in a new version never disturbs requests
+    that are already running on the old one.
+    """
+
+    def __init__(self, root_dir=DEFAULT_MODELS_DIR, **predictor_kwargs):
+        self.root_dir = root_dir
+        self.versions_dir = os.path.join(root_dir, "versions")
+        self.predictor_kwargs = predictor_kwargs
+
+        self.active = None
+        self.active_version = None
+        self.previous = None
+        self.previous_version = None
+
+        self.loading_version = None
+        self.last_error = None
+        self.load_times = {}
+        # Optional callable(version) run after every swap (the pre-fork server tells the other workers)
+        self.on_swap = None
+        self._load_lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+
+    @staticmethod
+    def _is_complete(path):
+        return all(os.path.exists(os.path.join(path, name)) for name in REQUIRED_FILES)
+
+    def list_versions(self):
+        """All complete model versions, oldest first"""
+        versions = []
+        if self._is_complete(self.root_dir):
+            versions.append(BASE_VERSION)
+        if os.path.isdir(self.versions_dir):
+            names = [name for name in os.listdir(self.versions_dir)
+                     if self._is_complete(os.path.join(self.versions_dir, name))]
+            versions.extend(sorted(names, key=_natural_key))
+        return versions
+
+    def latest_version(self):
+        """Newest available version"""
+        versions = self.list_versions()
+        if not versions:
+            raise FileNotFoundError(f"No model versions found under {self.root_dir}")
+        return versions[-1]
+
+    def version_path(self, version):
+        """Directory holding the artifacts of a version"""
+        if version == BASE_VERSION:
+            return self.root_dir
+        if not version or os.path.basename(version) != version or version.startswith('.'):
+            raise ValueError(f"Invalid model version name: {version!r}")
+        return os.path.join(self.versions_dir, version)
+
+    def validate(self, version):
+        """
+        Check that a version directory is complete and self-consistent
+
+        Raises ValueError when selected_features.json disagrees with the
+        features recorded in the metadata.
+        """
+        path = self.version_path(version)
+        missing = [name for name in REQUIRED_FILES if not os.path.exists(os.path.join(path, name))]
+        if missing:
+            raise ValueError(f"Version '{version}' is missing {', '.join(missing)}")
+
+        with open(os.path.join(path, "selected_features.json"), 'r') as f:
+            selected_features = json.load(f)
+        with open(os.path.join(path, "improved_model_metadata.json"), 'r') as f:
+            metadata = json.load(f)
+
+        features_used = metadata.get('features_used')
+        if features_used is not None and features_used != selected_features:
+            raise ValueError(
+                f"Version '{version}': selected_features.json does not match metadata features_used"
+            )
+
+    def load(self, version):
+        """Validate, load and warm up a version without making it live"""
+        self.validate(version)
+        start = time.perf_counter()
+
+        predictor = GradePredictor(self.version_path(version), **self.predictor_kwargs)
+        predictor.model_version = version
+
+        # Versions may share the catalog kept at the models root
+        root_catalog = os.path.join(self.root_dir, "course_catalog.json")
+        if predictor.catalog is None and os.path.exists(root_catalog):
+            predictor.load_catalog(root_catalog)
+
+        predictor.predict_batch([WARMUP_RECORD], observe=False)
+        self.load_times[version] = time.perf_counter() - start
+        return predictor
+
+    def activate(self, version=None):
+        """Load a version and atomically make it the live predictor"""
+        version = version or self.latest_version()
+        with self._load_lock:
+            self.loading_version = version
+            try:
+                predictor = self.load(version)
+            except Exception as e:
+                self.last_error = f"{version}: {e}"
+                raise
+            finally:
+                self.loading_version = None
+
+            with self._swap_lock:
+                if self.active is not None:
+                    self.previous, self.previous_version = self.active, self.active_version
+                self.active, self.active_version = predictor, version
+            self.last_error = None
+
+        print(f"🔄 Model version '{version}' is now active")
+        if self.on_swap is not None:
+            self.on_swap(version)
+        return predictor
+
+    def activate_async(self, version):
+        """
+        Load a version on a background thread and swap it in when ready
+
+        Returns False if another load is already running.
+        """
+        if self._load_lock.locked():
+            return False
+        self.validate(version)
+
+        def worker():
+            try:
+                self.activate(version)
+            except Exception as e:
+                print(f"❌ Failed to activate model version '{version}': {e}")
+
+        threading.Thread(target=worker, name=f"model-load-{version}", daemon=True).start()
+        return True
+
+    def rollback(self):
+        """Swap the previous version back in"""
+        with self._swap_lock:
+            if self.previous is None:
+                raise ValueError("No previous model version to roll back to")
+            self.active, self.previous = self.previous, self.active
+            self.active_version, self.previous_version = self.previous_version, self.active_version
+        version = self.active_version
+        print(f"↩️  Rolled back to model version '{version}'")
+        if self.on_swap is not None:
+            self.on_swap(version)
+        return version
+
+    def status(self):
+        """Summary for /health and the admin endpoints"""
+        return {
+            'active_version': self.active_version,
+            'previous_version': self.previous_version,
+            'loading_version': self.loading_version,
+            'last_error': self.last_error,
+            'available_versions': self.list_versions(),
+            'load_seconds': self.load_times
+        }
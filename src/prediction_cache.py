@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache for single predictions
+
+    Keys are a normalized form of the student, course and interest inputs:
+    floats are quantized to `precision` decimal places, strings are stripped
+    and interests are treated as an unordered set. Entries older than
+    `ttl_seconds` (if set) are dropped on access.
+    """
+
+    STUDENT_FLOATS = ('cgpa', 'attendance', 'previous_avg')
+    COURSE_FLOATS = ('difficulty_level', 'credits', 'theory_weight')
+
+    def __init__(self, max_entries=10000, ttl_seconds=None, precision=2):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.precision = precision
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def make_key(self, student_data, course_data, interests_data):
+        """Normalized, hashable key for one prediction request"""
+        if isinstance(interests_data, str):
+            interests_data = interests_data.split(',')
+        return (
+            tuple(round(float(student_data[key]), self.precision) for key in self.STUDENT_FLOATS),
+            str(student_data['branch_code']).strip(),
+            tuple(round(float(course_data[key]), self.precision) for key in self.COURSE_FLOATS),
+            str(course_data['domain_tags']).strip(),
+            tuple(sorted({str(interest).strip() for interest in interests_data} - {''})),
+            # Feature store aggregates change as grades arrive
+            student_data.get('grade_consistency'),
+            course_data.get('course_avg_grade')
+        )
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store value, evicting the least recently used entry when full"""
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry, e.g. after the model artifacts change"""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def reset_stats(self):
+        """Zero the counters but keep the entries (e.g. after warm-up requests)"""
+        with self._lock:
+            self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def stats(self):
+        """Counters used to size the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'precision': self.precision,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
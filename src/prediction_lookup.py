@@ -0,0 +1,417 @@
+import bisect
+import json
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src.feature_plan import KERNELS, KERNEL_INPUTS, NUMERIC_COLUMNS, AGGREGATE_DEFAULTS, normalize_columns, \
+    parse_interests
+from src.feature_store import DEFAULT_COURSE_AVG_GRADE, DEFAULT_DATA_DIR, DEFAULT_GRADE_CONSISTENCY
+from src.model_artifact import source_digests
+
+# Files written next to the model
+LOOKUP_TENSOR = "prediction_lookup.npy"
+LOOKUP_SPEC = "prediction_lookup.json"
+
+# Grid of every numeric input. Interpolated axes are evaluated between grid
+# points, the others only accept the listed values exactly. Inputs outside
+# the grid (including aggregates other than their defaults) use the model.
+DEFAULT_GRID = {
+    'cgpa': {'min': 5.0, 'max': 10.0, 'step': 0.5},
+    'attendance': {'min': 50.0, 'max': 100.0, 'step': 5.0},
+    'previous_avg': {'min': 5.0, 'max': 10.0, 'step': 0.5},
+    'theory_weight': {'min': 0.3, 'max': 0.9, 'step': 0.1},
+    'difficulty_level': {'values': [1, 2, 3, 4, 5], 'exact': True},
+    'credits': {'values': [2, 3, 4], 'exact': True},
+    'grade_consistency': {'values': [DEFAULT_GRADE_CONSISTENCY], 'exact': True},
+    'course_avg_grade': {'values': [DEFAULT_COURSE_AVG_GRADE], 'exact': True},
+}
+# Largest tensor build_lookup agrees to allocate (cells)
+MAX_CELLS = 200_000_000
+# Coordinates closer than this to a grid value count as on it
+EXACT_TOLERANCE = 1e-9
+
+
+def _feature_kind(feature):
+    """'flag', 'branch_code', 'domain_tags' (one-hot members) or 'numeric'"""
+    if feature == 'domain_match' or feature.startswith('interest_'):
+        return 'flag'
+    if feature.startswith('branch_'):
+        return 'branch_code'
+    if feature.startswith('domain_'):
+        return 'domain_tags'
+    return 'numeric'
+
+
+def _feature_axes(feature):
+    """Names of the lookup axes a model feature is computed from"""
+    kind = _feature_kind(feature)
+    if kind == 'flag':
+        return (feature,)
+    if kind == 'numeric':
+        return KERNEL_INPUTS[feature]
+    return (kind,)
+
+
+def _axis_values(spec):
+    """Grid values of one numeric axis spec"""
+    if 'values' in spec:
+        return np.asarray(sorted(spec['values']), dtype=np.float64)
+    steps = int(round((spec['max'] - spec['min']) / spec['step']))
+    return np.round(np.linspace(spec['min'], spec['max'], steps + 1), 10)
+
+
+class PredictionLookup:
+    """
+    Model predictions precomputed on a dense grid of the raw inputs
+
+    Axes are the numeric inputs the selected features read, one 0/1 axis per
+    flag feature (domain_match, interest_*) and a category axis for branch
+    and course domain one-hots. A row is served by locating its cell on
+    every axis and interpolating multilinearly between the 2^k corners of
+    the k interpolated axes. Rows with any coordinate off the grid are
+    reported as not covered and must be predicted by the model.
+    """
+
+    def __init__(self, axes, tensor, features, report=None):
+        self.axes = axes
+        self.tensor = tensor
+        self.features = list(features)
+        self.report = report or {}
+
+        self.flat = tensor.reshape(-1)
+        self.strides = np.array([int(np.prod(tensor.shape[i + 1:], dtype=np.int64))
+                                 for i in range(tensor.ndim)], dtype=np.intp)
+        self.interpolated = [i for i, axis in enumerate(axes) if not axis['exact'] and len(axis['values']) > 1]
+        # Stride offset and per-axis corner bit of each of the 2^k interpolation corners
+        bits = (np.arange(1 << len(self.interpolated))[:, None] >> np.arange(len(self.interpolated))) & 1
+        self.corner_bits = bits.astype(bool)
+        self.corner_offsets = (bits * self.strides[self.interpolated]).sum(axis=1) if self.interpolated \
+            else np.zeros(1, dtype=np.intp)
+
+        # Python copies for the scalar predict_row path
+        self._value_lists = [axis['values'].tolist() for axis in axes]
+        self._stride_list = self.strides.tolist()
+        self._interpolated_set = set(self.interpolated)
+        self._corners = list(zip(self.corner_offsets.tolist(), self.corner_bits.tolist()))
+
+    @staticmethod
+    def axes_for(features, grid=None):
+        """Axis definitions needed to cover a feature list"""
+        grid = dict(DEFAULT_GRID, **(grid or {}))
+        numeric = []
+        flags = []
+        categories = {}
+        for feature in features:
+            kind = _feature_kind(feature)
+            if kind == 'flag':
+                flags.append(feature)
+            elif kind != 'numeric':
+                categories.setdefault(kind, []).append(feature.split('_', 1)[1])
+            else:
+                for field in KERNEL_INPUTS[feature]:
+                    if field not in grid:
+                        raise ValueError(f"No lookup grid for input '{field}'")
+                    if field not in numeric:
+                        numeric.append(field)
+
+        axes = []
+        for field in NUMERIC_COLUMNS + list(AGGREGATE_DEFAULTS):
+            if field in numeric:
+                spec = grid[field]
+                axes.append({'name': field, 'kind': 'numeric', 'exact': bool(spec.get('exact', False)),
+                             'values': _axis_values(spec)})
+        for field, members in categories.items():
+            # Codes 0..k-1 for the one-hot members, k for any other value
+            axes.append({'name': field, 'kind': 'category', 'exact': True, 'categories': members,
+                         'values': np.arange(len(members) + 1, dtype=np.float64)})
+        for feature in flags:
+            axes.append({'name': feature, 'kind': 'flag', 'exact': True, 'values': np.array([0.0, 1.0])})
+        return axes
+
+    @staticmethod
+    def feature_matrix(axes, features, coords):
+        """Model feature matrix for grid coordinates (n_rows, n_axes)"""
+        index = {axis['name']: i for i, axis in enumerate(axes)}
+        columns = {axis['name']: coords[:, i] for i, axis in enumerate(axes) if axis['kind'] == 'numeric'}
+        matrix = np.empty((len(coords), len(features)))
+        for j, feature in enumerate(features):
+            kind = _feature_kind(feature)
+            if kind == 'flag':
+                matrix[:, j] = coords[:, index[feature]]
+            elif kind != 'numeric':
+                code = axes[index[kind]]['categories'].index(feature.split('_', 1)[1])
+                matrix[:, j] = coords[:, index[kind]] == code
+            else:
+                matrix[:, j] = KERNELS[feature][1](columns)
+        return matrix
+
+    def coordinates(self, columns):
+        """Grid coordinates (n_rows, n_axes) of normalized input columns (see normalize_columns)"""
+        coords = np.empty((len(columns['cgpa']), len(self.axes)))
+        for i, axis in enumerate(self.axes):
+            if axis['kind'] == 'numeric':
+                coords[:, i] = columns[axis['name']]
+            elif axis['kind'] == 'flag':
+                coords[:, i] = KERNELS[axis['name']][1](columns)
+            else:
+                codes = np.full(len(coords), len(axis['categories']), dtype=np.float64)
+                for code, member in enumerate(axis['categories']):
+                    codes[columns[axis['name']] == member] = code
+                coords[:, i] = codes
+        return coords
+
+    def predict_columns(self, columns):
+        """
+        Interpolated raw predictions for normalized input columns
+
+        Returns:
+        (predictions, covered) - covered is False for rows off the grid, whose
+        prediction is meaningless and must come from the model
+        """
+        return self.interpolate(self.coordinates(columns))
+
+    def predict_row(self, student_data, course_data, interests_data):
+        """
+        Interpolated raw prediction for one record, or None when it is off the grid
+
+        Plain Python on scalars: for a single row this is several times
+        cheaper than the vectorized path.
+        """
+        interests = parse_interests(interests_data)
+        base = 0
+        fractions = []
+        for i, axis in enumerate(self.axes):
+            name = axis['name']
+            if axis['kind'] == 'numeric':
+                if name in AGGREGATE_DEFAULTS:
+                    source = student_data if name == 'grade_consistency' else course_data
+                    x = float(source.get(name, AGGREGATE_DEFAULTS[name]))
+                else:
+                    x = float(student_data[name] if name in student_data else course_data[name])
+            elif axis['kind'] == 'flag':
+                x = KERNELS[name][0](student_data, course_data, interests)
+            else:
+                value = (student_data if name == 'branch_code' else course_data)[name]
+                categories = axis['categories']
+                x = categories.index(value) if value in categories else len(categories)
+
+            values = self._value_lists[i]
+            if i in self._interpolated_set:
+                if not values[0] - EXACT_TOLERANCE <= x <= values[-1] + EXACT_TOLERANCE:
+                    return None
+                cell = min(max(bisect.bisect_right(values, x) - 1, 0), len(values) - 2)
+                fractions.append(min(max((x - values[cell]) / (values[cell + 1] - values[cell]), 0.0), 1.0))
+            else:
+                cell = bisect.bisect_left(values, x - EXACT_TOLERANCE)
+                if cell == len(values) or abs(values[cell] - x) > EXACT_TOLERANCE:
+                    return None
+            base += cell * self._stride_list[i]
+
+        prediction = 0.0
+        for offset, bits in self._corners:
+            weight = 1.0
+            for fraction, bit in zip(fractions, bits):
+                weight *= fraction if bit else 1.0 - fraction
+            if weight:
+                prediction += weight * float(self.flat[base + offset])
+        return prediction
+
+    def interpolate(self, coords):
+        """Multilinear interpolation at grid coordinates; returns (values, covered)"""
+        n_rows = len(coords)
+        base = np.zeros(n_rows, dtype=np.intp)
+        covered = np.ones(n_rows, dtype=bool)
+        fractions = []
+        for i, axis in enumerate(self.axes):
+            values = axis['values']
+            x = coords[:, i]
+            if i in self.interpolated:
+                covered &= (x >= values[0] - EXACT_TOLERANCE) & (x <= values[-1] + EXACT_TOLERANCE)
+                cell = np.clip(np.searchsorted(values, x, side='right') - 1, 0, len(values) - 2)
+                fractions.append(np.clip((x - values[cell]) / (values[cell + 1] - values[cell]), 0.0, 1.0))
+            else:
+                cell = np.minimum(np.searchsorted(values, x - EXACT_TOLERANCE), len(values) - 1)
+                covered &= np.abs(values[cell] - x) <= EXACT_TOLERANCE
+            base += cell * self.strides[i]
+        base[~covered] = 0
+
+        corners = self.flat[base[:, None] + self.corner_offsets]
+        if not fractions:
+            return corners[:, 0].astype(np.float64), covered
+        fractions = np.stack(fractions, axis=1)
+        # weight of a corner = prod over axes of (f if its bit is set else 1 - f)
+        weights = np.where(self.corner_bits[None, :, :], fractions[:, None, :], 1.0 - fractions[:, None, :])
+        return (corners * weights.prod(axis=2)).sum(axis=1), covered
+
+    @classmethod
+    def build(cls, engine, features, grid=None, progress=print):
+        """
+        Fill the tensor from a compiled engine
+
+        Trees are evaluated on the grid as a whole: every split becomes a
+        comparison on the (small) grid of its feature's own axes, and the two
+        subtrees are merged with np.where, so arrays only grow to the axes a
+        subtree actually reads. Each tree is then broadcast-added into the
+        tensor; no cell is walked through a tree.
+        """
+        axes = cls.axes_for(features, grid)
+        shape = tuple(len(axis['values']) for axis in axes)
+        cells = int(np.prod(shape, dtype=np.int64))
+        if cells > MAX_CELLS:
+            raise ValueError(f"Lookup grid has {cells:,} cells (limit {MAX_CELLS:,}), use a coarser grid")
+        progress(f"🧮 Lookup grid {' x '.join(map(str, shape))} = {cells:,} cells "
+                 f"({cells * 4 / 1024 / 1024:.0f} MB)")
+
+        # Every feature's values on the grid of just the axes it reads, shaped to broadcast
+        feature_grids = []
+        for j, feature in enumerate(features):
+            used = [i for i, axis in enumerate(axes) if axis['name'] in _feature_axes(feature)]
+            sub_shape = [len(axes[i]['values']) if i in used else 1 for i in range(len(axes))]
+            grids = np.meshgrid(*[axis['values'] if i in used else axis['values'][:1]
+                                  for i, axis in enumerate(axes)], indexing='ij')
+            coords = np.stack([grid.ravel() for grid in grids], axis=1)
+            feature_grids.append(cls.feature_matrix(axes, features, coords)[:, j].reshape(sub_shape))
+
+        total = np.full(shape, engine.init_value)
+        for root in engine.roots:
+            total += _tree_grid(engine, root, feature_grids)
+        return cls(axes, total.astype(np.float32), features)
+
+    def evaluate(self, engine, plan, columns):
+        """Error of the interpolated predictions against the exact engine on sample rows"""
+        predictions, covered = self.predict_columns(columns)
+        exact = engine.predict(plan.build_matrix(columns))
+        error = np.abs(predictions[covered] - exact[covered])
+        served = np.abs(np.clip(np.round(predictions[covered], 2), 5.0, 10.0)
+                        - np.clip(np.round(exact[covered], 2), 5.0, 10.0))
+        return {
+            'rows': int(len(exact)),
+            'covered_fraction': float(covered.mean()) if len(exact) else 0.0,
+            'max_abs_error': float(error.max()) if len(error) else 0.0,
+            'mean_abs_error': float(error.mean()) if len(error) else 0.0,
+            'p99_abs_error': float(np.percentile(error, 99)) if len(error) else 0.0,
+            'max_served_grade_error': float(served.max()) if len(served) else 0.0
+        }
+
+    def save(self, models_dir, sources=None):
+        """Write the tensor (.npy, memory-mappable) and its axis spec"""
+        np.save(os.path.join(models_dir, LOOKUP_TENSOR), self.tensor)
+        spec = {
+            'features': self.features,
+            'axes': [dict(axis, values=axis['values'].tolist()) for axis in self.axes],
+            'sources': sources if sources is not None else source_digests(models_dir),
+            'report': self.report
+        }
+        with open(os.path.join(models_dir, LOOKUP_SPEC), 'w') as f:
+            json.dump(spec, f, indent=2)
+
+    @classmethod
+    def load(cls, models_dir):
+        """Memory-map a saved lookup; returns (lookup, sources it was built from)"""
+        with open(os.path.join(models_dir, LOOKUP_SPEC), 'r') as f:
+            spec = json.load(f)
+        axes = [dict(axis, values=np.asarray(axis['values'], dtype=np.float64)) for axis in spec['axes']]
+        tensor = np.load(os.path.join(models_dir, LOOKUP_TENSOR), mmap_mode='r')
+        return cls(axes, tensor, spec['features'], spec.get('report')), spec.get('sources')
+
+
+def _tree_grid(engine, node, feature_grids):
+    """Values of the subtree under node on the grid (broadcastable array or scalar)"""
+    left, right = engine.left[node], engine.right[node]
+    if left == node:
+        return engine.value[node]
+    # Rows go left when x <= threshold
+    goes_left = feature_grids[engine.feature[node]] <= engine.threshold[node]
+    return np.where(goes_left, _tree_grid(engine, left, feature_grids), _tree_grid(engine, right, feature_grids))
+
+
+def training_columns(models_dir, data_dir=DEFAULT_DATA_DIR, root_dir=None):
+    """
+    Input columns of the model's train pairs (id_mappings.json) from the feature store tables
+
+    Returns None when data_dir or the id mappings are missing. Pairs whose
+    student or course the tables do not know are left out.
+    """
+    from src.feature_store import FeatureStore
+    from src.id_mappings import load_id_mappings
+
+    if not data_dir or not os.path.isdir(data_dir):
+        return None
+    try:
+        mappings = load_id_mappings(models_dir, root_dir)
+    except FileNotFoundError:
+        return None
+    store = FeatureStore.from_csv(data_dir)
+    student_ids, course_ids = mappings.pairs('train')
+    known = np.isin(student_ids, store.student_ids) & np.isin(course_ids, store.course_ids)
+    if not known.any():
+        return None
+    return normalize_columns(store.fill_columns({'student_id': student_ids[known], 'course_id': course_ids[known]}))
+
+
+def sample_columns(n_students=2000, n_courses=30, seed=0):
+    """
+    Synthetic input columns (src/synthetic_data.py, default aggregates)
+
+    Stand-in rows for models without their training data at hand: they share
+    the input layout but not the distribution of the data the model was
+    trained on.
+    """
+    from src.synthetic_data import generate_dataset
+
+    dataset = generate_dataset(n_students, n_courses, seed=seed)
+    grades = dataset['grades']
+    students = dataset['students'].set_index('student_id').loc[grades['student_id']]
+    courses = dataset['courses'].set_index('course_id').loc[grades['course_id']]
+    interests = dataset['interests'].groupby('student_id')['domain'].apply(list)
+    raw = {key: (students[key] if key in students else courses[key]).to_numpy() for key in NUMERIC_COLUMNS}
+    raw['branch_code'] = students['branch_code'].to_numpy()
+    raw['domain_tags'] = courses['domain_tags'].to_numpy()
+    raw['interests'] = [interests.get(student_id, []) for student_id in grades['student_id']]
+    for key, default in AGGREGATE_DEFAULTS.items():
+        raw[key] = np.full(len(grades), default)
+    return normalize_columns(raw)
+
+
+def build_lookup(models_dir, grid=None, sample_students=2000, data_dir=DEFAULT_DATA_DIR, root_dir=None,
+                 progress=print):
+    """
+    Build, check and save the lookup tensor of a model directory
+
+    The error is measured on the model's train pairs when data_dir holds the
+    feature store tables, otherwise on synthetic rows (sample_columns), which
+    do not follow the training distribution; report['sample_source'] says
+    which.
+
+    Returns:
+    the error report (also stored in prediction_lookup.json)
+    """
+    from src.predictor import GradePredictor
+
+    predictor = GradePredictor(models_dir, cache_size=0, monitor_drift=False)
+    if predictor.engine is None:
+        raise ValueError("The lookup tensor needs a model the compiled engine supports")
+    start = time.perf_counter()
+    lookup = PredictionLookup.build(predictor.engine, predictor.selected_features, grid, progress)
+    build_seconds = time.perf_counter() - start
+
+    columns = training_columns(models_dir, data_dir, root_dir)
+    sample_source = 'training'
+    if columns is None:
+        columns, sample_source = sample_columns(sample_students), 'synthetic'
+    lookup.report = lookup.evaluate(predictor.engine, predictor.feature_plan, columns)
+    lookup.report['sample_source'] = sample_source
+    lookup.report['build_seconds'] = build_seconds
+    lookup.save(models_dir)
+    report = lookup.report
+    progress(f"💾 Lookup tensor written to {os.path.join(models_dir, LOOKUP_TENSOR)} in {build_seconds:.1f}s")
+    rows = ("training-pair rows" if sample_source == 'training'
+            else "synthetic rows (not the training distribution)")
+    progress(f"📏 On {report['rows']:,} {rows} ({report['covered_fraction']:.1%} on the grid): "
+             f"max error {report['max_abs_error']:.4f}, mean {report['mean_abs_error']:.4f}, "
+             f"p99 {report['p99_abs_error']:.4f} grade points")
+    return report
@@ -0,0 +1,282 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src.id_mappings import load_id_mappings
+from src.model_artifact import source_digests
+
+# Materialized views live in views/ at the repository root
+DEFAULT_VIEWS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "views")
+MATRIX_FILE = "prediction_matrix.f32"
+MATRIX_META = "prediction_matrix.json"
+# Students predicted per batch call while (re)building
+BUILD_CHUNK_STUDENTS = 1024
+
+
+def load_cohort_ids(models_dir, root_dir=None):
+    """Sorted unique student and course IDs of a model's id mappings (train and test)"""
+    mappings = load_id_mappings(models_dir, root_dir)
+    return mappings.student_ids.tolist(), mappings.course_ids.tolist()
+
+
+def _store_fingerprint(store, student_ids, course_ids):
+    """Hash of every store value the matrix cells depend on"""
+    student_codes = store.student_codes(student_ids)
+    course_codes = store.course_codes(course_ids)
+    digest = hashlib.sha256()
+    for values in ([store.student_columns[key][student_codes] for key in sorted(store.student_columns)]
+                   + [store.interest_mask[student_codes], store.grade_consistency(student_codes)]
+                   + [store.course_columns[key][course_codes] for key in sorted(store.course_columns)]
+                   + [store.course_avg_grade(course_codes)]):
+        digest.update(np.ascontiguousarray(values).tobytes())
+    for labels in (store.branch_code[student_codes], store.domain_tags[course_codes]):
+        digest.update("\0".join(map(str, labels)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class PredictionMatrix:
+    """
+    Materialized student x course predicted grades
+
+    The matrix is a float32 file memory-mapped from view_dir, rows in
+    student_ids order and columns in course_ids order (by default the IDs of
+    the model's id_mappings.json). It is filled with batched predictions
+    through the feature store; afterwards a changed student only recomputes
+    its row and a changed course its column. A different model version (or
+    different model files) triggers a full rebuild, done into a new file
+    that replaces the old one, so readers never see a half-built matrix.
+    """
+
+    def __init__(self, feature_store, student_ids, course_ids, view_dir=DEFAULT_VIEWS_DIR):
+        self.feature_store = feature_store
+        self.view_dir = view_dir
+        self.student_ids = list(student_ids)
+        self.course_ids = list(course_ids)
+        self._index()
+
+        self.grades = None
+        self.model_key = None
+        self.built_at = None
+        self.build_seconds = None
+        self.row_refreshes = 0
+        self.column_refreshes = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_predictor(cls, predictor, view_dir=DEFAULT_VIEWS_DIR, root_dir=None):
+        """Matrix over the cohort of a predictor's id_mappings.json, reusing a saved one when still valid"""
+        if predictor.feature_store is None:
+            raise ValueError("The prediction matrix needs a feature store")
+        student_ids, course_ids = load_cohort_ids(predictor.models_dir, root_dir)
+        # Only IDs the store knows can be predicted
+        store = predictor.feature_store
+        student_ids = [s for s in student_ids if store.has_student(s)]
+        known_courses = set(store.course_ids.tolist())
+        course_ids = [c for c in course_ids if c in known_courses]
+
+        matrix = cls(store, student_ids, course_ids, view_dir)
+        if not matrix._open_saved(predictor):
+            matrix.rebuild(predictor)
+        return matrix
+
+    def _index(self):
+        self.student_index = {student_id: i for i, student_id in enumerate(self.student_ids)}
+        self.course_index = {course_id: j for j, course_id in enumerate(self.course_ids)}
+
+    @staticmethod
+    def _model_key(predictor):
+        return {'models_dir': os.path.abspath(predictor.models_dir), 'model_version': predictor.model_version,
+                'sources': source_digests(predictor.models_dir)}
+
+    def _paths(self):
+        return os.path.join(self.view_dir, MATRIX_FILE), os.path.join(self.view_dir, MATRIX_META)
+
+    def _open_saved(self, predictor):
+        """Map the saved matrix if it was built for this model, cohort and store contents"""
+        matrix_path, meta_path = self._paths()
+        if not (os.path.exists(matrix_path) and os.path.exists(meta_path)):
+            return False
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        model_key = self._model_key(predictor)
+        if (meta.get('model') != model_key or meta.get('student_ids') != self.student_ids
+                or meta.get('course_ids') != self.course_ids
+                or meta.get('store') != _store_fingerprint(self.feature_store, self.student_ids, self.course_ids)):
+            return False
+        self.grades = np.memmap(matrix_path, dtype=np.float32, mode='r+',
+                                shape=(len(self.student_ids), len(self.course_ids)))
+        self.model_key = model_key
+        self.built_at = meta.get('built_at')
+        print(f"📐 Prediction matrix reused ({len(self.student_ids)} x {len(self.course_ids)})")
+        return True
+
+    def _save_meta(self):
+        _, meta_path = self._paths()
+        meta = {
+            'model': self.model_key,
+            'student_ids': self.student_ids,
+            'course_ids': self.course_ids,
+            'store': _store_fingerprint(self.feature_store, self.student_ids, self.course_ids),
+            'built_at': self.built_at
+        }
+        temp_path = f"{meta_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(temp_path, meta_path)
+
+    def _predict(self, predictor, student_ids, course_ids):
+        """(len(student_ids), len(course_ids)) grades in one batched call (kept out of drift monitoring)"""
+        grades = predictor.predict_batch({
+            'student_id': np.repeat(np.asarray(student_ids, dtype=object), len(course_ids)),
+            'course_id': np.tile(np.asarray(course_ids, dtype=object), len(student_ids))
+        }, observe=False)
+        return grades.reshape(len(student_ids), len(course_ids))
+
+    # Writes
+
+    def rebuild(self, predictor, student_ids=None, course_ids=None):
+        """Recompute every cell (optionally over new IDs) into a fresh file and swap it in"""
+        with self._lock:
+            start = time.perf_counter()
+            student_ids = list(student_ids if student_ids is not None else self.student_ids)
+            course_ids = list(course_ids if course_ids is not None else self.course_ids)
+            os.makedirs(self.view_dir, exist_ok=True)
+            matrix_path, _ = self._paths()
+            # Per-process temporary file: forked server workers may rebuild at the same time
+            temp_path = f"{matrix_path}.{os.getpid()}.tmp"
+            shape = (len(student_ids), len(course_ids))
+            grades = np.memmap(temp_path, dtype=np.float32, mode='w+', shape=shape) if all(shape) else None
+            for start_row in range(0, shape[0] if grades is not None else 0, BUILD_CHUNK_STUDENTS):
+                rows = student_ids[start_row:start_row + BUILD_CHUNK_STUDENTS]
+                grades[start_row:start_row + len(rows)] = self._predict(predictor, rows, course_ids)
+            if grades is not None:
+                grades.flush()
+                os.replace(temp_path, matrix_path)
+                grades = np.memmap(matrix_path, dtype=np.float32, mode='r+', shape=shape)
+            else:
+                grades = np.zeros(shape, dtype=np.float32)
+
+            self.student_ids, self.course_ids = student_ids, course_ids
+            self._index()
+            self.grades = grades
+            self.model_key = self._model_key(predictor)
+            self.built_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+            self.build_seconds = time.perf_counter() - start
+            self._save_meta()
+        print(f"📐 Prediction matrix built: {shape[0]} x {shape[1]} in {self.build_seconds:.2f}s")
+
+    def ensure_current(self, predictor):
+        """Rebuild when the predictor is not the model the matrix was built with"""
+        model_key = self.model_key or {}
+        if (model_key.get('models_dir') != os.path.abspath(predictor.models_dir)
+                or model_key.get('model_version') != predictor.model_version):
+            self.rebuild(predictor)
+            return True
+        return False
+
+    def refresh_students(self, predictor, student_ids):
+        """Recompute the rows of changed students (students new to the matrix trigger a rebuild)"""
+        student_ids = list(dict.fromkeys(str(s) for s in student_ids))
+        while True:
+            new = [s for s in student_ids if s not in self.student_index]
+            if new:
+                self.rebuild(predictor, student_ids=self.student_ids + new)
+                return len(student_ids)
+            grades, course_ids = self.grades, self.course_ids
+            if not (student_ids and course_ids):
+                return len(student_ids)
+            predictions = self._predict(predictor, student_ids, course_ids)
+            with self._lock:
+                # A rebuild while predicting swaps the matrix and its index: predict again against the new one
+                if self.grades is grades and all(s in self.student_index for s in student_ids):
+                    rows = [self.student_index[s] for s in student_ids]
+                    self.grades[rows] = predictions
+                    self.row_refreshes += len(rows)
+                    self._flush()
+                    return len(rows)
+
+    def refresh_courses(self, predictor, course_ids):
+        """Recompute the columns of changed courses (new courses trigger a rebuild)"""
+        course_ids = list(dict.fromkeys(str(c) for c in course_ids))
+        while True:
+            new = [c for c in course_ids if c not in self.course_index]
+            if new:
+                self.rebuild(predictor, course_ids=self.course_ids + new)
+                return len(course_ids)
+            grades, student_ids = self.grades, self.student_ids
+            if not (course_ids and student_ids):
+                return len(course_ids)
+            predictions = self._predict(predictor, student_ids, course_ids)
+            with self._lock:
+                if self.grades is grades and all(c in self.course_index for c in course_ids):
+                    columns = [self.course_index[c] for c in course_ids]
+                    self.grades[:, columns] = predictions
+                    self.column_refreshes += len(columns)
+                    self._flush()
+                    return len(columns)
+
+    def _flush(self):
+        if isinstance(self.grades, np.memmap):
+            self.grades.flush()
+            self._save_meta()
+
+    # Reads
+
+    def _positions(self, ids, index, kind):
+        if ids is None:
+            return None
+        unknown = [i for i in ids if i not in index]
+        if unknown:
+            raise KeyError(f"Unknown {kind}: {unknown[0]}")
+        return [index[i] for i in ids]
+
+    def slice(self, student_ids=None, course_ids=None):
+        """Sub-matrix for the given students / courses (None = all), with its row and column IDs"""
+        grades = self.grades
+        rows = self._positions(student_ids, self.student_index, 'student_id')
+        columns = self._positions(course_ids, self.course_index, 'course_id')
+        block = grades if rows is None else grades[rows]
+        block = block if columns is None else block[:, columns]
+        # float32 cells, rounded back to the 2 decimals predictions are served with
+        return {
+            'student_ids': self.student_ids if student_ids is None else list(student_ids),
+            'course_ids': self.course_ids if course_ids is None else list(course_ids),
+            'grades': np.round(np.asarray(block, dtype=np.float64), 2)
+        }
+
+    def top_courses(self, student_ids=None, n=5, course_ids=None):
+        """The n best predicted courses of each student, {student_id: [(course_id, grade)]}"""
+        block = self.slice(student_ids, course_ids)
+        n = min(n, len(block['course_ids']))
+        order = np.argsort(-block['grades'], axis=1, kind='stable')[:, :n]
+        return {
+            student_id: [(block['course_ids'][j], float(block['grades'][i, j])) for j in order[i]]
+            for i, student_id in enumerate(block['student_ids'])
+        }
+
+    def top_students(self, course_ids=None, n=10, student_ids=None):
+        """The n students with the highest predicted grade in each course, {course_id: [(student_id, grade)]}"""
+        block = self.slice(student_ids, course_ids)
+        n = min(n, len(block['student_ids']))
+        order = np.argsort(-block['grades'], axis=0, kind='stable')[:n]
+        return {
+            course_id: [(block['student_ids'][i], float(block['grades'][i, j])) for i in order[:, j]]
+            for j, course_id in enumerate(block['course_ids'])
+        }
+
+    def stats(self):
+        return {
+            'students': len(self.student_ids),
+            'courses': len(self.course_ids),
+            'model_version': (self.model_key or {}).get('model_version'),
+            'built_at': self.built_at,
+            'build_seconds': self.build_seconds,
+            'row_refreshes': self.row_refreshes,
+            'column_refreshes': self.column_refreshes
+        }
@@ -1,38 +1,119 @@
 import pickle
 import json
-import pandas as pd
 import numpy as np
 import os
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.feature_plan import (FeaturePlan, BRANCHES, DOMAINS, NUMERIC_COLUMNS, INPUT_COLUMNS,
+                              AGGREGATE_DEFAULTS, normalize_columns, parse_interests)
+from src.drift_monitor import DriftMonitor
+from src.feature_store import DEFAULT_COURSE_AVG_GRADE, DEFAULT_GRADE_CONSISTENCY
+from src.metrics import METRICS
+from src.model_artifact import ARTIFACT_NAME, is_fresh, load_engine, source_digests
+from src.prediction_cache import PredictionCache
+from src.prediction_lookup import PredictionLookup, LOOKUP_SPEC, LOOKUP_TENSOR
+from src.tree_engine import CompiledGradientBoosting, SUPPORTED_MODEL_TYPES
+from src.tree_explainer import TreeShapExplainer
+
+# Largest allowed difference between the compiled engine and sklearn
+ENGINE_TOLERANCE = 1e-6
+
+# Largest number of values per what-if axis (a 2-D sweep is at most this squared)
+MAX_WHATIF_STEPS = 200
+
+# Trained artifacts live in ML/ at the repository root
+DEFAULT_MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ML")
 
 class GradePredictor:
-    def __init__(self, models_dir="models"):
-        """Initialize the predictor with saved model, scaler, and feature list"""
+    # Raw input columns accepted by predict_batch
+    NUMERIC_COLUMNS = NUMERIC_COLUMNS
+    INPUT_COLUMNS = INPUT_COLUMNS
+    # Historical aggregates, filled from the feature store when IDs are given
+    AGGREGATE_DEFAULTS = AGGREGATE_DEFAULTS
+    
+    def __init__(self, models_dir=DEFAULT_MODELS_DIR, use_compiled_engine=True,
+                 cache_size=10000, cache_ttl=None, cache_precision=2, feature_store=None, use_artifact=True,
+                 use_lookup=False, monitor_drift=True):
+        """
+        Initialize the predictor with saved model, scaler, and feature list
+        
+        use_compiled_engine: evaluate supported models with the array-based
+        tree engine instead of sklearn (falls back to sklearn automatically)
+        use_artifact: load the engine from compiled_model.bin when it is present
+        and up to date; the sklearn pickles are then only read on first use
+        use_lookup: serve inputs on the grid of prediction_lookup.npy by interpolating
+        precomputed predictions (see run_cli.py lookup); other inputs use the model
+        cache_size: maximum cached predict_grade results (0 disables the cache)
+        cache_ttl: optional lifetime of a cached result in seconds
+        cache_precision: decimal places floats are rounded to in cache keys
+        feature_store: optional FeatureStore used to resolve student_id / course_id
+        monitor_drift: feed every prediction to a DriftMonitor when the model
+        directory has a drift_reference.json (see drift_monitor.py)
+        """
         self.models_dir = models_dir
-        self.load_models()
+        self.feature_store = feature_store
+        self.use_compiled_engine = use_compiled_engine
+        self.use_artifact = use_artifact
+        self.use_lookup = use_lookup
+        self.monitor_drift = monitor_drift
         
         # Domain list (should match training)
-        self.domains = ['AI', 'Web', 'DBMS', 'ML', 'Networks', 'Security', 'Data_Science', 'Cloud']
-        self.branches = ['CE', 'CSE', 'ECE', 'ME', 'EE']
+        self.domains = list(DOMAINS)
+        self.branches = list(BRANCHES)
+        
+        self._explainer_lock = threading.Lock()
+        self._pickle_lock = threading.Lock()
+        self.load_models()
+        
+        self.cache = PredictionCache(cache_size, cache_ttl, cache_precision) if cache_size else None
+        
+        # Course catalog used by recommend_courses (optional)
+        self.catalog = None
+        catalog_path = os.path.join(self.models_dir, "course_catalog.json")
+        if os.path.exists(catalog_path):
+            self.load_catalog(catalog_path)
     
     def load_models(self):
         """Load all required model files"""
         try:
-            model_path = os.path.join(self.models_dir, "improved_feature_model.pkl")
-            scaler_path = os.path.join(self.models_dir, "feature_scaler.pkl")
-            features_path = os.path.join(self.models_dir, "selected_features.json")
+            self.load_timings = {}
+            start = time.perf_counter()
             metadata_path = os.path.join(self.models_dir, "improved_model_metadata.json")
+            with open(metadata_path, 'r') as f:
+                self.metadata = json.load(f)
             
-            with open(model_path, 'rb') as f:
-                self.model = pickle.load(f)
+            # Set by ModelRegistry; standalone predictors use the metadata's version if any
+            self.model_version = self.metadata.get('model_version')
             
-            with open(scaler_path, 'rb') as f:
-                self.scaler = pickle.load(f)
+            # Unpickled on first access (see model / scaler) when the artifact is used
+            self._model = None
+            self._scaler = None
+            self.artifact_path = None
+            self.engine = self._load_artifact()
+            if self.engine is None:
+                with open(os.path.join(self.models_dir, "selected_features.json"), 'r') as f:
+                    self.selected_features = json.load(f)
+                self._load_pickles()
+            self.load_timings['read_files'] = time.perf_counter() - start
             
-            with open(features_path, 'r') as f:
-                self.selected_features = json.load(f)
+            # Only the selected features are computed; unknown names fail here
+            self.feature_plan = FeaturePlan(self.selected_features)
             
-            with open(metadata_path, 'r') as f:
-                self.metadata = json.load(f)
+            if self.engine is None:
+                start = time.perf_counter()
+                self.engine = self._compile_engine()
+                self.load_timings['compile_engine'] = time.perf_counter() - start
+            self.lookup = self._load_lookup() if self.use_lookup else None
+            self.drift_monitor = self._load_drift_monitor() if self.monitor_drift else None
+            # Explanation tables are built on the first explain() call
+            self.explainer = None
+            
+            # Cached predictions belong to the previous artifacts
+            if getattr(self, 'cache', None) is not None:
+                self.cache.clear()
             
             print("✅ Models loaded successfully!")
             print(f"📊 Model Type: {self.metadata['model_type']}")
@@ -42,6 +123,94 @@ class GradePredictor:
             print(f"❌ Error loading models: {e}")
             raise
     
+    def _load_artifact(self):
+        """Compiled engine from compiled_model.bin, or None to load the pickles instead"""
+        path = os.path.join(self.models_dir, ARTIFACT_NAME)
+        if not (self.use_artifact and self.use_compiled_engine and os.path.exists(path)):
+            return None
+        try:
+            engine, header = load_engine(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️  Compiled artifact unreadable, loading pickles: {e}")
+            return None
+        if not is_fresh(self.models_dir, header):
+            print("⚠️  Compiled artifact is older than the model files, loading pickles")
+            return None
+        self.selected_features = header['selected_features']
+        self.artifact_path = path
+        print("⚡ Compiled tree engine loaded from artifact")
+        return engine
+    
+    def _load_lookup(self):
+        """Memory-mapped prediction lookup tensor, or None when missing or stale"""
+        if not os.path.exists(os.path.join(self.models_dir, LOOKUP_SPEC)):
+            print("⚠️  No prediction lookup tensor, using the model for every input")
+            return None
+        start = time.perf_counter()
+        lookup, sources = PredictionLookup.load(self.models_dir)
+        if sources != source_digests(self.models_dir) or lookup.features != self.selected_features:
+            print("⚠️  Prediction lookup tensor was built for other model files, ignoring it")
+            return None
+        self.load_timings['load_lookup'] = time.perf_counter() - start
+        max_error = lookup.report.get('max_abs_error')
+        print(f"🧮 Prediction lookup tensor enabled"
+              + (f" (max error {max_error:.3f} on {lookup.report.get('sample_source', 'synthetic')} rows)"
+                 if max_error is not None else ""))
+        return lookup
+    
+    def _load_drift_monitor(self):
+        """DriftMonitor against the training profile, or None when there is none"""
+        try:
+            return DriftMonitor.for_predictor(self)
+        except (ValueError, KeyError) as e:
+            print(f"⚠️  Drift reference does not match the model, drift monitoring disabled: {e}")
+            return None
+    
+    def _load_pickles(self):
+        """Unpickle the sklearn model and scaler (imports sklearn)"""
+        with self._pickle_lock:
+            if self._model is not None:
+                return
+            start = time.perf_counter()
+            with open(os.path.join(self.models_dir, "feature_scaler.pkl"), 'rb') as f:
+                self._scaler = pickle.load(f)
+            with open(os.path.join(self.models_dir, "improved_feature_model.pkl"), 'rb') as f:
+                self._model = pickle.load(f)
+            self.load_timings['unpickle'] = time.perf_counter() - start
+    
+    @property
+    def model(self):
+        """The sklearn model (loaded lazily when serving from the compiled artifact)"""
+        if self._model is None:
+            self._load_pickles()
+        return self._model
+    
+    @property
+    def scaler(self):
+        """The fitted StandardScaler (loaded lazily like model)"""
+        if self._scaler is None:
+            self._load_pickles()
+        return self._scaler
+    
+    def _compile_engine(self):
+        """Build the compiled tree engine when the model type supports it"""
+        if not self.use_compiled_engine or self.metadata.get('model_type') not in SUPPORTED_MODEL_TYPES:
+            return None
+        
+        try:
+            engine = CompiledGradientBoosting.from_sklearn(self.model, self.scaler)
+            error = engine.max_abs_error(self.model, self.scaler)
+        except Exception as e:
+            print(f"⚠️  Compiled engine unavailable, using sklearn: {e}")
+            return None
+        
+        if error > ENGINE_TOLERANCE:
+            print(f"⚠️  Compiled engine differs from sklearn by {error:.2e}, using sklearn")
+            return None
+        
+        print("⚡ Compiled tree engine enabled")
+        return engine
+    
     def predict_grade(self, student_data, course_data, interests_data):
         """
         Predict grade for a student-course combination
@@ -51,76 +220,477 @@ class GradePredictor:
         course_data: dict with keys ['difficulty_level', 'credits', 'theory_weight', 'domain_tags']
         interests_data: list of domains the student is interested in
         
+        With a feature store attached, student_data / course_data may instead carry
+        'student_id' / 'course_id' (interests_data None = stored interests); any
+        field sent explicitly overrides the stored value.
+        
         Returns:
         predicted_grade: float between 5.0 and 10.0
         """
-        try:
-            # Calculate domain match
-            domain_match = 1.0 if course_data['domain_tags'] in interests_data else 0.0
-            
-            # Build feature vector
-            features = {}
-            
-            # Base features
-            features['cgpa'] = student_data['cgpa']
-            features['attendance'] = student_data['attendance']
-            features['previous_avg'] = student_data['previous_avg']
-            features['difficulty_level'] = course_data['difficulty_level']
-            features['credits'] = course_data['credits']
-            features['theory_weight'] = course_data['theory_weight']
-            features['domain_match'] = domain_match
-            
-            # Default values for computed features
-            features['grade_consistency'] = 0.5
-            features['course_avg_grade'] = 7.5
-            
-            # Interaction features
-            features['cgpa_difficulty_interaction'] = student_data['cgpa'] * (6 - course_data['difficulty_level'])
-            features['attendance_difficulty_interaction'] = student_data['attendance'] * (6 - course_data['difficulty_level'])
-            features['cgpa_attendance_interaction'] = student_data['cgpa'] * student_data['attendance'] / 100
-            
-            # Branch encoding
-            for branch in self.branches:
-                features[f'branch_{branch}'] = 1 if student_data['branch_code'] == branch else 0
-            
-            # Domain encoding
-            for domain in self.domains:
-                features[f'domain_{domain}'] = 1 if course_data['domain_tags'] == domain else 0
-            
-            # Interest encoding
-            for domain in self.domains:
-                features[f'interest_{domain}'] = 1 if domain in interests_data else 0
-            
-            # Create feature vector with only selected features
-            feature_vector = {}
-            for feature in self.selected_features:
-                if feature in features:
-                    feature_vector[feature] = features[feature]
+        if self.feature_store is not None:
+            with METRICS.span('resolve_inputs'):
+                student_data, course_data, interests_data = self.feature_store.resolve(
+                    student_data, course_data, interests_data
+                )
+        
+        cache_key = None
+        if self.cache is not None:
+            with METRICS.span('cache_lookup'):
+                try:
+                    cache_key = self.cache.make_key(student_data, course_data, interests_data)
+                except (KeyError, TypeError, ValueError, AttributeError):
+                    # Malformed input, let the normal path handle it
+                    cache_key = None
                 else:
-                    feature_vector[feature] = 0
-            
-            # Convert to DataFrame
-            feature_df = pd.DataFrame([feature_vector])[self.selected_features]
-            
-            # Scale features
-            feature_vector_scaled = self.scaler.transform(feature_df)
+                    cached_grade = self.cache.get(cache_key)
+            if cache_key is not None and cached_grade is not None:
+                if self.drift_monitor is not None:
+                    self.drift_monitor.observe(student_data, course_data, interests_data, cached_grade)
+                return cached_grade
+        
+        try:
+            # Inputs on the lookup grid skip the model entirely
+            predicted_grade = None
+            if self.lookup is not None:
+                with METRICS.span('lookup_predict'):
+                    predicted_grade = self.lookup.predict_row(student_data, course_data, interests_data)
             
-            # Predict
-            predicted_grade = self.model.predict(feature_vector_scaled)[0]
+            if predicted_grade is None:
+                predicted_grade = self._predict_row(student_data, course_data, interests_data)
             
             # Clip to valid range
             final_grade = max(5.0, min(10.0, round(predicted_grade, 2)))
             
+            if cache_key is not None:
+                self.cache.put(cache_key, final_grade)
+            if self.drift_monitor is not None:
+                self.drift_monitor.observe(student_data, course_data, interests_data, final_grade)
+            
             return final_grade
             
         except Exception as e:
             print(f"❌ Prediction error: {e}")
+            METRICS.inc('grade_prediction_fallback_total')
             # Fallback prediction based on CGPA
             return max(5.0, min(10.0, round(student_data['cgpa'] + np.random.normal(0, 0.3), 2)))
     
+    def cached_row(self, row):
+        """
+        Cache key and cached grade of one flat, resolved row (see validate_record)
+
+        Returns (key, grade): grade is None on a miss, both are None without a
+        cache or for rows that cannot be keyed. Hits are fed to the drift
+        monitor like predict_grade's.
+        """
+        if self.cache is None:
+            return None, None
+        try:
+            key = self.cache.make_key(row, row, row['interests'])
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return None, None
+        grade = self.cache.get(key)
+        if grade is not None and self.drift_monitor is not None:
+            self.drift_monitor.observe(row, row, row['interests'], grade)
+        return key, grade
+    
+    def cache_grade(self, key, grade):
+        """Remember a grade under a key from cached_row"""
+        if key is not None and self.cache is not None:
+            self.cache.put(key, grade)
+    
+    def _predict_row(self, student_data, course_data, interests_data):
+        """Unclipped model prediction for one record"""
+        with METRICS.span('build_features'):
+            feature_row = self.feature_plan.build_row(student_data, course_data, interests_data)
+        
+        # Predict
+        if self.engine is not None:
+            with METRICS.span('model_predict'):
+                predicted_grade = self.engine.predict(feature_row)[0]
+        else:
+            # Convert to DataFrame
+            with METRICS.span('to_dataframe'):
+                import pandas as pd
+                feature_df = pd.DataFrame(feature_row, columns=self.selected_features)
+            
+            # Scale features
+            with METRICS.span('scale'):
+                feature_vector_scaled = self.scaler.transform(feature_df)
+            
+            with METRICS.span('model_predict'):
+                predicted_grade = self.model.predict(feature_vector_scaled)[0]
+        return predicted_grade
+    
+    def predict_batch(self, records, observe=True):
+        """
+        Predict grades for many student-course combinations at once
+
+        Parameters:
+        records: list of dicts, a pandas DataFrame, or a dict of column arrays.
+                 Each row needs the student keys ['cgpa', 'attendance', 'previous_avg', 'branch_code'],
+                 the course keys ['difficulty_level', 'credits', 'theory_weight', 'domain_tags']
+                 and 'interests' (list of domains). A list of dicts may also use the
+                 nested {'student': ..., 'course': ..., 'interests': ...} layout of /predict.
+        observe: feed the rows to the drift monitor (off for warm-up and internal bulk jobs)
+
+        Returns:
+        numpy array of predicted grades, each between 5.0 and 10.0
+        """
+        with METRICS.span('batch_build_features'):
+            columns = self._records_to_columns(records)
+            if len(columns['cgpa']) == 0:
+                return np.empty(0)
+            if self.lookup is not None:
+                with METRICS.span('batch_lookup_predict'):
+                    predictions, covered = self.lookup.predict_columns(columns)
+                if covered.all():
+                    return self._observed(columns, np.clip(np.round(predictions, 2), 5.0, 10.0), observe)
+                # Off-grid rows go through the model
+                rest = np.flatnonzero(~covered)
+                all_columns = columns
+                columns = {key: (None if values is None else
+                                 [values[i] for i in rest] if isinstance(values, list) else values[rest])
+                           for key, values in columns.items()}
+            feature_matrix = self._build_feature_matrix(columns)
+        
+        with METRICS.span('batch_model_predict'):
+            if self.lookup is None:
+                return self._observed(columns, self._predict_matrix(feature_matrix), observe, feature_matrix)
+            predictions[rest] = self._predict_matrix(feature_matrix)
+            return self._observed(all_columns, np.clip(np.round(predictions, 2), 5.0, 10.0), observe)
+    
+    def _observed(self, columns, predictions, observe, feature_matrix=None):
+        """Pass batch predictions through the drift monitor"""
+        if observe and self.drift_monitor is not None:
+            with METRICS.span('batch_drift_observe'):
+                self.drift_monitor.observe_batch(columns, predictions, feature_matrix)
+        return predictions
+    
+    def _predict_matrix(self, feature_matrix):
+        """Scale and predict a feature matrix with one scaler and one model call"""
+        if self.engine is not None:
+            predictions = self.engine.predict(feature_matrix)
+        else:
+            import pandas as pd
+            feature_df = pd.DataFrame(feature_matrix, columns=self.selected_features)
+            feature_matrix_scaled = self.scaler.transform(feature_df)
+            predictions = self.model.predict(feature_matrix_scaled)
+        
+        # Same rounding and clipping as predict_grade
+        return np.clip(np.round(predictions, 2), 5.0, 10.0)
+    
+    def _records_to_columns(self, records):
+        """Normalize batch input into a dict of column arrays"""
+        # pandas is only imported by callers that pass DataFrames
+        pd = sys.modules.get('pandas')
+        is_frame = pd is not None and isinstance(records, pd.DataFrame)
+        if is_frame or isinstance(records, dict):
+            if is_frame:
+                raw = {key: records[key].to_numpy() for key in records.columns}
+            else:
+                raw = dict(records)
+            if self.feature_store is not None:
+                raw = self.feature_store.fill_columns(raw)
+            missing = [key for key in self.INPUT_COLUMNS
+                       if key not in raw and not (key == 'interests' and 'interest_mask' in raw)]
+            if missing:
+                raise KeyError(f"Missing columns: {', '.join(missing)}")
+            n_rows = len(raw['cgpa'])
+            for key, default in self.AGGREGATE_DEFAULTS.items():
+                if key not in raw:
+                    raw[key] = np.full(n_rows, default)
+        else:
+            rows = [self._flatten_record(record) for record in records]
+            if self.feature_store is not None:
+                rows = [self.feature_store.resolve_record(row) for row in rows]
+            raw = {key: [row[key] for row in rows] for key in self.INPUT_COLUMNS}
+            for key, default in self.AGGREGATE_DEFAULTS.items():
+                raw[key] = [row.get(key, default) for row in rows]
+        
+        return normalize_columns(raw)
+    
+    def validate_record(self, record):
+        """
+        Check a single batch record before it is queued for prediction
+        
+        Returns the flattened row, raises ValueError describing the first problem found
+        """
+        if not isinstance(record, dict):
+            raise ValueError("Record must be a JSON object")
+        try:
+            row = self._flatten_record(record)
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Malformed nested record: {e}")
+        
+        if self.feature_store is not None:
+            row = self.feature_store.resolve_record(row)
+        
+        missing = [key for key in self.INPUT_COLUMNS if key not in row]
+        if missing:
+            raise ValueError(f"Missing fields: {', '.join(missing)}")
+        
+        for key in self.NUMERIC_COLUMNS:
+            try:
+                float(row[key])
+            except (TypeError, ValueError):
+                raise ValueError(f"Field '{key}' must be numeric, got {row[key]!r}")
+        
+        # Missing interests (None, or NaN from an empty CSV cell) mean none, as in predict_batch
+        interests = row['interests']
+        if not (isinstance(interests, (list, tuple, str)) or interests is None
+                or (isinstance(interests, float) and np.isnan(interests))):
+            raise ValueError("Field 'interests' must be a list of domains")
+        return row
+    
+    @staticmethod
+    def _flatten_record(record):
+        """Turn a nested /predict style record into a flat row"""
+        if 'student' in record:
+            row = dict(record['student'])
+            row.update(record['course'])
+            row['interests'] = record['interests']
+            return row
+        return record
+    
+    _parse_interests = staticmethod(parse_interests)
+    
+    def _build_feature_matrix(self, columns):
+        """Build the (n_rows, n_selected_features) matrix with the compiled feature plan"""
+        return self.feature_plan.build_matrix(columns)
+    
+    def load_catalog(self, catalog_path):
+        """
+        Load a course catalog and precompute its course-side feature columns
+        
+        The catalog is a JSON list of courses with keys
+        ['course_id', 'difficulty_level', 'credits', 'theory_weight', 'domain_tags']
+        and an optional 'course_name'.
+        """
+        with open(catalog_path, 'r') as f:
+            courses = json.load(f)
+        
+        self.catalog = {
+            'course_id': np.array([course['course_id'] for course in courses], dtype=object),
+            'course_name': np.array([course.get('course_name', course['course_id']) for course in courses], dtype=object),
+            'domain_tags': np.array([course['domain_tags'] for course in courses], dtype=object),
+            'difficulty_level': np.array([course['difficulty_level'] for course in courses], dtype=np.float64),
+            'credits': np.array([course['credits'] for course in courses], dtype=np.float64),
+            'theory_weight': np.array([course['theory_weight'] for course in courses], dtype=np.float64),
+        }
+        print(f"📚 Course catalog loaded: {len(courses)} courses")
+    
+    def recommend_courses(self, student_data, interests_data, k=5, domains=None, credits=None,
+                          min_difficulty=None, max_difficulty=None):
+        """
+        Rank every catalog course by predicted grade for one student
+        
+        Parameters:
+        student_data: dict with keys ['cgpa', 'attendance', 'previous_avg', 'branch_code']
+        interests_data: list of domains the student is interested in
+        k: number of courses to return
+        domains: optional list of course domains to keep
+        credits: optional list of credit values to keep
+        min_difficulty / max_difficulty: optional difficulty bounds (inclusive)
+        
+        Returns:
+        list of course dicts with 'predicted_grade', best first
+        """
+        if self.catalog is None:
+            raise ValueError("No course catalog loaded")
+        if self.feature_store is not None:
+            student_data, _, interests_data = self.feature_store.resolve(student_data, None, interests_data)
+        
+        mask = np.ones(len(self.catalog['course_id']), dtype=bool)
+        if domains:
+            mask &= np.isin(self.catalog['domain_tags'], list(domains))
+        if credits:
+            mask &= np.isin(self.catalog['credits'], [float(c) for c in credits])
+        if min_difficulty is not None:
+            mask &= self.catalog['difficulty_level'] >= float(min_difficulty)
+        if max_difficulty is not None:
+            mask &= self.catalog['difficulty_level'] <= float(max_difficulty)
+        
+        n_courses = int(mask.sum())
+        if n_courses == 0:
+            return []
+        
+        # Broadcast the student against the pre-built catalog columns
+        columns = {key: self.catalog[key][mask] for key in
+                   ['difficulty_level', 'credits', 'theory_weight', 'domain_tags']}
+        for key in ['cgpa', 'attendance', 'previous_avg']:
+            columns[key] = np.full(n_courses, float(student_data[key]))
+        columns['branch_code'] = np.full(n_courses, student_data['branch_code'], dtype=object)
+        columns['interests'] = [self._parse_interests(interests_data)] * n_courses
+        columns['grade_consistency'] = np.full(
+            n_courses, float(student_data.get('grade_consistency', DEFAULT_GRADE_CONSISTENCY))
+        )
+        columns['course_avg_grade'] = self._catalog_course_avg_grade(self.catalog['course_id'][mask])
+        
+        grades = self._predict_matrix(self._build_feature_matrix(columns))
+        
+        # Stable sort keeps catalog order between equal grades
+        order = np.argsort(-grades, kind='stable')[:k]
+        course_indices = np.flatnonzero(mask)[order]
+        return [
+            {
+                'course_id': self.catalog['course_id'][i],
+                'course_name': self.catalog['course_name'][i],
+                'domain_tags': self.catalog['domain_tags'][i],
+                'difficulty_level': int(self.catalog['difficulty_level'][i]),
+                'credits': int(self.catalog['credits'][i]),
+                'theory_weight': float(self.catalog['theory_weight'][i]),
+                'predicted_grade': float(grades[j]),
+            }
+            for i, j in zip(course_indices, order)
+        ]
+    
+    def what_if(self, student_data, course_data, interests_data, vary):
+        """
+        Predicted grades over a 1-D or 2-D grid of input values
+        
+        Parameters:
+        student_data / course_data / interests_data: the base record, as for predict_grade
+        vary: list of one or two axes, each {'feature': name, 'min': x, 'max': y, 'steps': n}
+              or {'feature': name, 'values': [...]}; name is a numeric input such as
+              'attendance', 'cgpa' or 'difficulty_level'
+        
+        Returns:
+        dict with 'axes' ([{'feature', 'values'}]) and 'grades' (array shaped like the grid)
+        """
+        if not 1 <= len(vary) <= 2:
+            raise ValueError("Vary one or two features")
+        if self.feature_store is not None:
+            student_data, course_data, interests_data = self.feature_store.resolve(
+                student_data, course_data, interests_data
+            )
+        interests_data = self._parse_interests(interests_data)
+        
+        axes = [self._whatif_axis(spec) for spec in vary]
+        if axes[0]['feature'] == axes[-1]['feature'] and len(axes) == 2:
+            raise ValueError("The two what-if axes must vary different features")
+        shape = tuple(len(axis['values']) for axis in axes)
+        grids = np.meshgrid(*[axis['values'] for axis in axes], indexing='ij')
+        varied = {axis['feature']: grid.ravel() for axis, grid in zip(axes, grids)}
+        
+        base_values = {key: student_data[key] if key in student_data else course_data[key]
+                       for key in self.NUMERIC_COLUMNS}
+        base_values['grade_consistency'] = student_data.get('grade_consistency', DEFAULT_GRADE_CONSISTENCY)
+        base_values['course_avg_grade'] = course_data.get('course_avg_grade', DEFAULT_COURSE_AVG_GRADE)
+        
+        base_row = self.feature_plan.build_row(student_data, course_data, interests_data)
+        feature_matrix = self.feature_plan.build_grid(base_row, base_values, varied)
+        return {
+            'axes': [{'feature': axis['feature'], 'values': axis['values'].tolist()} for axis in axes],
+            'grades': self._predict_matrix(feature_matrix).reshape(shape)
+        }
+    
+    def get_explainer(self):
+        """TreeSHAP tables for the loaded model, built once on first use"""
+        if self.metadata.get('model_type') != 'GradientBoosting':
+            raise ValueError(f"Explanations need a GradientBoosting model, got {self.metadata.get('model_type')}")
+        with self._explainer_lock:
+            if self.explainer is None:
+                with METRICS.span('explainer_build'):
+                    self.explainer = TreeShapExplainer.from_sklearn(self.model, self.scaler)
+            return self.explainer
+    
+    def explain_batch(self, records):
+        """
+        Per-feature contributions for many records (same input formats as predict_batch)
+        
+        Returns:
+        dict with 'base_value' (mean model output), 'contributions' ((n_rows, n_features)
+        array, columns in selected_features order) and 'raw_predictions'
+        (base_value + contributions summed, before rounding and clipping)
+        """
+        explainer = self.get_explainer()
+        columns = self._records_to_columns(records)
+        if len(columns['cgpa']) == 0:
+            contributions = np.empty((0, len(self.selected_features)))
+        else:
+            with METRICS.span('explain_shap'):
+                contributions = explainer.shap_values(self._build_feature_matrix(columns))
+        return {
+            'base_value': explainer.expected_value,
+            'contributions': contributions,
+            'raw_predictions': explainer.expected_value + contributions.sum(axis=1)
+        }
+    
+    def explain(self, student_data, course_data, interests_data):
+        """
+        Why the model predicts this grade: exact TreeSHAP contribution of each feature
+        
+        Returns:
+        dict with 'base_value', 'contributions' {feature: grade points}, 'raw_prediction'
+        (base_value + sum of contributions) and 'predicted_grade' (rounded and clipped)
+        """
+        if self.feature_store is not None:
+            student_data, course_data, interests_data = self.feature_store.resolve(
+                student_data, course_data, interests_data
+            )
+        interests_data = self._parse_interests(interests_data)
+        explainer = self.get_explainer()
+        feature_row = self.feature_plan.build_row(student_data, course_data, interests_data)
+        with METRICS.span('explain_shap'):
+            contributions = explainer.shap_values(feature_row)[0]
+        raw_prediction = explainer.expected_value + contributions.sum()
+        return {
+            'base_value': explainer.expected_value,
+            'contributions': dict(zip(self.selected_features, contributions.tolist())),
+            'raw_prediction': float(raw_prediction),
+            'predicted_grade': float(np.clip(np.round(raw_prediction, 2), 5.0, 10.0))
+        }
+    
+    def _whatif_axis(self, spec):
+        """Validate one what-if axis and expand it to its grid values"""
+        feature = spec.get('feature')
+        allowed = self.NUMERIC_COLUMNS + list(self.AGGREGATE_DEFAULTS)
+        if feature not in allowed:
+            raise ValueError(f"Cannot vary '{feature}', choose one of: {', '.join(allowed)}")
+        
+        if 'values' in spec:
+            values = np.asarray(spec['values'], dtype=np.float64).ravel()
+        else:
+            steps = int(spec.get('steps', 10))
+            if steps < 1:
+                raise ValueError("steps must be at least 1")
+            values = np.linspace(float(spec['min']), float(spec['max']), steps)
+        if not 1 <= len(values) <= MAX_WHATIF_STEPS:
+            raise ValueError(f"Each what-if axis takes 1 to {MAX_WHATIF_STEPS} values")
+        return {'feature': feature, 'values': values}
+    
+    def predict_by_id(self, student_id, course_id):
+        """Predict a grade from IDs alone, using the attached feature store"""
+        if self.feature_store is None:
+            raise ValueError("No feature store attached")
+        return self.predict_grade({'student_id': student_id}, {'course_id': course_id}, None)
+    
+    def _catalog_course_avg_grade(self, course_ids):
+        """Historical course averages for catalog courses known to the feature store"""
+        averages = np.full(len(course_ids), DEFAULT_COURSE_AVG_GRADE)
+        if self.feature_store is None:
+            return averages
+        for i, course_id in enumerate(course_ids):
+            try:
+                averages[i] = self.feature_store.course_avg_grade(self.feature_store.course_codes([course_id]))[0]
+            except ValueError:
+                pass
+        return averages
+    
     def get_model_info(self):
         """Get information about the loaded model"""
         return self.metadata
+    
+    def get_cache_stats(self):
+        """Hit/miss/eviction counters of the prediction cache"""
+        if self.cache is None:
+            return {'enabled': False}
+        return dict(self.cache.stats(), enabled=True)
+    
+    def reset_cache_stats(self):
+        """Zero the cache counters (warm-up traffic is not real traffic)"""
+        if self.cache is not None:
+            self.cache.reset_stats()
 
 if __name__ == "__main__":
     # Test the predictor
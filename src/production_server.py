@@ -0,0 +1,274 @@
+import gc
+import mmap
+import os
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+import traceback
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.serving import ThreadedWSGIServer, WSGIRequestHandler
+from werkzeug.wsgi import ClosingIterator
+
+import src.web_api as web_api
+
+# Idle seconds a connection may wait on a socket read or write; not a limit on request processing time
+DEFAULT_SOCKET_TIMEOUT = 30
+# Seconds a request may run (streamed body included) before the parent kills and replaces its worker
+DEFAULT_REQUEST_TIMEOUT = 60
+DEFAULT_GRACEFUL_TIMEOUT = 30
+# A worker that swapped the model signals the parent, which relays the signal to every worker
+SWAP_SIGNAL = signal.SIGUSR1
+
+
+class TimeoutRequestHandler(WSGIRequestHandler):
+    """Request handler whose socket reads and writes time out"""
+    timeout = DEFAULT_SOCKET_TIMEOUT
+
+
+class RequestClock:
+    """
+    WSGI middleware publishing when this worker's oldest in-flight request started
+
+    The start time (time.monotonic, 0.0 when idle) is written to the worker's
+    slot of a float array shared with the parent, which kills workers whose
+    oldest request has run longer than the request timeout. A request counts
+    until its response body is closed, so streamed responses are covered.
+    """
+
+    def __init__(self, app, slots, slot):
+        self.app = app
+        self.slots = slots
+        self.slot = slot
+        self._started = {}
+        self._lock = threading.Lock()
+
+    def _publish(self):
+        self.slots[self.slot] = min(self._started.values()) if self._started else 0.0
+
+    def _finish(self, token):
+        with self._lock:
+            self._started.pop(token, None)
+            self._publish()
+
+    def __call__(self, environ, start_response):
+        token = object()
+        with self._lock:
+            self._started[token] = time.monotonic()
+            self._publish()
+        try:
+            response = self.app(environ, start_response)
+        except BaseException:
+            self._finish(token)
+            raise
+        return ClosingIterator(response, lambda: self._finish(token))
+
+
+def _make_worker_server(listen_socket, socket_timeout, app=None):
+    """WSGI server that accepts on the socket shared by all workers"""
+    handler = type('WorkerRequestHandler', (TimeoutRequestHandler,), {'timeout': socket_timeout})
+    host, port = listen_socket.getsockname()[:2]
+    server = ThreadedWSGIServer(host, port, app or web_api.app, handler=handler, fd=listen_socket.fileno())
+    # Non-daemon request threads + block_on_close let shutdown drain in-flight requests
+    server.daemon_threads = False
+    server.block_on_close = True
+    return server
+
+
+def _read_version(version_file):
+    try:
+        with open(version_file, 'r') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _publish_version(version_file, version):
+    """Record the version a worker swapped to and have the parent tell every worker"""
+    if version == _read_version(version_file):
+        return
+    temp_path = f"{version_file}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        f.write(version)
+    os.replace(temp_path, version_file)
+    os.kill(os.getppid(), SWAP_SIGNAL)
+
+
+def _follow_version(version_file, sync_lock):
+    """Activate the last published version when this worker serves another one"""
+    with sync_lock:
+        version = _read_version(version_file)
+        if version is None or version == web_api.registry.active_version:
+            return
+        try:
+            web_api.registry.activate(version)
+        except Exception as e:
+            print(f"❌ Worker {os.getpid()} could not follow model version '{version}': {e}")
+
+
+def _run_worker(listen_socket, socket_timeout, version_file, slots, slot):
+    """Body of a forked worker process; never returns (exit code 1 when serving failed)"""
+    exit_code = 1
+    try:
+        server = _make_worker_server(listen_socket, socket_timeout, RequestClock(web_api.app, slots, slot))
+
+        def stop(signum, frame):
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+        sync_lock = threading.Lock()
+
+        def follow(signum, frame):
+            threading.Thread(target=_follow_version, args=(version_file, sync_lock), daemon=True).start()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(SWAP_SIGNAL, follow)
+        web_api.registry.on_swap = lambda version: _publish_version(version_file, version)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, [SWAP_SIGNAL])
+        # A restarted worker catches up with swaps made since the model was loaded in the parent
+        follow(None, None)
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+        exit_code = 0
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        os._exit(exit_code)
+
+
+def serve(host='0.0.0.0', port=5000, workers=None, socket_timeout=DEFAULT_SOCKET_TIMEOUT,
+          graceful_timeout=DEFAULT_GRACEFUL_TIMEOUT, model_version=None, request_timeout=DEFAULT_REQUEST_TIMEOUT,
+          **app_options):
+    """
+    Pre-fork production server
+
+    The model is loaded and warmed up once in the parent, then `workers`
+    processes are forked and accept on one shared listening socket, so the
+    model and the pandas/sklearn imports are shared copy-on-write. Workers
+    that die are restarted. SIGTERM/SIGINT stop accepting, let in-flight
+    requests finish for up to graceful_timeout seconds, then kill stragglers.
+    socket_timeout bounds idle socket reads and writes. request_timeout
+    (None or 0 = no limit) bounds request processing: a worker whose oldest
+    in-flight request has run longer is killed and replaced, like a hung
+    worker, which also drops the other requests it was serving.
+
+    A model swap through /admin/models/load or /rollback is written to a
+    shared version file and signalled to the parent, which relays it to
+    every worker; each loads that version, and restarted workers pick it up
+    when they start. Feature store writes are refused with more than one
+    worker, since each worker holds its own copy of the store.
+    app_options are passed to web_api.init_app.
+    """
+    if not hasattr(os, 'fork'):
+        print("⚠️  Multi-worker mode needs fork(); falling back to the single-process server")
+        web_api.start_api(host, port, model_version, **app_options)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    web_api.init_app(model_version, **app_options)
+    web_api.worker_processes = workers
+    fd, version_file = tempfile.mkstemp(prefix='grade-api-', suffix='.version')
+    with os.fdopen(fd, 'w') as f:
+        f.write(web_api.registry.active_version or '')
+
+    listen_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listen_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listen_socket.bind((host, port))
+    listen_socket.listen(1024)
+    listen_socket.set_inheritable(True)
+
+    # Keep the loaded model out of the collector's reach so workers do not touch (and copy) its pages
+    gc.collect()
+    gc.freeze()
+
+    # One request start time per worker slot, in memory shared with the forked workers
+    slots = memoryview(mmap.mmap(-1, 8 * workers)).cast('d')
+    children = {}
+    shutting_down = False
+
+    def spawn():
+        slot = min(set(range(workers)) - set(children.values()))
+        slots[slot] = 0.0
+        # The swap signal stays blocked in the child until its handler is installed
+        signal.pthread_sigmask(signal.SIG_BLOCK, [SWAP_SIGNAL])
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(listen_socket, socket_timeout, version_file, slots, slot)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, [SWAP_SIGNAL])
+        children[pid] = slot
+
+    def kill_hung_workers():
+        now = time.monotonic()
+        for pid, slot in list(children.items()):
+            started = slots[slot]
+            if started and now - started > request_timeout:
+                print(f"⏱️  Worker {pid} has been running a request for {now - started:.0f}s "
+                      f"(limit {request_timeout}s), killing it")
+                slots[slot] = 0.0
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    def relay_swap(signum, frame):
+        for pid in list(children):
+            try:
+                os.kill(pid, SWAP_SIGNAL)
+            except ProcessLookupError:
+                pass
+
+    def request_shutdown(signum, frame):
+        nonlocal shutting_down
+        shutting_down = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, request_shutdown)
+    signal.signal(signal.SIGINT, request_shutdown)
+    signal.signal(SWAP_SIGNAL, relay_swap)
+
+    for _ in range(workers):
+        spawn()
+    print(f"🌐 Serving on http://{host}:{port} with {workers} worker processes")
+
+    deadline = None
+    while children:
+        if shutting_down and deadline is None:
+            deadline = time.monotonic() + graceful_timeout
+
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+
+        if pid == 0:
+            if request_timeout and not shutting_down:
+                kill_hung_workers()
+            if deadline is not None and time.monotonic() > deadline:
+                for child in children:
+                    try:
+                        os.kill(child, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+            time.sleep(0.1)
+            continue
+
+        children.pop(pid, None)
+        if not shutting_down:
+            print(f"⚠️  Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, starting a new one")
+            spawn()
+
+    listen_socket.close()
+    try:
+        os.remove(version_file)
+    except OSError:
+        pass
+    print("👋 Server stopped")
@@ -0,0 +1,74 @@
+import json
+import os
+import subprocess
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Heavy modules worth knowing about when they show up at startup
+HEAVY_MODULES = ['pandas', 'sklearn', 'scipy', 'flask']
+
+
+def _measure(models_dir, use_artifact, include_api):
+    """Runs in a fresh interpreter: time every startup stage and print one JSON line"""
+    stages = []
+
+    def stage(name, action):
+        start = time.perf_counter()
+        result = action()
+        stages.append([name, time.perf_counter() - start])
+        return result
+
+    sys.path.insert(0, ROOT_DIR)
+    stage('import numpy', lambda: __import__('numpy'))
+    predictor_module = stage('import predictor', lambda: __import__('src.predictor', fromlist=['GradePredictor']))
+    if include_api:
+        stage('import web_api (flask)', lambda: __import__('src.web_api'))
+    predictor = stage('load model', lambda: predictor_module.GradePredictor(
+        models_dir, cache_size=0, use_artifact=use_artifact
+    ))
+    record = {'cgpa': 8.0, 'attendance': 85.0, 'previous_avg': 8.0, 'branch_code': 'CSE'}
+    course = {'difficulty_level': 3, 'credits': 3, 'theory_weight': 0.6, 'domain_tags': 'ML'}
+    stage('first prediction', lambda: predictor.predict_grade(record, course, ['ML']))
+    print(json.dumps({
+        'stages': stages,
+        'load_timings': predictor.load_timings,
+        'artifact': predictor.artifact_path,
+        'modules': [name for name in HEAVY_MODULES if name in sys.modules]
+    }))
+
+
+def measure(models_dir, use_artifact=True, include_api=False):
+    """Startup timings of a fresh interpreter (imports are only cold in a new process)"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), models_dir, str(int(use_artifact)), str(int(include_api))],
+        capture_output=True, text=True, check=True
+    )
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report['process_seconds'] = time.perf_counter() - start
+    return report
+
+
+def print_report(models_dir, include_api=False):
+    """Compare startup with the compiled artifact and with the sklearn pickles"""
+    print("⏱️  Startup timing report")
+    print("=" * 50)
+    for use_artifact in (True, False):
+        report = measure(models_dir, use_artifact, include_api)
+        source = f"artifact ({os.path.basename(report['artifact'])})" if report['artifact'] else "pickles"
+        print(f"\n📦 Loaded from {source}")
+        for name, seconds in report['stages']:
+            print(f"   {name:<26} {seconds * 1000:8.1f} ms")
+        for name, seconds in report['load_timings'].items():
+            print(f"     ↳ {name:<22} {seconds * 1000:8.1f} ms")
+        print(f"   {'total (process)':<26} {report['process_seconds'] * 1000:8.1f} ms")
+        print(f"   heavy modules imported: {', '.join(report['modules']) or 'none'}")
+        if use_artifact and not report['artifact']:
+            print("   (no up-to-date compiled_model.bin, run `run_cli.py compile` to create one)")
+            break
+
+
+if __name__ == "__main__":
+    _measure(sys.argv[1], sys.argv[2] == '1', sys.argv[3] == '1')
@@ -0,0 +1,119 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+# Fixed seed so synthetic datasets, benchmarks and synthetic models are reproducible
+DEFAULT_SEED = 42
+
+DOMAINS = ['AI', 'Web', 'DBMS', 'ML', 'Networks', 'Security', 'Data_Science', 'Cloud']
+BRANCHES = ['CE', 'CSE', 'ECE', 'ME', 'EE']
+
+
+def generate_dataset(n_students=1000, n_courses=30, courses_per_student=(8, 14), seed=DEFAULT_SEED):
+    """
+    Generate synthetic student, course, interest and grade tables
+
+    This is an independent generator, not a replay of the training
+    notebook: its distributions and grade formula are its own, so neither
+    the rows nor their statistics match the data the shipped ML/ model was
+    trained on. Only the table layout (the feature store CSV columns) is
+    shared. Everything is built with array operations (no per-student Python
+    loop), so millions of grade records take seconds.
+
+    Returns:
+    dict with DataFrames 'students', 'courses', 'interests', 'grades'
+    """
+    rng = np.random.RandomState(seed)
+
+    cgpa = np.round(np.clip(rng.normal(7.9, 1.1, n_students), 5.0, 10.0), 2)
+    students = pd.DataFrame({
+        'student_id': [f"S{i:04d}" for i in range(1, n_students + 1)],
+        'branch_code': rng.choice(BRANCHES, n_students),
+        'cgpa': cgpa,
+        'attendance': np.round(np.clip(rng.normal(90, 7.5, n_students), 50, 100), 1),
+        'previous_avg': np.round(np.clip(cgpa + rng.normal(0, 0.3, n_students), 5.0, 10.0), 2)
+    })
+
+    courses = pd.DataFrame({
+        'course_id': [f"C{i:02d}" for i in range(1, n_courses + 1)],
+        'domain_tags': rng.choice(DOMAINS, n_courses),
+        'difficulty_level': rng.randint(1, 6, n_courses),
+        'credits': rng.choice([2, 3, 3, 4], n_courses),
+        'theory_weight': np.round(np.clip(rng.normal(0.62, 0.1, n_courses), 0.3, 0.9), 1)
+    })
+
+    # 1-2 interests per student: rank random keys and keep the first k domains
+    n_interests = rng.randint(1, 3, n_students)
+    domain_rank = np.argsort(rng.rand(n_students, len(DOMAINS)), axis=1).argsort(axis=1)
+    interest_matrix = domain_rank < n_interests[:, None]
+    interest_rows, interest_cols = np.nonzero(interest_matrix)
+    interests = pd.DataFrame({
+        'student_id': students['student_id'].to_numpy()[interest_rows],
+        'domain': np.array(DOMAINS)[interest_cols],
+        'interest_level': 1
+    })
+
+    # Each student takes a random subset of courses
+    low, high = courses_per_student
+    n_taken = rng.randint(low, high + 1, n_students)
+    course_rank = np.argsort(rng.rand(n_students, n_courses), axis=1).argsort(axis=1)
+    student_idx, course_idx = np.nonzero(course_rank < n_taken[:, None])
+
+    course_domain_idx = pd.Index(DOMAINS).get_indexer(courses['domain_tags'])
+    domain_match = interest_matrix[student_idx, course_domain_idx[course_idx]]
+    difficulty = courses['difficulty_level'].to_numpy()[course_idx]
+    course_effect = rng.normal(0, 0.25, n_courses)[course_idx]
+
+    mean_grade = (
+        0.2
+        + 0.55 * students['cgpa'].to_numpy()[student_idx]
+        + 0.2 * students['previous_avg'].to_numpy()[student_idx]
+        + 0.01 * (students['attendance'].to_numpy()[student_idx] - 90)
+        - 0.35 * (difficulty - 3)
+        + 0.7 * domain_match
+        + course_effect
+    )
+    grades = pd.DataFrame({
+        'student_id': students['student_id'].to_numpy()[student_idx],
+        'course_id': courses['course_id'].to_numpy()[course_idx],
+        'grade': np.round(np.clip(rng.normal(mean_grade, 0.6), 5.0, 10.0), 2)
+    })
+
+    return {'students': students, 'courses': courses, 'interests': interests, 'grades': grades}
+
+
+def save_dataset(dataset, data_dir):
+    """Write the tables as the CSV files the feature store reads"""
+    from src.feature_store import STUDENTS_FILE, COURSES_FILE, INTERESTS_FILE, GRADES_FILE
+
+    os.makedirs(data_dir, exist_ok=True)
+    dataset['students'].to_csv(os.path.join(data_dir, STUDENTS_FILE), index=False)
+    dataset['courses'].to_csv(os.path.join(data_dir, COURSES_FILE), index=False)
+    dataset['interests'].to_csv(os.path.join(data_dir, INTERESTS_FILE), index=False)
+    dataset['grades'].to_csv(os.path.join(data_dir, GRADES_FILE), index=False)
+
+
+def prediction_records(n_rows, seed=DEFAULT_SEED):
+    """
+    Flat student x course rows ready for GradePredictor.predict_batch
+
+    Rows come from generate_dataset(n_rows // 10 students), so they are
+    synthetic inputs for timing and load tests, not a sample of the training
+    distribution. Returns a DataFrame with the predictor's input columns.
+    """
+    n_students = max(1, n_rows // 10)
+    dataset = generate_dataset(n_students=n_students, n_courses=30, seed=seed)
+    rng = np.random.RandomState(seed + 1)
+
+    student_idx = rng.randint(0, n_students, n_rows)
+    course_idx = rng.randint(0, len(dataset['courses']), n_rows)
+    students = dataset['students'].iloc[student_idx].reset_index(drop=True)
+    courses = dataset['courses'].iloc[course_idx].reset_index(drop=True)
+
+    interests = dataset['interests'].groupby('student_id')['domain'].agg(','.join)
+    records = pd.concat([students, courses.drop(columns=['course_id'])], axis=1)
+    records['interests'] = interests.reindex(records['student_id']).fillna('').to_numpy()
+    return records
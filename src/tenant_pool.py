@@ -0,0 +1,205 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src.model_registry import ModelRegistry, REQUIRED_FILES
+
+# One models root per tenant: <tenants_dir>/<tenant>/ (same layout as ML/, versions/ included)
+DEFAULT_TENANTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tenants")
+DEFAULT_MAX_MODELS = 8
+
+
+class UnknownTenantError(LookupError):
+    """No artifact directory exists for the requested tenant"""
+
+
+def _array_bytes(*objects):
+    """Bytes of the NumPy arrays held by objects and their src.* members (shared buffers counted once)"""
+    seen, counted = set(), set()
+    total = 0
+    pending = [obj for obj in objects if obj is not None]
+    while pending:
+        value = pending.pop()
+        if id(value) in seen:
+            continue
+        seen.add(id(value))
+        if isinstance(value, np.ndarray):
+            owner = value
+            while isinstance(owner.base, np.ndarray):
+                owner = owner.base
+            if id(owner) not in counted:
+                counted.add(id(owner))
+                total += owner.nbytes
+        elif isinstance(value, dict):
+            pending.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            pending.extend(value)
+        elif type(value).__module__.startswith('src.') and hasattr(value, '__dict__'):
+            pending.extend(vars(value).values())
+    return total
+
+
+class TenantModelPool:
+    """
+    Lazily loaded per-tenant predictors with LRU eviction
+
+    A tenant's newest model version is loaded on its first request and kept
+    in the pool until it is the least recently used entry and the pool is
+    over max_models or max_bytes. Concurrent first requests for the same
+    tenant share one load. Evicted predictors stay valid for requests that
+    already hold them.
+
+    Memory use is estimated from the artifact file sizes plus the arrays the
+    predictor holds: compiled engine, lookup tensor, drift monitor sketches
+    and, once built, the TreeSHAP tables. An entry is re-estimated whenever
+    one of those has been attached since its last estimate. Close for tree
+    models but not exact.
+    """
+
+    def __init__(self, tenants_dir=DEFAULT_TENANTS_DIR, max_models=DEFAULT_MAX_MODELS, max_bytes=None,
+                 **predictor_kwargs):
+        if max_models < 1:
+            raise ValueError("max_models must be at least 1")
+        self.tenants_dir = tenants_dir
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.predictor_kwargs = predictor_kwargs
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._loading = {}
+        self.load_times = {}
+        self.hits = 0
+        # Successful loads (first use or reload after eviction)
+        self.misses = 0
+        self.evictions = 0
+
+    def tenant_path(self, tenant):
+        """Models root of a tenant"""
+        if not tenant or not isinstance(tenant, str) or os.path.basename(tenant) != tenant or tenant.startswith('.'):
+            raise UnknownTenantError(f"Invalid tenant: {tenant!r}")
+        path = os.path.join(self.tenants_dir, tenant)
+        if not os.path.isdir(path):
+            raise UnknownTenantError(f"Unknown tenant: {tenant}")
+        return path
+
+    def list_tenants(self):
+        """Tenants with an artifact directory"""
+        if not os.path.isdir(self.tenants_dir):
+            return []
+        return sorted(name for name in os.listdir(self.tenants_dir)
+                      if not name.startswith('.') and os.path.isdir(os.path.join(self.tenants_dir, name)))
+
+    def get(self, tenant):
+        """The tenant's predictor, loading it on first use"""
+        with self._lock:
+            entry = self._entries.get(tenant)
+            if entry is not None:
+                self._entries.move_to_end(tenant)
+                self.hits += 1
+                if self.max_bytes is not None:
+                    # An explainer built by an earlier request may have pushed the pool over budget
+                    self._evict_over_limit(keep=tenant)
+                return entry['predictor']
+            future = self._loading.get(tenant)
+            owner = future is None
+            if owner:
+                future = self._loading[tenant] = Future()
+
+        if not owner:
+            return future.result()
+
+        try:
+            entry = self._load(tenant)
+        except Exception as e:
+            with self._lock:
+                del self._loading[tenant]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._entries[tenant] = entry
+            del self._loading[tenant]
+            self.misses += 1
+            self._evict_over_limit(keep=tenant)
+        future.set_result(entry['predictor'])
+        return entry['predictor']
+
+    def _load(self, tenant):
+        path = self.tenant_path(tenant)
+        start = time.perf_counter()
+        registry = ModelRegistry(path, **self.predictor_kwargs)
+        predictor = registry.activate()
+        self.load_times[tenant] = time.perf_counter() - start
+        path = registry.version_path(registry.active_version)
+        entry = {
+            'predictor': predictor,
+            'version': registry.active_version,
+            'file_bytes': sum(os.path.getsize(os.path.join(path, name)) for name in REQUIRED_FILES),
+            'parts': None,
+            'loaded_at': time.time()
+        }
+        self._estimate_bytes(entry)
+        return entry
+
+    @staticmethod
+    def _estimate_bytes(entry):
+        """(Re-)estimate an entry when its in-memory parts changed since the last estimate"""
+        predictor = entry['predictor']
+        parts = tuple(getattr(predictor, name, None) for name in ('engine', 'lookup', 'explainer', 'drift_monitor'))
+        key = tuple(id(part) for part in parts)
+        if key != entry['parts']:
+            entry['parts'] = key
+            entry['bytes'] = entry['file_bytes'] + _array_bytes(*parts)
+        return entry['bytes']
+
+    def _evict_over_limit(self, keep):
+        """Drop least recently used entries (never `keep`); caller holds the lock"""
+        for entry in self._entries.values():
+            self._estimate_bytes(entry)
+        while len(self._entries) > 1:
+            over_count = len(self._entries) > self.max_models
+            over_bytes = self.max_bytes is not None and self.total_bytes() > self.max_bytes
+            if not (over_count or over_bytes):
+                break
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                break
+            del self._entries[oldest]
+            self.evictions += 1
+
+    def evict(self, tenant):
+        """Unload a tenant (its next request reloads it, e.g. after a retrain)"""
+        with self._lock:
+            return self._entries.pop(tenant, None) is not None
+
+    def total_bytes(self):
+        return sum(entry['bytes'] for entry in self._entries.values())
+
+    def stats(self):
+        """Pool occupancy and per-tenant load times for /health"""
+        with self._lock:
+            for entry in self._entries.values():
+                self._estimate_bytes(entry)
+            loaded = [
+                {'tenant': tenant, 'version': entry['version'], 'bytes': entry['bytes']}
+                for tenant, entry in self._entries.items()
+            ]
+            return {
+                'loaded': len(loaded),
+                'max_models': self.max_models,
+                'bytes': self.total_bytes(),
+                'max_bytes': self.max_bytes,
+                'models': loaded,
+                'loading': sorted(self._loading),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'load_seconds': dict(self.load_times)
+            }
@@ -2,19 +2,29 @@ import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import numpy as np
+import pandas as pd
+
+from src.feature_plan import FeaturePlan
 from src.predictor import GradePredictor
 
+ML_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ML")
+
+
+def _train_tiny_model(output_dir, dataset):
+    """Small synthetic GradientBoosting version for tests that write artifacts"""
+    from src.training_pipeline import default_features, train
+    
+    return train(dataset, default_features(ML_DIR), output_dir, param_grid={'n_estimators': [30], 'max_depth': [3]},
+                 folds=2, workers=1, data_source='synthetic', progress=lambda message: None)
+
 def test_predictor():
     """Test the predictor with various scenarios"""
     print("🧪 Testing Grade Predictor")
     print("=" * 50)
     
-    try:
-        predictor = GradePredictor()
-        print("✅ Model loaded successfully!")
-    except Exception as e:
-        print(f"❌ Failed to load model: {e}")
-        return
+    predictor = GradePredictor()
+    print("✅ Model loaded successfully!")
     
     # Test cases
     test_cases = [
@@ -42,12 +52,18 @@ def test_predictor():
     print("TEST RESULTS:")
     print("📊" * 20)
     
+    grades = []
     for i, test_case in enumerate(test_cases, 1):
         grade = predictor.predict_grade(
             test_case["student"],
             test_case["course"], 
             test_case["interests"]
         )
+        assert 5.0 <= grade <= 10.0 and grade == round(grade, 2)
+        # The compiled feature plan builds exactly the selected features, in order
+        row = predictor.feature_plan.build_row(test_case["student"], test_case["course"], test_case["interests"])
+        assert row.shape == (1, len(predictor.selected_features))
+        grades.append(grade)
         
         print(f"\nTest {i}: {test_case['name']}")
         print(f"  Student: CGPA {test_case['student']['cgpa']}, Attendance {test_case['student']['attendance']}%")
@@ -68,6 +84,985 @@ def test_predictor():
             performance = "🚨 NEEDS IMPROVEMENT"
             
         print(f"  Performance: {performance}")
+    
+    assert grades[0] > grades[1], "A strong student in an interest-area course should beat a weak one"
+
+def test_batch_matches_single():
+    """predict_batch must reproduce predict_grade row for row"""
+    print("🧪 Testing batch prediction")
+    
+    predictor = GradePredictor(ML_DIR, cache_size=0)
+    
+    records = [
+        {"student": {"cgpa": 9.5, "attendance": 95, "previous_avg": 9.3, "branch_code": "CSE"},
+         "course": {"difficulty_level": 2, "credits": 3, "theory_weight": 0.6, "domain_tags": "AI"},
+         "interests": ["AI", "ML", "Data_Science"]},
+        {"student": {"cgpa": 6.8, "attendance": 65, "previous_avg": 6.5, "branch_code": "ME"},
+         "course": {"difficulty_level": 5, "credits": 4, "theory_weight": 0.8, "domain_tags": "Networks"},
+         "interests": ["Web"]},
+        {"student": {"cgpa": 8.2, "attendance": 88, "previous_avg": 7.9, "branch_code": "ECE"},
+         "course": {"difficulty_level": 3, "credits": 3, "theory_weight": 0.7, "domain_tags": "Web"},
+         "interests": []},
+    ]
+    
+    batch_grades = predictor.predict_batch(records)
+    assert batch_grades.shape == (len(records),)
+    for record, batch_grade in zip(records, batch_grades):
+        single_grade = predictor.predict_grade(record["student"], record["course"], record["interests"])
+        assert batch_grade == single_grade, f"{batch_grade} != {single_grade}"
+    
+    # Flat rows, a DataFrame and a dict of columns are the same batch
+    flat = [{**record["student"], **record["course"], "interests": record["interests"]} for record in records]
+    frame = pd.DataFrame(flat)
+    assert (predictor.predict_batch(flat) == batch_grades).all()
+    assert (predictor.predict_batch(frame) == batch_grades).all()
+    assert (predictor.predict_batch({key: frame[key].tolist() for key in frame.columns}) == batch_grades).all()
+    assert predictor.predict_batch([]).shape == (0,)
+    
+    print(f"✅ {len(records)} batch predictions match single predictions")
+
+def test_batch_endpoint_reports_per_record_errors():
+    """/predict/batch answers every record in order, errors next to the good rows"""
+    print("🧪 Testing the batch endpoint")
+    
+    import json
+    import src.web_api as web_api
+    from src.model_registry import ModelRegistry
+    
+    good = {"cgpa": 8.2, "attendance": 88, "previous_avg": 7.9, "branch_code": "ECE",
+            "difficulty_level": 3, "credits": 3, "theory_weight": 0.7, "domain_tags": "Web", "interests": ["Web"]}
+    records = [good, {**good, "cgpa": "high"}, {"cgpa": 7.0}, "not a record", {**good, "cgpa": 6.1}]
+    
+    saved = web_api.registry
+    try:
+        web_api.registry = ModelRegistry(ML_DIR, cache_size=0)
+        predictor = web_api.registry.activate()
+        client = web_api.app.test_client()
+    
+        response = client.post('/predict/batch', json=records)
+        assert response.status_code == 200 and response.mimetype == 'application/x-ndjson'
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert [line['index'] for line in lines] == list(range(len(records)))
+        assert [line['success'] for line in lines] == [True, False, False, False, True]
+        assert "cgpa" in lines[1]['error'] and "Missing fields" in lines[2]['error']
+        expected = predictor.predict_batch([records[0], records[4]])
+        assert [lines[0]['predicted_grade'], lines[4]['predicted_grade']] == expected.tolist()
+    
+        body = json.dumps(good) + "\n{broken\n\n" + json.dumps(good) + "\n"
+        response = client.post('/predict/batch', data=body, content_type='application/x-ndjson')
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert [line['success'] for line in lines] == [True, False, True]
+        assert lines[1]['error'].startswith("Invalid JSON")
+    
+        body = "".join("\x1e" + json.dumps(record) + "\n" for record in (good, {**good, "cgpa": 6.1}))
+        response = client.post('/predict/batch', data=body, content_type='application/json-seq')
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert [line['success'] for line in lines] == [True, True]
+    
+        assert client.post('/predict/batch', json={'records': 'nope'}).status_code == 400
+    finally:
+        web_api.registry = saved
+    print("✅ Invalid records get their own error lines without failing the batch")
+
+def test_bulk_scoring_keeps_row_order():
+    """score_file writes every input row in order, NaN where a row cannot be scored"""
+    print("🧪 Testing bulk scoring")
+    
+    import tempfile
+    from src.bulk_scoring import OUTPUT_COLUMN, score_file
+    
+    rng = np.random.RandomState(3)
+    n = 25
+    rows = pd.DataFrame({
+        'row_id': np.arange(n),
+        'cgpa': rng.uniform(5, 10, n).round(2).astype(object),
+        'attendance': rng.uniform(50, 100, n).round(1),
+        'previous_avg': rng.uniform(5, 10, n).round(2),
+        'branch_code': rng.choice(['CSE', 'ECE', 'ME'], n),
+        'difficulty_level': rng.randint(1, 6, n),
+        'credits': rng.randint(2, 5, n),
+        'theory_weight': rng.choice([0.4, 0.6, 0.8], n),
+        'domain_tags': rng.choice(['AI', 'Web', 'DBMS'], n),
+        'interests': rng.choice(['AI;Web', 'DBMS', ''], n)
+    })
+    bad = [4, 17]
+    rows.loc[bad, 'cgpa'] = 'unknown'
+    
+    with tempfile.TemporaryDirectory() as work_dir:
+        input_path = os.path.join(work_dir, "input.csv")
+        rows.to_csv(input_path, index=False)
+        for workers in (1, 2):
+            output_path = os.path.join(work_dir, f"scored_{workers}.csv")
+            assert score_file(input_path, output_path, chunk_size=6, workers=workers, models_dir=ML_DIR,
+                              progress=False) == n
+            scored = pd.read_csv(output_path)
+            assert scored['row_id'].tolist() == list(range(n))
+            assert scored[OUTPUT_COLUMN].isna().tolist() == [i in bad for i in range(n)]
+            
+            good = pd.read_csv(input_path).drop(index=bad)
+            good['cgpa'] = good['cgpa'].astype(float)
+            expected = GradePredictor(ML_DIR, cache_size=0).predict_batch(good.drop(columns='row_id'))
+            assert np.allclose(scored[OUTPUT_COLUMN].dropna().to_numpy(), expected)
+    print(f"✅ {n} rows scored in input order, {len(bad)} unscorable rows left NaN")
+
+def test_micro_batcher_matches_single_and_uses_cache():
+    """Concurrent micro-batched rows equal predict_grade; repeats are answered from the cache"""
+    print("🧪 Testing micro-batching")
+    
+    from concurrent.futures import ThreadPoolExecutor
+    from src.micro_batcher import MicroBatcher
+    from src.synthetic_data import prediction_records
+    
+    predictor = GradePredictor(ML_DIR, monitor_drift=False)
+    records = prediction_records(400).drop_duplicates(
+        ['student_id', 'domain_tags', 'difficulty_level', 'credits', 'theory_weight'])
+    rows = [predictor.validate_record(record) for record in records.head(40).to_dict('records')]
+    batcher = MicroBatcher(max_batch_size=16, max_wait_ms=20)
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        grades = list(pool.map(lambda row: batcher.predict(predictor, row, timeout=10), rows))
+    
+    expected = [predictor.predict_grade(row, row, row['interests']) for row in rows]
+    assert grades == expected
+    stats = batcher.stats()
+    assert stats['requests'] == len(rows) and stats['batches'] < len(rows)
+    # Every single prediction above was a cache hit filled by the batches
+    assert predictor.cache.hits == len(rows)
+    
+    assert batcher.predict(predictor, rows[0], timeout=10) == expected[0]
+    assert batcher.stats()['cache_hits'] == 1 and batcher.stats()['requests'] == len(rows)
+    print(f"✅ {len(rows)} micro-batched predictions in {stats['batches']} batches match predict_grade")
+
+def test_prediction_cache_lru_ttl_and_invalidation():
+    """LRU eviction, TTL expiry, clearing on load_models and clean stats after the API warm-up"""
+    print("🧪 Testing the prediction cache")
+    
+    import time
+    from src.prediction_cache import PredictionCache
+    
+    cache = PredictionCache(max_entries=2)
+    cache.put('a', 1.0)
+    cache.put('b', 2.0)
+    assert cache.get('a') == 1.0
+    cache.put('c', 3.0)
+    assert cache.get('b') is None and cache.get('a') == 1.0 and cache.get('c') == 3.0
+    assert cache.stats()['evictions'] == 1
+    
+    cache = PredictionCache(max_entries=10, ttl_seconds=0.05)
+    cache.put('a', 1.0)
+    assert cache.get('a') == 1.0
+    time.sleep(0.06)
+    assert cache.get('a') is None and cache.stats()['expirations'] == 1
+    
+    predictor = GradePredictor(ML_DIR, monitor_drift=False)
+    student = {"cgpa": 8.2, "attendance": 88, "previous_avg": 7.9, "branch_code": "ECE"}
+    course = {"difficulty_level": 3, "credits": 3, "theory_weight": 0.7, "domain_tags": "Web"}
+    grade = predictor.predict_grade(student, course, ["Web"])
+    # Key normalization: float noise and interest order do not matter
+    assert predictor.predict_grade(dict(student, cgpa=8.2000001), course, ["Web", "Web"]) == grade
+    assert predictor.get_cache_stats()['hits'] == 1
+    predictor.load_models()
+    stats = predictor.get_cache_stats()
+    assert stats['size'] == 0 and stats['invalidations'] == 1
+    
+    import src.web_api as web_api
+    web_api.init_app()
+    response = web_api.app.test_client().get('/stats').get_json()
+    assert response['cache']['hits'] == 0 and response['cache']['misses'] == 0
+    print("✅ Prediction cache evicts, expires, invalidates and starts with clean stats")
+
+def test_compiled_engine_matches_sklearn():
+    """The compiled tree engine must agree with sklearn on raw feature rows"""
+    print("🧪 Testing compiled tree engine")
+    
+    predictor = GradePredictor(ML_DIR, cache_size=0)
+    assert predictor.engine is not None, "Compiled engine not enabled for the shipped GradientBoosting model"
+    
+    error = predictor.engine.max_abs_error(predictor.model, predictor.scaler, n_probes=2000, seed=1)
+    assert error < 1e-9, f"Engine differs from sklearn by {error}"
+    
+    # The sklearn path of predict_batch gives the same grades
+    sklearn_only = GradePredictor(ML_DIR, cache_size=0, use_compiled_engine=False)
+    assert sklearn_only.engine is None
+    rows = [{"cgpa": 5.0 + i * 0.25, "attendance": 60 + i * 2, "previous_avg": 5.2 + i * 0.24, "branch_code": "CSE",
+             "difficulty_level": 1 + i % 5, "credits": 3, "theory_weight": 0.6, "domain_tags": "AI",
+             "interests": ["AI"] if i % 2 else ["Web"]} for i in range(20)]
+    assert (predictor.predict_batch(rows) == sklearn_only.predict_batch(rows)).all()
+    print(f"✅ Compiled engine matches sklearn (max error {error:.2e})")
+
+def test_what_if_matches_batch():
+    """A what-if grid must equal predict_batch on the same explicit rows"""
+    print("🧪 Testing what-if sweep")
+    
+    predictor = GradePredictor(ML_DIR, cache_size=0)
+    
+    student = {"cgpa": 7.5, "attendance": 70, "previous_avg": 7.4, "branch_code": "ECE"}
+    course = {"difficulty_level": 4, "credits": 3, "theory_weight": 0.7, "domain_tags": "Web"}
+    interests = ["Web", "AI"]
+    result = predictor.what_if(student, course, interests, [
+        {"feature": "attendance", "min": 60, "max": 90, "steps": 7},
+        {"feature": "difficulty_level", "values": [1, 3, 5]}
+    ])
+    
+    rows = [{**student, **course, "interests": interests, "attendance": attendance, "difficulty_level": difficulty}
+            for attendance in result["axes"][0]["values"] for difficulty in result["axes"][1]["values"]]
+    expected = predictor.predict_batch(rows).reshape(result["grades"].shape)
+    assert result["grades"].shape == (7, 3)
+    assert result["axes"][0]["values"][0] == 60 and result["axes"][0]["values"][-1] == 90
+    assert (expected == result["grades"]).all(), "What-if grid differs from predict_batch"
+    # Grid point (attendance 70, difficulty 3) equals a single prediction with those inputs
+    single = predictor.predict_grade(dict(student, attendance=70), dict(course, difficulty_level=3), interests)
+    assert result["grades"][2, 1] == single
+    print(f"✅ {result['grades'].size} what-if grid points match batch predictions")
+
+def test_recommendations_ranked_and_filtered():
+    """recommend_courses ranks catalog courses by their predict_grade and honours every filter"""
+    print("🧪 Testing course recommendations")
+    
+    predictor = GradePredictor(ML_DIR, cache_size=0)
+    student = {"cgpa": 8.2, "attendance": 88, "previous_avg": 7.9, "branch_code": "ECE"}
+    interests = ["AI", "Web"]
+    catalog_size = len(predictor.catalog['course_id'])
+    
+    ranked = predictor.recommend_courses(student, interests, k=catalog_size)
+    assert len(ranked) == catalog_size
+    grades = [course['predicted_grade'] for course in ranked]
+    assert grades == sorted(grades, reverse=True)
+    for course in ranked:
+        assert course['predicted_grade'] == predictor.predict_grade(student, course, interests)
+    assert predictor.recommend_courses(student, interests, k=3) == ranked[:3]
+    
+    filtered = predictor.recommend_courses(student, interests, k=catalog_size, domains=["AI", "Web"],
+                                           credits=[3, 4], min_difficulty=2, max_difficulty=4)
+    assert filtered == [course for course in ranked if course['domain_tags'] in ("AI", "Web")
+                        and course['credits'] in (3, 4) and 2 <= course['difficulty_level'] <= 4]
+    assert filtered
+    assert predictor.recommend_courses(student, interests, domains=["Underwater Basket Weaving"]) == []
+    
+    predictor.catalog = None
+    try:
+        predictor.recommend_courses(student, interests)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("recommend_courses worked without a catalog")
+    print(f"✅ {catalog_size} catalog courses ranked, filters keep the matching ones in order")
+
+def test_artifact_matches_pickles():
+    """The memory-mapped compiled artifact must predict exactly like the engine built from the pickles"""
+    print("🧪 Testing compiled artifact")
+    
+    import shutil
+    import tempfile
+    import src.model_artifact as model_artifact
+    
+    assert os.path.exists(os.path.join(ML_DIR, "compiled_model.bin")), "compiled_model.bin is not shipped"
+    from_artifact = GradePredictor(ML_DIR, cache_size=0)
+    from_pickles = GradePredictor(ML_DIR, cache_size=0, use_artifact=False)
+    assert from_artifact.artifact_path is not None, "Artifact was not used"
+    assert from_artifact.selected_features == from_pickles.selected_features
+    
+    rng = np.random.RandomState(0)
+    X = from_pickles.scaler.mean_ + rng.normal(0, 1.5, (1000, len(from_pickles.selected_features))) \
+        * from_pickles.scaler.scale_
+    assert (from_artifact.engine.predict(X) == from_pickles.engine.predict(X)).all()
+    student = {"cgpa": 8.2, "attendance": 88, "previous_avg": 7.9, "branch_code": "ECE"}
+    course = {"difficulty_level": 3, "credits": 3, "theory_weight": 0.7, "domain_tags": "Web"}
+    assert (from_artifact.predict_grade(student, course, ["Web"])
+            == from_pickles.predict_grade(student, course, ["Web"]))
+    
+    # Freshness trusts unchanged sizes / mtimes and hashes only when they differ
+    with tempfile.TemporaryDirectory() as models_dir:
+        for name in model_artifact.SOURCE_FILES + ["improved_model_metadata.json"]:
+            shutil.copy(os.path.join(ML_DIR, name), models_dir)
+        header, _ = model_artifact.read_artifact(model_artifact.compile_artifact(models_dir, progress=lambda m: None))
+        digests = model_artifact.source_digests
+        try:
+            model_artifact.source_digests = None
+            assert model_artifact.is_fresh(models_dir, header)
+        finally:
+            model_artifact.source_digests = digests
+        scaler_path = os.path.join(models_dir, "feature_scaler.pkl")
+        os.utime(scaler_path, ns=(0, 0))
+        assert model_artifact.is_fresh(models_dir, header)
+        with open(scaler_path, 'ab') as f:
+            f.write(b"\0")
+        assert not model_artifact.is_fresh(models_dir, header)
+    print("✅ Artifact predictions identical to the pickled model's engine")
+
+def test_lookup_matches_model_on_grid():
+    """The lookup tensor must reproduce the model at grid points and refuse off-grid inputs"""
+    print("🧪 Testing prediction lookup tensor")
+    
+    from src.prediction_lookup import PredictionLookup
+    
+    predictor = GradePredictor(ML_DIR, cache_size=0)
+    grid = {
+        'cgpa': {'min': 5.0, 'max': 10.0, 'step': 2.5},
+        'attendance': {'min': 50.0, 'max': 100.0, 'step': 25.0},
+        'previous_avg': {'min': 5.0, 'max': 10.0, 'step': 2.5},
+        'theory_weight': {'values': [0.6]}
+    }
+    lookup = PredictionLookup.build(predictor.engine, predictor.selected_features, grid, progress=lambda message: None)
+    
+    student = {"cgpa": 7.5, "attendance": 75, "previous_avg": 10.0, "branch_code": "ECE"}
+    course = {"difficulty_level": 4, "credits": 3, "theory_weight": 0.6, "domain_tags": "Web"}
+    for interests in (["Web"], ["AI", "Cloud"], []):
+        exact = predictor.engine.predict(predictor.feature_plan.build_row(student, course, interests))[0]
+        assert abs(lookup.predict_row(student, course, interests) - exact) < 1e-5
+    
+    assert lookup.predict_row(dict(student, attendance=40), course, ["Web"]) is None
+    assert lookup.predict_row(student, dict(course, theory_weight=0.7), ["Web"]) is None
+    
+    # The error report uses the model's train pairs when the feature store tables are there
+    import tempfile
+    from src.prediction_lookup import build_lookup
+    from src.synthetic_data import generate_dataset, save_dataset
+    
+    dataset = generate_dataset(n_students=100, n_courses=8)
+    quiet = lambda message: None
+    with tempfile.TemporaryDirectory() as work_dir:
+        models_dir, data_dir = os.path.join(work_dir, "model"), os.path.join(work_dir, "data")
+        metadata = _train_tiny_model(models_dir, dataset)
+        save_dataset(dataset, data_dir)
+        report = build_lookup(models_dir, grid, data_dir=data_dir, progress=quiet)
+        assert report['sample_source'] == 'training' and report['rows'] == metadata['training_samples']
+        report = build_lookup(models_dir, grid, sample_students=50, data_dir=None, progress=quiet)
+        assert report['sample_source'] == 'synthetic'
+    print(f"✅ Lookup reproduces grid points ({lookup.tensor.size} cells) and rejects off-grid inputs")
+
+def test_explanations_add_up():
+    """TreeSHAP contributions plus the base value must equal the raw model output"""
+    print("🧪 Testing explanations")
+    
+    predictor = GradePredictor(ML_DIR, cache_size=0)
+    
+    student = {"cgpa": 8.1, "attendance": 88, "previous_avg": 7.9, "branch_code": "CSE"}
+    course = {"difficulty_level": 3, "credits": 4, "theory_weight": 0.6, "domain_tags": "AI"}
+    explanation = predictor.explain(student, course, ["AI", "Data Science"])
+    raw = predictor.model.predict(predictor.scaler.transform(
+        pd.DataFrame(predictor.feature_plan.build_row(student, course, ["AI", "Data Science"]),
+                     columns=predictor.selected_features)
+    ))[0]
+    total = explanation["base_value"] + sum(explanation["contributions"].values())
+    assert abs(total - raw) < 1e-9, f"Contributions sum to {total}, model says {raw}"
+    
+    batch = predictor.explain_batch([{**student, **course, "interests": ["AI", "Data Science"]}])
+    assert np.allclose(batch["contributions"][0], list(explanation["contributions"].values()))
+    assert list(explanation["contributions"]) == predictor.selected_features
+    assert explanation["predicted_grade"] == predictor.predict_grade(student, course, ["AI", "Data Science"])
+    print(f"✅ Contributions add up to the raw prediction {raw:.4f}")
+
+def test_prediction_matrix_refresh():
+    """Materialized grades must match live predictions after profile and course updates"""
+    print("🧪 Testing prediction matrix")
+    
+    import tempfile
+    import types
+    import src.web_api as web_api
+    from src.feature_store import FeatureStore
+    from src.prediction_matrix import PredictionMatrix
+    from src.synthetic_data import generate_dataset
+    
+    dataset = generate_dataset(n_students=200)
+    store = FeatureStore(dataset['students'], dataset['courses'], dataset['interests'], dataset['grades'])
+    predictor = GradePredictor(ML_DIR, cache_size=0, feature_store=store)
+    matrix = PredictionMatrix(store, store.student_ids[:50], store.course_ids, tempfile.mkdtemp())
+    matrix.rebuild(predictor)
+    
+    store.upsert_student(matrix.student_ids[0], "CSE", 9.6, 98, 9.5, ["AI", "Cloud"])
+    store.upsert_course(matrix.course_ids[0], "Security", 2, 4, 0.4)
+    matrix.refresh_students(predictor, [matrix.student_ids[0]])
+    matrix.refresh_courses(predictor, [matrix.course_ids[0]])
+    
+    live = predictor.predict_batch({
+        'student_id': np.repeat(np.array(matrix.student_ids, dtype=object), len(matrix.course_ids)),
+        'course_id': np.tile(np.array(matrix.course_ids, dtype=object), len(matrix.student_ids))
+    }).reshape(len(matrix.student_ids), len(matrix.course_ids))
+    assert np.abs(matrix.slice()['grades'] - live).max() < 1e-6
+    best = matrix.top_courses([matrix.student_ids[0]], n=1)[matrix.student_ids[0]][0]
+    assert best[1] == live[0].max()
+    
+    # A rebuild that reorders the matrix while a refresh predicts must not get the old row positions
+    predict = matrix._predict
+    def rebuild_midway(predictor, student_ids, course_ids):
+        matrix._predict = predict
+        matrix.rebuild(predictor, student_ids=matrix.student_ids[::-1])
+        return predict(predictor, student_ids, course_ids)
+    changed = matrix.student_ids[0]
+    matrix._predict = rebuild_midway
+    store.upsert_student(changed, "ECE", 5.1, 60, 5.0, ["Web"])
+    assert matrix.refresh_students(predictor, [changed]) == 1
+    expected = predict(predictor, matrix.student_ids, matrix.course_ids)
+    assert matrix.student_ids[-1] == changed and np.abs(matrix.slice()['grades'] - expected).max() < 1e-6
+    
+    saved = web_api.registry, web_api.prediction_matrix
+    try:
+        web_api.registry = types.SimpleNamespace(active=predictor)
+        web_api.prediction_matrix = matrix
+        client = web_api.app.test_client()
+        assert client.get(f'/matrix?students={changed}&top=1').status_code == 200
+        for top in ('0', '-2'):
+            response = client.get(f'/matrix?students={changed}&top={top}')
+            assert response.status_code == 400 and 'top' in response.get_json()['error']
+    finally:
+        web_api.registry, web_api.prediction_matrix = saved
+    print(f"✅ Matrix rows and columns refreshed ({matrix.grades.shape[0]} x {matrix.grades.shape[1]})")
+
+def test_evaluation_on_id_mappings():
+    """Columnar id mappings must decode to the JSON pairs, and group metrics must add up"""
+    print("🧪 Testing evaluation harness")
+    
+    import json
+    import shutil
+    import tempfile
+    from src.evaluation import CHECKED_METRICS, compare_with_metadata, evaluate_model, grouped_metrics, regression_metrics
+    from src.id_mappings import load_id_mappings
+    from src.synthetic_data import generate_dataset
+    
+    with tempfile.TemporaryDirectory() as models_dir:
+        shutil.copy(os.path.join(ML_DIR, "id_mappings.json"), models_dir)
+        with open(os.path.join(models_dir, "id_mappings.json"), 'r') as f:
+            pairs = json.load(f)['test_ids']
+        load_id_mappings(models_dir)
+        mappings = load_id_mappings(models_dir)
+        student_ids, course_ids = mappings.pairs('test')
+        assert os.path.exists(os.path.join(models_dir, "id_mappings.npz"))
+        assert list(student_ids) == [pair['student_id'] for pair in pairs]
+        assert list(course_ids) == [pair['course_id'] for pair in pairs]
+    
+    rng = np.random.RandomState(0)
+    y = rng.uniform(5, 10, len(pairs))
+    predictions = y + rng.normal(0, 0.5, len(pairs))
+    overall = regression_metrics(y, predictions)
+    groups = grouped_metrics(y, predictions, course_ids)
+    assert sum(group['n'] for group in groups.values()) == overall['n']
+    sse = sum(group['rmse'] ** 2 * group['n'] for group in groups.values())
+    assert abs(np.sqrt(sse / overall['n']) - overall['rmse']) < 1e-9
+    
+    # Re-evaluating a freshly trained version reproduces the metrics it recorded
+    dataset = generate_dataset(n_students=150, n_courses=10)
+    with tempfile.TemporaryDirectory() as models_dir:
+        metadata = _train_tiny_model(models_dir, dataset)
+        predictor = GradePredictor(models_dir, cache_size=0, monitor_drift=False)
+        results = evaluate_model(predictor, dataset, load_id_mappings(models_dir), folds=2, workers=1,
+                                 progress=lambda message: None)
+    assert results['test_samples'] == metadata['test_samples']
+    assert all(metadata.get(name) is not None and name in results for name in CHECKED_METRICS)
+    assert compare_with_metadata(results, metadata) == []
+    assert sum(group['n'] for group in results['breakdowns']['domain'].values()) == results['test_samples']
+    print(f"✅ {len(mappings)} pairs decoded, {len(groups)} course groups consistent with the overall RMSE")
+
+def test_drift_monitor_flags_shifted_inputs():
+    """Training-like traffic must score ok; rescaled attendance and a new branch must be flagged"""
+    print("🧪 Testing drift monitor")
+    
+    from src.drift_monitor import DriftMonitor, build_reference
+    from src.feature_plan import normalize_columns
+    from src.feature_store import FeatureStore
+    from src.synthetic_data import generate_dataset
+    
+    dataset = generate_dataset(n_students=400)
+    store = FeatureStore(dataset['students'], dataset['courses'], dataset['interests'], dataset['grades'])
+    predictor = GradePredictor(ML_DIR, cache_size=0, monitor_drift=False)
+    grades = dataset['grades']
+    columns = normalize_columns(store.fill_columns({
+        'student_id': grades['student_id'].to_numpy(), 'course_id': grades['course_id'].to_numpy()
+    }))
+    X = predictor.feature_plan.build_matrix(columns)
+    reference = build_reference(X, predictor._predict_matrix(X), predictor.selected_features,
+                                columns['branch_code'], columns['domain_tags'])
+    
+    monitor = DriftMonitor(reference, predictor.feature_plan)
+    sample = np.random.RandomState(1).choice(len(X), 2000)
+    same = {key: None if values is None else values[sample] if isinstance(values, np.ndarray)
+            else [values[i] for i in sample] for key, values in columns.items()}
+    monitor.observe_batch(same, predictor._predict_matrix(X[sample]))
+    sketch_bytes = monitor.total.counts.nbytes
+    assert monitor.check()['status'] == 'ok'
+    
+    shifted = dict(same, attendance=same['attendance'] / 100,
+                   branch_code=np.array(['AIML'] * len(sample), dtype=object))
+    for _ in range(5):
+        monitor.observe_batch(shifted, predictor._predict_matrix(predictor.feature_plan.build_matrix(shifted)))
+    report = monitor.check()
+    assert report['status'] == 'drift'
+    drifted = report['window']['drifted']
+    assert {'attendance', 'branch_code'} <= set(drifted)
+    assert monitor.total.counts.nbytes == sketch_bytes and monitor.total.n == 12000
+    
+    # Single predictions update the sketches row by row exactly like a block; malformed rows are dropped alone
+    monitor.reset()
+    batch_monitor = DriftMonitor(reference, predictor.feature_plan)
+    rows = sample[:63]
+    block = {key: None if values is None else values[rows] if isinstance(values, np.ndarray)
+             else [values[i] for i in rows] for key, values in columns.items()}
+    predictions = predictor._predict_matrix(X[rows])
+    batch_monitor.observe_batch(block, predictions)
+    for i, row in enumerate(rows):
+        student, course, interests = store.resolve({'student_id': grades['student_id'].iloc[row]},
+                                                   {'course_id': grades['course_id'].iloc[row]}, None)
+        monitor.observe(student, course, interests, predictions[i])
+    monitor.observe({"cgpa": "high"}, course, ["Web"], 7.5)
+    report = monitor.check()
+    assert report['dropped_rows'] == 1 and report['total']['rows'] == 63
+    assert (monitor.total.counts == batch_monitor.total.counts).all()
+    assert np.allclose(monitor.total.mean, batch_monitor.total.mean)
+    assert np.allclose(monitor.total.m2, batch_monitor.total.m2)
+    assert monitor.total.categories == batch_monitor.total.categories
+    print(f"✅ Drift flagged on {', '.join(drifted)}")
+
+def test_default_predictor_drift_ok_without_store():
+    """The shipped reference must score training-like traffic ok on the default (store-less) predictor"""
+    print("🧪 Testing drift status of the default predictor")
+    
+    from src.feature_plan import AGGREGATE_DEFAULTS
+    from src.feature_store import FeatureStore
+    from src.synthetic_data import generate_dataset
+    
+    # Same rows the shipped reference was profiled on, with the raw inputs a client sends
+    dataset = generate_dataset()
+    store = FeatureStore(dataset['students'], dataset['courses'], dataset['interests'], dataset['grades'])
+    grades = dataset['grades']
+    raw = store.fill_columns({
+        'student_id': grades['student_id'].to_numpy(), 'course_id': grades['course_id'].to_numpy()
+    })
+    for key in list(AGGREGATE_DEFAULTS) + ['student_id', 'course_id']:
+        raw.pop(key, None)
+    
+    predictor = GradePredictor(cache_size=0)
+    assert predictor.feature_store is None and predictor.drift_monitor is not None
+    predictor.predict_batch(raw)
+    report = predictor.drift_monitor.check()
+    assert report['status'] == 'ok', report['window'] and report['window']['drifted']
+    assert {'grade_consistency', 'course_avg_grade'} <= set(report['skipped_columns'])
+    assert 'predicted_grade' in report['window']['columns']
+    print(f"✅ Default predictor drift status ok (max PSI {report['window']['max_psi']:.3f})")
+
+def test_admin_routes_fail_closed():
+    """Admin routes answer 403 without ADMIN_TOKEN configured or with a wrong token"""
+    print("🧪 Testing admin route protection")
+    
+    import src.web_api as web_api
+    from src.model_registry import ModelRegistry
+    
+    client = web_api.app.test_client()
+    saved = web_api.ADMIN_TOKEN, web_api.registry
+    try:
+        web_api.ADMIN_TOKEN, web_api.registry = None, ModelRegistry(ML_DIR)
+        for method, path in (('get', '/admin/models'), ('post', '/admin/models/load'),
+                             ('post', '/admin/models/rollback')):
+            assert getattr(client, method)(path, headers={'X-Admin-Token': ''}).status_code == 403
+        
+        web_api.ADMIN_TOKEN = 'secret'
+        assert client.get('/admin/models').status_code == 403
+        assert client.get('/admin/models', headers={'X-Admin-Token': 'wrong'}).status_code == 403
+        response = client.get('/admin/models', headers={'X-Admin-Token': 'secret'})
+        assert response.status_code == 200 and 'base' in response.get_json()['available_versions']
+    finally:
+        web_api.ADMIN_TOKEN, web_api.registry = saved
+    print("✅ Admin routes refuse requests unless the configured token is sent")
+
+def test_registry_validates_activates_and_rolls_back():
+    """Versions are listed in natural order, inconsistent ones refused, swaps and rollbacks reported"""
+    print("🧪 Testing the model registry")
+    
+    import json
+    import tempfile
+    from src.model_registry import ModelRegistry, REQUIRED_FILES, BASE_VERSION
+    
+    with tempfile.TemporaryDirectory() as root_dir:
+        versions_dir = os.path.join(root_dir, "versions")
+        for version, directory in ((BASE_VERSION, root_dir), ('v2', None), ('v10', None), ('bad', None)):
+            directory = directory or os.path.join(versions_dir, version)
+            os.makedirs(directory, exist_ok=True)
+            for name in REQUIRED_FILES + ['compiled_model.bin']:
+                if not (version == 'bad' and name == "selected_features.json"):
+                    os.symlink(os.path.join(ML_DIR, name), os.path.join(directory, name))
+        with open(os.path.join(versions_dir, 'bad', "selected_features.json"), 'w') as f:
+            json.dump(["cgpa"], f)
+        # Incomplete directories are not versions
+        os.makedirs(os.path.join(versions_dir, 'v11'))
+        
+        registry = ModelRegistry(root_dir, cache_size=0)
+        swaps = []
+        registry.on_swap = swaps.append
+        assert registry.list_versions() == [BASE_VERSION, 'bad', 'v2', 'v10']
+        
+        registry.validate('v2')
+        for version in ('bad', 'v11', '../v2'):
+            try:
+                registry.validate(version)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError(f"Version {version!r} passed validation")
+        
+        base = registry.activate(BASE_VERSION)
+        newest = registry.activate()
+        assert registry.active is newest and newest.model_version == 'v10'
+        assert (registry.previous, registry.previous_version) == (base, BASE_VERSION)
+        try:
+            registry.activate('bad')
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("Inconsistent version was activated")
+        assert registry.active is newest and registry.status()['last_error'].startswith('bad')
+        
+        assert registry.rollback() == BASE_VERSION and registry.active is base
+        assert registry.rollback() == 'v10' and registry.active is newest
+        assert swaps == [BASE_VERSION, 'v10', BASE_VERSION, 'v10']
+    print("✅ Registry keeps the live model through failed loads and swaps back on rollback")
+
+def test_prefork_workers_follow_swaps_and_refuse_store_writes():
+    """A published swap signals the parent and other workers follow it; store writes need one process"""
+    print("🧪 Testing pre-fork model swap propagation")
+    
+    import signal
+    import tempfile
+    import threading
+    import src.production_server as production_server
+    import src.web_api as web_api
+    from src.feature_store import FeatureStore
+    from src.model_registry import ModelRegistry, REQUIRED_FILES, BASE_VERSION
+    
+    with tempfile.TemporaryDirectory() as root_dir:
+        for directory in (root_dir, os.path.join(root_dir, "versions", "v2")):
+            os.makedirs(directory, exist_ok=True)
+            for name in REQUIRED_FILES + ['compiled_model.bin']:
+                os.symlink(os.path.join(ML_DIR, name), os.path.join(directory, name))
+        version_file = os.path.join(root_dir, "active_version")
+        
+        # A worker (forked child) publishing a swap signals its parent, the pre-fork master
+        signalled = []
+        previous_handler = signal.signal(production_server.SWAP_SIGNAL, lambda signum, frame: signalled.append(signum))
+        try:
+            pid = os.fork()
+            if pid == 0:
+                code = 1
+                try:
+                    production_server._publish_version(version_file, 'v2')
+                    code = 0
+                finally:
+                    os._exit(code)
+            _, status = os.waitpid(pid, 0)
+            assert os.WEXITSTATUS(status) == 0 and signalled == [production_server.SWAP_SIGNAL]
+        finally:
+            signal.signal(production_server.SWAP_SIGNAL, previous_handler)
+        assert production_server._read_version(version_file) == 'v2'
+        
+        # A request counts toward the hung-worker timeout until its (streamed) body is closed
+        slots = [0.0, 0.0]
+        def streamed(environ, start_response):
+            start_response('200 OK', [])
+            yield b"a"
+            assert slots[1] > 0.0
+            yield b"b"
+        clock = production_server.RequestClock(streamed, slots, 1)
+        body = clock({}, lambda status, headers: None)
+        assert slots[1] > 0.0 and slots[0] == 0.0
+        assert b"".join(body) == b"ab"
+        body.close()
+        assert slots[1] == 0.0
+        
+        saved = web_api.registry, web_api.feature_store, web_api.worker_processes
+        try:
+            web_api.registry = ModelRegistry(root_dir, cache_size=0)
+            web_api.registry.activate(BASE_VERSION)
+            sync_lock = threading.Lock()
+            production_server._follow_version(version_file, sync_lock)
+            followed = web_api.registry.active
+            assert web_api.registry.active_version == 'v2'
+            production_server._follow_version(version_file, sync_lock)
+            assert web_api.registry.active is followed, "Worker reloaded the version it already serves"
+            
+            with open(version_file, 'w') as f:
+                f.write('v3')
+            production_server._follow_version(version_file, sync_lock)
+            assert web_api.registry.active is followed, "A version that fails to load replaced the live one"
+            
+            web_api.feature_store = FeatureStore(
+                pd.DataFrame({'student_id': ['S1'], 'branch_code': ['CSE'], 'cgpa': [8.0], 'attendance': [90.0],
+                              'previous_avg': [8.1]}),
+                pd.DataFrame({'course_id': ['C1'], 'domain_tags': ['AI'], 'difficulty_level': [3], 'credits': [4],
+                              'theory_weight': [0.6]}),
+                pd.DataFrame({'student_id': [], 'domain': []}),
+                pd.DataFrame({'student_id': [], 'course_id': [], 'grade': []}))
+            client = web_api.app.test_client()
+            profile = {'branch_code': 'ME', 'cgpa': 7.0, 'attendance': 80.0, 'previous_avg': 7.2}
+            web_api.worker_processes = 2
+            assert client.put('/students/S2', json=profile).status_code == 409
+            assert client.post('/grades', json=[{'student_id': 'S1', 'course_id': 'C1', 'grade': 8}]).status_code == 409
+            assert not web_api.feature_store.has_student('S2')
+            web_api.worker_processes = 1
+            assert client.put('/students/S2', json=profile).status_code == 200
+            assert web_api.feature_store.has_student('S2')
+        finally:
+            web_api.registry, web_api.feature_store, web_api.worker_processes = saved
+    print("✅ Swaps reach every worker and multi-process store writes are refused")
+
+def test_feature_store_aggregates_and_upserts():
+    """Aggregates follow add_grades, upserts are resolved, and reads stay consistent during upserts"""
+    print("🧪 Testing the feature store")
+    
+    import threading
+    from src.feature_store import FeatureStore, DEFAULT_COURSE_AVG_GRADE, DEFAULT_GRADE_CONSISTENCY
+    
+    students = pd.DataFrame({'student_id': ['S1', 'S2'], 'branch_code': ['CSE', 'ME'], 'cgpa': [8.0, 7.0],
+                             'attendance': [90.0, 80.0], 'previous_avg': [8.1, 6.9]})
+    courses = pd.DataFrame({'course_id': ['C1', 'C2'], 'domain_tags': ['AI', 'Web'], 'difficulty_level': [3, 2],
+                            'credits': [4, 3], 'theory_weight': [0.6, 0.4]})
+    interests = pd.DataFrame({'student_id': ['S1', 'S1'], 'domain': ['AI', 'Cloud']})
+    store = FeatureStore(students, courses, interests, pd.DataFrame(
+        {'student_id': ['S1'], 'course_id': ['C1'], 'grade': [8.0]}))
+    
+    codes = store.student_codes(['S1', 'S2'])
+    assert np.allclose(store.grade_consistency(codes), DEFAULT_GRADE_CONSISTENCY)
+    store.add_grades(['S1', 'S1', 'S2'], ['C2', 'C1', 'C2'], [6.0, 7.0, 9.0])
+    assert np.isclose(store.grade_consistency(store.student_codes(['S1']))[0], 1 / (1 + np.std([8, 6, 7], ddof=1)))
+    assert np.allclose(store.course_avg_grade(store.course_codes(['C1', 'C2'])), [7.5, 7.5])
+    
+    store.upsert_student('S3', 'EE', 9.0, 95.0, 9.1, ['Web'])
+    store.upsert_course('C2', 'Security', 5, 2, 0.9)
+    store.upsert_course('C3', 'ML', 1, 2, 0.5)
+    student, course, interests = store.resolve({'student_id': 'S3'}, {'course_id': 'C2'}, None)
+    assert student['cgpa'] == 9.0 and interests == ['Web'] and student['grade_consistency'] == DEFAULT_GRADE_CONSISTENCY
+    assert course['domain_tags'] == 'Security' and course['difficulty_level'] == 5
+    assert store.resolve({}, {'course_id': 'C3'}, [])[1]['course_avg_grade'] == DEFAULT_COURSE_AVG_GRADE
+    assert store.resolve({'student_id': 'S1'}, {}, None)[2] == ['AI', 'Cloud']
+    
+    # Readers run while new students keep growing the arrays
+    errors = []
+    def read():
+        for _ in range(300):
+            try:
+                raw = store.fill_columns({'student_id': ['S1', 'S2', 'S3'], 'course_id': ['C1', 'C2', 'C3']})
+                assert list(raw['cgpa']) == [8.0, 7.0, 9.0] and list(raw['branch_code']) == ['CSE', 'ME', 'EE']
+            except Exception as e:
+                errors.append(e)
+    reader = threading.Thread(target=read)
+    reader.start()
+    for i in range(300):
+        store.upsert_student(f"N{i:03d}", 'CE', 6.0, 70.0, 6.0)
+    reader.join()
+    assert not errors, errors[0]
+    assert len(store.student_ids) == 303
+    print("✅ Feature store aggregates and upserts are consistent")
+
+def test_training_writes_loadable_artifacts():
+    """Tiny synthetic training: train rows get leave-one-out aggregates and the version loads and predicts"""
+    print("🧪 Testing the training pipeline")
+    
+    import json
+    import tempfile
+    from src.feature_store import FeatureStore
+    from src.synthetic_data import generate_dataset
+    from src.training_pipeline import build_features, split_rows
+    
+    dataset = generate_dataset(n_students=200, n_courses=12)
+    grades = dataset['grades']
+    features = ['grade_consistency', 'course_avg_grade']
+    train_rows, test_rows = split_rows(len(grades))
+    X_train, X_test = build_features(dataset, train_rows, test_rows, features)
+    # A train row's aggregates equal those of a store that never saw its grade
+    for i in (0, len(train_rows) // 2):
+        others = np.delete(train_rows, i)
+        store = FeatureStore(dataset['students'], dataset['courses'], dataset['interests'], grades.iloc[others])
+        row = grades.iloc[train_rows[i]]
+        expected = [store.grade_consistency(store.student_codes([row['student_id']]))[0],
+                    store.course_avg_grade(store.course_codes([row['course_id']]))[0]]
+        assert np.allclose(X_train[i], expected)
+    
+    with tempfile.TemporaryDirectory() as models_dir:
+        metadata = _train_tiny_model(models_dir, dataset)
+        assert metadata['training_samples'] == len(train_rows) and metadata['test_samples'] == len(test_rows)
+        with open(os.path.join(models_dir, "id_mappings.json"), 'r') as f:
+            assert len(json.load(f)['test_ids']) == len(test_rows)
+        predictor = GradePredictor(models_dir, cache_size=0)
+        store = FeatureStore(dataset['students'], dataset['courses'], dataset['interests'], grades)
+        records = store.fill_columns({'student_id': grades['student_id'].to_numpy()[:50],
+                                      'course_id': grades['course_id'].to_numpy()[:50]})
+        predictions = predictor.predict_batch(records, observe=False)
+        assert predictions.shape == (50,) and ((predictions >= 5.0) & (predictions <= 10.0)).all()
+        assert metadata['test_r2'] > 0.3 and predictor.metadata['hyperparameters'] == metadata['hyperparameters']
+    print(f"✅ Trained and reloaded a synthetic version (test R² {metadata['test_r2']:.3f})")
+
+def test_incremental_update_gated_by_metrics():
+    """A warm-start update is written only when held-out metrics hold; CV and hyperparameters are not carried over"""
+    print("🧪 Testing incremental updates")
+    
+    import tempfile
+    from src.drift_monitor import load_reference
+    from src.incremental_update import update_model
+    from src.synthetic_data import generate_dataset
+    
+    dataset = generate_dataset(n_students=200, n_courses=12)
+    new_grades = dataset['grades'].iloc[-300:]
+    dataset['grades'] = dataset['grades'].iloc[:-300].reset_index(drop=True)
+    quiet = lambda message: None
+    with tempfile.TemporaryDirectory() as models_dir:
+        base_metadata = _train_tiny_model(models_dir, dataset)
+        
+        accepted, metadata = update_model(new_grades, dataset, new_version='v2', stages=5, tolerance=1.0,
+                                          models_dir=models_dir, progress=quiet)
+        assert accepted and os.path.isdir(os.path.join(models_dir, "versions", "v2"))
+        assert metadata['cv_mean_r2'] is None and 'search_results' not in metadata
+        assert metadata['hyperparameters'] == base_metadata['hyperparameters']
+        assert metadata['lineage'][-1]['added_stages'] == 5 and metadata['lineage'][-1]['total_stages'] == 35
+        updated = GradePredictor(os.path.join(models_dir, "versions", "v2"), cache_size=0, monitor_drift=False)
+        assert len(updated.model.estimators_) == 35
+        # The drift reference is profiled on the updated model, not copied from the parent
+        reference = load_reference(os.path.join(models_dir, "versions", "v2"))
+        assert reference['source'] == "update of base" and 'predicted_grade' in reference['storeless']
+        assert reference['rows'] == metadata['lineage'][-1]['new_records'] + metadata['test_samples']
+        
+        # A negative tolerance makes any result count as worse
+        accepted, _ = update_model(new_grades, dataset, new_version='v3', stages=5, tolerance=-1.0,
+                                   models_dir=models_dir, progress=quiet)
+        assert not accepted and not os.path.exists(os.path.join(models_dir, "versions", "v3"))
+    print("✅ Updates are gated by held-out metrics")
+
+def test_tenant_pool_loads_once_and_evicts():
+    """Each tenant loads once; the LRU entry goes when over the model count or the byte budget"""
+    print("🧪 Testing the tenant model pool")
+    
+    import tempfile
+    from src.model_registry import REQUIRED_FILES
+    from src.tenant_pool import TenantModelPool, UnknownTenantError
+    
+    with tempfile.TemporaryDirectory() as tenants_dir:
+        for tenant in ('a', 'b', 'c'):
+            os.makedirs(os.path.join(tenants_dir, tenant))
+            for name in REQUIRED_FILES + ['compiled_model.bin']:
+                os.symlink(os.path.join(ML_DIR, name), os.path.join(tenants_dir, tenant, name))
+        
+        pool = TenantModelPool(tenants_dir, max_models=2, cache_size=0)
+        first = pool.get('a')
+        assert pool.get('a') is first and (pool.misses, pool.hits) == (1, 1)
+        pool.get('b')
+        pool.get('c')
+        assert [model['tenant'] for model in pool.stats()['models']] == ['b', 'c'] and pool.evictions == 1
+        try:
+            pool.get('../a')
+            assert False, "path-like tenant accepted"
+        except UnknownTenantError:
+            pass
+        
+        # Building an explainer grows the estimate; the budget then only fits one model
+        pool.get('b').get_explainer()
+        sizes = {model['tenant']: model['bytes'] for model in pool.stats()['models']}
+        assert sizes['b'] > sizes['c'] + 10 * 1024 * 1024
+        pool.max_bytes = sizes['b'] + 1
+        pool.get('b')
+        assert [model['tenant'] for model in pool.stats()['models']] == ['b'] and pool.evictions == 2
+    print("✅ Tenant pool loads lazily and evicts by count and bytes")
+
+def test_metrics_spans_and_endpoint():
+    """Spans are no-ops while disabled; enabled, /metrics exposes stage histograms and request counters"""
+    print("🧪 Testing metrics")
+    
+    import src.web_api as web_api
+    from src.metrics import METRICS, MetricsRegistry
+    from src.model_registry import ModelRegistry
+    
+    disabled = MetricsRegistry()
+    with disabled.span('build_features'):
+        disabled.inc('grade_http_errors_total')
+    assert disabled.render_prometheus() == "\n"
+    
+    record = {"student": {"cgpa": 8.2, "attendance": 88, "previous_avg": 7.9, "branch_code": "ECE"},
+              "course": {"difficulty_level": 3, "credits": 3, "theory_weight": 0.7, "domain_tags": "Web"},
+              "interests": ["Web"]}
+    saved = web_api.registry, METRICS.enabled
+    try:
+        web_api.registry = ModelRegistry(ML_DIR, use_lookup=False)
+        web_api.registry.activate()
+        METRICS.enabled = True
+        METRICS.reset()
+        client = web_api.app.test_client()
+        for _ in range(3):
+            assert client.post('/predict', json=record).status_code == 200
+        assert client.post('/predict', data='not json', content_type='text/plain').status_code == 400
+        body = client.get('/metrics').get_data(as_text=True)
+    finally:
+        web_api.registry, METRICS.enabled = saved
+        METRICS.reset()
+    
+    lines = body.splitlines()
+    # The first call misses the cache and runs the model, the other two are cache hits
+    assert 'grade_stage_duration_seconds_count{stage="model_predict"} 1' in lines
+    assert 'grade_stage_duration_seconds_count{stage="cache_lookup"} 3' in lines
+    assert 'grade_stage_duration_seconds_bucket{stage="cache_lookup",le="+Inf"} 3' in lines
+    assert 'grade_http_requests_total{endpoint="/predict",status="200"} 3' in lines
+    assert 'grade_http_errors_total{endpoint="/predict"} 1' in lines
+    assert 'grade_cache_hits_total 2' in lines and 'grade_cache_misses_total 1' in lines
+    assert "# Stage timings disabled" not in body
+    print("✅ Stage latencies, request counters and cache counters are exported")
+
+def test_benchmark_inputs_reproducible_and_regressions_flagged():
+    """Synthetic benchmark inputs depend only on the seed; compare flags slowdowns past the tolerance"""
+    print("🧪 Testing benchmark inputs and regression checks")
+    
+    from src.benchmark import compare
+    from src.synthetic_data import generate_dataset, prediction_records
+    
+    first, again = generate_dataset(50, 10, seed=7), generate_dataset(50, 10, seed=7)
+    for table in first:
+        pd.testing.assert_frame_equal(first[table], again[table])
+    assert not first['grades'].equals(generate_dataset(50, 10, seed=8)['grades'])
+    assert set(first['grades']['student_id']) <= set(first['students']['student_id'])
+    assert set(first['grades']['course_id']) <= set(first['courses']['course_id'])
+    
+    records = prediction_records(200, seed=7)
+    pd.testing.assert_frame_equal(records, prediction_records(200, seed=7))
+    grades = GradePredictor(ML_DIR, cache_size=0).predict_batch(records)
+    assert len(grades) == 200 and ((grades >= 5.0) & (grades <= 10.0)).all()
+    
+    baseline = {'environment': {'cpu_count': 8}, 'batch': {'100': {'rows_per_sec': 1000.0}},
+                'single_row': {'p99_ms': 2.0}, 'model_load': {'load_seconds': 1.0, 'repeats': 3}}
+    current = {'environment': {'cpu_count': 1}, 'batch': {'100': {'rows_per_sec': 700.0}},
+               'single_row': {'p99_ms': 2.2}, 'model_load': {'load_seconds': 1.5, 'repeats': 1}}
+    regressions = compare(current, baseline, tolerance=0.25)
+    assert sorted(r['metric'] for r in regressions) == ['batch.100.rows_per_sec', 'model_load.load_seconds']
+    assert compare(baseline, baseline) == []
+    print("✅ Same seed, same inputs; only slowdowns past the tolerance are regressions")
+
+def test_feature_plan_rejects_unknown_features():
+    """Selected features without a kernel must fail when the plan is compiled"""
+    print("🧪 Testing feature plan compilation")
+    
+    try:
+        FeaturePlan(["cgpa", "shoe_size"])
+    except ValueError as e:
+        assert "shoe_size" in str(e)
+        print(f"✅ Unknown feature rejected: {e}")
+    else:
+        raise AssertionError("FeaturePlan accepted an unknown feature")
 
 if __name__ == "__main__":
-    test_predictor()
\ No newline at end of file
+    test_predictor()
+    test_batch_matches_single()
+    test_batch_endpoint_reports_per_record_errors()
+    test_bulk_scoring_keeps_row_order()
+    test_micro_batcher_matches_single_and_uses_cache()
+    test_prediction_cache_lru_ttl_and_invalidation()
+    test_compiled_engine_matches_sklearn()
+    test_what_if_matches_batch()
+    test_recommendations_ranked_and_filtered()
+    test_artifact_matches_pickles()
+    test_lookup_matches_model_on_grid()
+    test_explanations_add_up()
+    test_prediction_matrix_refresh()
+    test_evaluation_on_id_mappings()
+    test_drift_monitor_flags_shifted_inputs()
+    test_default_predictor_drift_ok_without_store()
+    test_admin_routes_fail_closed()
+    test_registry_validates_activates_and_rolls_back()
+    test_prefork_workers_follow_swaps_and_refuse_store_writes()
+    test_feature_store_aggregates_and_upserts()
+    test_training_writes_loadable_artifacts()
+    test_incremental_update_gated_by_metrics()
+    test_tenant_pool_loads_once_and_evicts()
+    test_metrics_spans_and_endpoint()
+    test_benchmark_inputs_reproducible_and_regressions_flagged()
+    test_feature_plan_rejects_unknown_features()
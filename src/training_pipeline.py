@@ -0,0 +1,348 @@
+import argparse
+import itertools
+import json
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from src.feature_plan import FeaturePlan, KERNELS, normalize_columns
+from src.feature_store import FeatureStore, STUDENTS_FILE, COURSES_FILE, INTERESTS_FILE, GRADES_FILE
+from src.drift_monitor import build_reference, save_reference, storeless_matrix
+from src.model_artifact import compile_artifact
+from src.predictor import DEFAULT_MODELS_DIR
+from src.synthetic_data import generate_dataset, DEFAULT_SEED
+
+# Hyperparameters tried by default (the deployed model uses 150 / 6 / 0.1)
+DEFAULT_PARAM_GRID = {
+    'n_estimators': [100, 150],
+    'max_depth': [4, 6],
+    'learning_rate': [0.05, 0.1]
+}
+DEFAULT_TEST_SIZE = 0.2
+DEFAULT_CV_FOLDS = 5
+# Hyperparameter search runs on at most this many training rows; the final fit uses all of them
+DEFAULT_SEARCH_ROWS = 200000
+TOP_FEATURES = 10
+
+# Training matrix shared with the search workers (set once per worker process)
+_search_X = None
+_search_y = None
+
+
+def load_dataset(data_dir):
+    """Read students/courses/interests/grades CSVs (the feature store layout)"""
+    def read(name):
+        return pd.read_csv(os.path.join(data_dir, name))
+
+    dataset = {'students': read(STUDENTS_FILE), 'courses': read(COURSES_FILE), 'grades': read(GRADES_FILE)}
+    interests_path = os.path.join(data_dir, INTERESTS_FILE)
+    dataset['interests'] = pd.read_csv(interests_path) if os.path.exists(interests_path) else None
+    return dataset
+
+
+def split_rows(n_rows, test_size=DEFAULT_TEST_SIZE, seed=DEFAULT_SEED):
+    """Shuffled train/test row indices"""
+    order = np.random.RandomState(seed).permutation(n_rows)
+    n_test = int(round(n_rows * test_size))
+    return np.sort(order[n_test:]), np.sort(order[:n_test])
+
+
+def build_features(dataset, train_rows, test_rows, features):
+    """
+    Feature matrices for the train and test grade rows
+
+    Historical aggregates (grade_consistency, course_avg_grade) come from a
+    FeatureStore fed with the training grades only. Test rows see all of
+    them; each train row sees them leave-one-out, without its own grade, so
+    no row's features contain its label (as in incremental updates, where
+    new rows see the aggregates from before their grade arrived). Columns
+    are then built by the same FeaturePlan kernels GradePredictor uses at
+    serving time.
+    """
+    grades = dataset['grades']
+    store = FeatureStore(dataset['students'], dataset['courses'], dataset['interests'],
+                         grades.iloc[train_rows])
+    plan = FeaturePlan(features)
+
+    student_ids = grades['student_id'].to_numpy().astype(str)
+    course_ids = grades['course_id'].to_numpy().astype(str)
+    labels = grades['grade'].to_numpy(dtype=np.float64)
+    return (feature_matrix(store, plan, student_ids[train_rows], course_ids[train_rows], labels[train_rows]),
+            feature_matrix(store, plan, student_ids[test_rows], course_ids[test_rows]))
+
+
+def feature_matrix(store, plan, student_ids, course_ids, own_grades=None):
+    """
+    Feature matrix for (student_id, course_id) pairs, profiles and aggregates from the store
+
+    own_grades: grade of each pair, already recorded in the store, to leave
+    out of that row's aggregates
+    """
+    raw = {'student_id': student_ids, 'course_id': course_ids}
+    if own_grades is not None:
+        raw['grade_consistency'], raw['course_avg_grade'] = store.leave_one_out(student_ids, course_ids, own_grades)
+    return plan.build_matrix(normalize_columns(store.fill_columns(raw)))
+
+
+def param_candidates(param_grid):
+    """Every combination of the grid as a list of dicts"""
+    keys = sorted(param_grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(param_grid[key] for key in keys))]
+
+
+def _init_search_worker(X, y):
+    global _search_X, _search_y
+    _search_X, _search_y = X, y
+
+
+def _fit(X, y, params, seed):
+    from sklearn.ensemble import GradientBoostingRegressor
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler().fit(X)
+    model = GradientBoostingRegressor(random_state=seed, **params)
+    model.fit(scaler.transform(X), y)
+    return scaler, model
+
+
+def _score_fold(task):
+    """R² of one (candidate, fold) pair; runs in a search worker"""
+    from sklearn.metrics import r2_score
+
+    candidate_index, params, train_idx, valid_idx, seed = task
+    scaler, model = _fit(_search_X[train_idx], _search_y[train_idx], params, seed)
+    score = r2_score(_search_y[valid_idx], model.predict(scaler.transform(_search_X[valid_idx])))
+    return candidate_index, score
+
+
+def search(X, y, candidates, folds=DEFAULT_CV_FOLDS, workers=None, seed=DEFAULT_SEED):
+    """
+    K-fold cross-validation of every candidate on a process pool
+
+    Every (candidate, fold) pair is one task; the matrix is sent to each
+    worker once through the pool initializer.
+
+    Returns:
+    list of {'params', 'cv_scores', 'cv_mean_r2'}, best first
+    """
+    order = np.random.RandomState(seed).permutation(len(X))
+    fold_rows = np.array_split(order, folds)
+    tasks = []
+    for i, params in enumerate(candidates):
+        for k in range(folds):
+            train_idx = np.concatenate([fold_rows[j] for j in range(folds) if j != k])
+            tasks.append((i, params, train_idx, fold_rows[k], seed))
+
+    scores = [[] for _ in candidates]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_search_worker(X, y)
+        results = map(_score_fold, tasks)
+    else:
+        pool = ProcessPoolExecutor(workers, initializer=_init_search_worker, initargs=(X, y))
+        results = pool.map(_score_fold, tasks)
+    try:
+        for candidate_index, score in results:
+            scores[candidate_index].append(float(score))
+    finally:
+        if workers != 1:
+            pool.shutdown()
+
+    ranked = [
+        {'params': params, 'cv_scores': fold_scores, 'cv_mean_r2': float(np.mean(fold_scores))}
+        for params, fold_scores in zip(candidates, scores)
+    ]
+    return sorted(ranked, key=lambda result: -result['cv_mean_r2'])
+
+
+def evaluate(model, scaler, X, y):
+    """RMSE / MAE / R² on a held-out matrix"""
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+    predictions = model.predict(scaler.transform(X))
+    return {
+        'test_rmse': float(np.sqrt(mean_squared_error(y, predictions))),
+        'test_mae': float(mean_absolute_error(y, predictions)),
+        'test_r2': float(r2_score(y, predictions))
+    }
+
+
+def save_artifacts(output_dir, model, scaler, features, metadata, id_mappings=None, drift_reference=None):
+    """Write the artifact set GradePredictor / ModelRegistry load"""
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, "improved_feature_model.pkl"), 'wb') as f:
+        pickle.dump(model, f)
+    with open(os.path.join(output_dir, "feature_scaler.pkl"), 'wb') as f:
+        pickle.dump(scaler, f)
+    with open(os.path.join(output_dir, "selected_features.json"), 'w') as f:
+        json.dump(features, f)
+    with open(os.path.join(output_dir, "improved_model_metadata.json"), 'w') as f:
+        json.dump(metadata, f, indent=2)
+    if id_mappings is not None:
+        with open(os.path.join(output_dir, "id_mappings.json"), 'w') as f:
+            json.dump(id_mappings, f)
+    if drift_reference is not None:
+        save_reference(output_dir, drift_reference)
+    # Fast-loading single-file copy for serving
+    compile_artifact(output_dir)
+
+
+def train(dataset, features, output_dir, param_grid=None, folds=DEFAULT_CV_FOLDS,
+          search_rows=DEFAULT_SEARCH_ROWS, test_size=DEFAULT_TEST_SIZE, workers=None,
+          seed=DEFAULT_SEED, model_version=None, data_source=None, timings=None, progress=print):
+    """
+    Search, fit, evaluate and save a GradientBoosting grade model
+
+    Parameters:
+    dataset: dict of DataFrames 'students', 'courses', 'interests', 'grades'
+    features: feature names to train on (each needs a FeaturePlan kernel)
+    output_dir: where the artifact set is written
+    timings: optional dict of earlier stage timings (e.g. data loading) to record
+
+    Returns:
+    the metadata dict written next to the model
+    """
+    from sklearn.preprocessing import StandardScaler
+
+    timings = dict(timings or {})
+    start = time.perf_counter()
+    grades = dataset['grades']
+    train_rows, test_rows = split_rows(len(grades), test_size, seed)
+    X_train, X_test = build_features(dataset, train_rows, test_rows, features)
+    y = grades['grade'].to_numpy(dtype=np.float64)
+    y_train, y_test = y[train_rows], y[test_rows]
+    timings['build_features_seconds'] = time.perf_counter() - start
+    progress(f"🔧 Built {len(X_train)} x {len(features)} training matrix "
+             f"in {timings['build_features_seconds']:.2f}s")
+
+    start = time.perf_counter()
+    search_idx = np.arange(len(X_train))
+    if len(search_idx) > search_rows:
+        search_idx = np.sort(np.random.RandomState(seed).choice(search_idx, search_rows, replace=False))
+    candidates = param_candidates(param_grid or DEFAULT_PARAM_GRID)
+    ranked = search(X_train[search_idx], y_train[search_idx], candidates, folds, workers, seed)
+    best = ranked[0]
+    timings['search_seconds'] = time.perf_counter() - start
+    progress(f"🔍 {len(candidates)} candidates x {folds} folds in {timings['search_seconds']:.2f}s, "
+             f"best {best['params']} (CV R² {best['cv_mean_r2']:.4f})")
+
+    start = time.perf_counter()
+    # Fitted on a DataFrame so the scaler keeps feature names, like the notebook's scaler
+    scaler = StandardScaler().fit(pd.DataFrame(X_train, columns=features))
+    from sklearn.ensemble import GradientBoostingRegressor
+    model = GradientBoostingRegressor(random_state=seed, **best['params'])
+    model.fit(scaler.transform(pd.DataFrame(X_train, columns=features)), y_train)
+    timings['final_fit_seconds'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    test_metrics = evaluate(model, scaler, pd.DataFrame(X_test, columns=features), y_test)
+    timings['evaluate_seconds'] = time.perf_counter() - start
+    progress(f"🎯 Test R² {test_metrics['test_r2']:.4f}, RMSE {test_metrics['test_rmse']:.4f}")
+
+    # Profile of the training inputs / predictions that serving is compared against
+    def served(X):
+        return np.clip(np.round(model.predict(scaler.transform(pd.DataFrame(X, columns=features))), 2), 5.0, 10.0)
+
+    train_predictions = served(X_train)
+    train_grades = grades.iloc[train_rows]
+    drift_reference = build_reference(
+        X_train, train_predictions, features,
+        dataset['students'].set_index('student_id')['branch_code'].loc[train_grades['student_id']].to_numpy(),
+        dataset['courses'].set_index('course_id')['domain_tags'].loc[train_grades['course_id']].to_numpy(),
+        source=data_source, storeless_predictions=served(storeless_matrix(X_train, features))
+    )
+
+    importances = sorted(zip(features, model.feature_importances_), key=lambda item: -item[1])
+    metadata = {
+        'model_type': 'GradientBoosting',
+        'model_version': model_version,
+        'features_used': list(features),
+        'training_samples': int(len(X_train)),
+        'test_samples': int(len(X_test)),
+        **test_metrics,
+        'cv_mean_r2': best['cv_mean_r2'],
+        'top_features': [
+            {'feature': feature, 'importance': float(importance)}
+            for feature, importance in importances[:TOP_FEATURES]
+        ],
+        'hyperparameters': best['params'],
+        'search_results': ranked,
+        'search_rows': int(len(search_idx)),
+        'data_source': data_source,
+        'seed': seed,
+        'timings': timings
+    }
+
+    id_mappings = {
+        name: [{'student_id': str(s), 'course_id': str(c)}
+               for s, c in zip(grades['student_id'].to_numpy()[rows], grades['course_id'].to_numpy()[rows])]
+        for name, rows in (('train_ids', train_rows), ('test_ids', test_rows))
+    }
+    save_artifacts(output_dir, model, scaler, list(features), metadata, id_mappings, drift_reference)
+    progress(f"💾 Artifacts written to {output_dir}")
+    return metadata
+
+
+def default_features(models_dir=DEFAULT_MODELS_DIR):
+    """Feature list of the deployed model, so new versions stay drop-in compatible"""
+    with open(os.path.join(models_dir, "selected_features.json"), 'r') as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train a grade prediction model")
+    parser.add_argument("--data-dir", default=None,
+                        help="Directory with students/courses/interests/grades CSVs (default: generate synthetic data)")
+    parser.add_argument("--students", type=int, default=1000, help="Synthetic students")
+    parser.add_argument("--courses", type=int, default=30, help="Synthetic courses")
+    parser.add_argument("--version", default=None, help="Version name (default: timestamp)")
+    parser.add_argument("--output-dir", default=None, help="Artifact directory (default: ML/versions/<version>)")
+    parser.add_argument("--features", default=None,
+                        help="Comma-separated feature list, 'all', or default: the deployed selected_features.json")
+    parser.add_argument("--param-grid", default=None, help="JSON dict of hyperparameter lists")
+    parser.add_argument("--folds", type=int, default=DEFAULT_CV_FOLDS)
+    parser.add_argument("--search-rows", type=int, default=DEFAULT_SEARCH_ROWS)
+    parser.add_argument("--test-size", type=float, default=DEFAULT_TEST_SIZE)
+    parser.add_argument("--workers", type=int, default=None, help="Search processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.data_dir:
+        dataset = load_dataset(args.data_dir)
+        source = args.data_dir
+    else:
+        dataset = generate_dataset(args.students, args.courses, seed=args.seed)
+        source = 'synthetic'
+    load_seconds = time.perf_counter() - start
+    print(f"📚 {len(dataset['grades'])} grade records from {source} in {load_seconds:.2f}s")
+
+    if args.features == 'all':
+        features = list(KERNELS)
+    elif args.features:
+        features = [feature.strip() for feature in args.features.split(',') if feature.strip()]
+    else:
+        features = default_features()
+
+    version = args.version or time.strftime('v%Y%m%d-%H%M%S')
+    output_dir = args.output_dir or os.path.join(DEFAULT_MODELS_DIR, "versions", version)
+    param_grid = json.loads(args.param_grid) if args.param_grid else None
+
+    metadata = train(dataset, features, output_dir, param_grid, args.folds, args.search_rows,
+                     args.test_size, args.workers, args.seed, model_version=version,
+                     data_source=source, timings={'load_data_seconds': load_seconds})
+
+    print("\n⏱️  Timings:")
+    for name, seconds in metadata['timings'].items():
+        print(f"  {name:<25} {seconds:8.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+import numpy as np
+
+# metadata['model_type'] values the compiled engine knows how to evaluate
+SUPPORTED_MODEL_TYPES = ('GradientBoosting',)
+
+
+class CompiledGradientBoosting:
+    """
+    Array-based evaluator for a fitted sklearn GradientBoostingRegressor
+
+    All trees are flattened into one set of NumPy arrays (feature, threshold,
+    left, right, value). Leaves point to themselves, so every row walks every
+    tree for exactly max_depth steps with no branching in Python. When a
+    StandardScaler is given it is folded into the split thresholds, so raw
+    (unscaled) features go straight in.
+    """
+
+    # Rows evaluated per pass; keeps the (rows x trees) working set in cache
+    CHUNK_SIZE = 512
+
+    def __init__(self, feature, threshold, left, right, value, roots, init_value, max_depth, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.init_value = init_value
+        self.max_depth = max_depth
+        self.n_features = n_features
+
+        # children[2 * node] is the left child, children[2 * node + 1] the right one
+        self.children = np.stack([left, right], axis=1).ravel()
+
+    @classmethod
+    def from_sklearn(cls, model, scaler=None):
+        """
+        Compile a fitted GradientBoostingRegressor (and optional StandardScaler)
+
+        Leaf values are pre-multiplied by the learning rate.
+        """
+        if model.estimators_.shape[1] != 1:
+            raise ValueError("Only single-output GradientBoosting regressors are supported")
+
+        n_features = model.n_features_in_
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in model.estimators_[:, 0]:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+
+            feature = np.where(is_leaf, 0, tree.feature)
+            threshold = np.where(is_leaf, np.inf, tree.threshold)
+            left = np.where(is_leaf, node_ids, tree.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right) + offset
+
+            features.append(feature)
+            thresholds.append(threshold)
+            lefts.append(left)
+            rights.append(right)
+            values.append(tree.value[:, 0, 0] * model.learning_rate)
+            roots.append(offset)
+
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        feature = np.concatenate(features).astype(np.intp)
+        threshold = np.concatenate(thresholds).astype(np.float64)
+
+        if scaler is not None:
+            mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(n_features)
+            scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n_features)
+            split = np.isfinite(threshold)
+            threshold[split] = fold_scaler_thresholds(
+                threshold[split], mean[feature[split]], scale[feature[split]]
+            )
+
+        if isinstance(model.init_, str) and model.init_ == 'zero':
+            init_value = 0.0
+        else:
+            init_value = float(np.ravel(model.init_.constant_)[0])
+
+        return cls(
+            feature=feature,
+            threshold=threshold,
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            value=np.concatenate(values).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            init_value=init_value,
+            max_depth=max_depth,
+            n_features=n_features
+        )
+
+    def predict(self, X):
+        """Predict raw (unscaled) feature rows, shape (n_rows, n_features)"""
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        if X.shape[0] <= self.CHUNK_SIZE:
+            return self.init_value + self.value.take(self.apply(X)).sum(axis=1)
+
+        predictions = np.empty(X.shape[0])
+        for start in range(0, X.shape[0], self.CHUNK_SIZE):
+            chunk = X[start:start + self.CHUNK_SIZE]
+            predictions[start:start + len(chunk)] = self.init_value + self.value.take(self.apply(chunk)).sum(axis=1)
+        return predictions
+
+    def apply(self, X):
+        """Leaf index reached in every tree, shape (n_rows, n_trees)"""
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        row_offsets = (np.arange(n_rows) * n_features)[:, None]
+        nodes = np.tile(self.roots, (n_rows, 1))
+
+        for _ in range(self.max_depth):
+            values = flat_X.take(row_offsets + self.feature.take(nodes))
+            go_right = values > self.threshold.take(nodes)
+            nodes = self.children.take(2 * nodes + go_right)
+        return nodes
+
+    def max_abs_error(self, model, scaler, n_probes=256, seed=0):
+        """Largest difference to sklearn on random probe rows around the scaler mean"""
+        rng = np.random.RandomState(seed)
+        X_scaled = rng.normal(0, 1.5, (n_probes, self.n_features))
+        X = scaler.mean_ + X_scaled * scaler.scale_
+        expected = model.predict((X - scaler.mean_) / scaler.scale_)
+        return float(np.max(np.abs(self.predict(X) - expected)))
+
+
+def fold_scaler_thresholds(threshold, mean, scale, iterations=80):
+    """
+    Map split thresholds from the scaled space back to raw feature values
+
+    sklearn compares float32((x - mean) / scale) <= threshold, so the plain
+    inverse threshold * scale + mean can land on the wrong side of a float32
+    rounding step. Bisect for the largest raw x that still goes left instead.
+    """
+    def goes_left(x):
+        return ((x - mean) / scale).astype(np.float32).astype(np.float64) <= threshold
+
+    approx = threshold * scale + mean
+    margin = scale * (np.abs(threshold) + 1.0) * 1e-5 + np.abs(mean) * 1e-12
+    low = approx - margin
+    high = approx + margin
+    if not goes_left(low).all() or goes_left(high).any():
+        raise ValueError("Could not bracket scaled split thresholds")
+
+    for _ in range(iterations):
+        mid = low + (high - low) / 2
+        left = goes_left(mid)
+        low = np.where(left, mid, low)
+        high = np.where(left, high, mid)
+    return low
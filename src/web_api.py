@@ -1,12 +1,42 @@
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, Response, g, request, jsonify, render_template_string, stream_with_context
+import hmac
+import json
 import os
 import sys
+import time
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.predictor import GradePredictor
+from src.feature_store import FeatureStore, DEFAULT_DATA_DIR
+from src.metrics import METRICS, SamplingProfiler
+from src.micro_batcher import MicroBatcher, DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_MS
+from src.model_registry import ModelRegistry, WARMUP_RECORD
+from src.prediction_matrix import PredictionMatrix
+from src.tenant_pool import TenantModelPool, UnknownTenantError, DEFAULT_TENANTS_DIR, DEFAULT_MAX_MODELS
 
 app = Flask(__name__)
-predictor = None
+registry = None
+feature_store = None
+# Per-tenant predictors, enabled when a tenants directory exists
+tenant_pool = None
+# Optional MicroBatcher that groups concurrent /predict calls
+batcher = None
+# Materialized student x course grades of the active model (needs the feature store)
+prediction_matrix = None
+MICRO_BATCH_TIMEOUT = 10
+# Set once the model is loaded and warm-up predictions have run
+ready = False
+# Processes serving this app (set by the pre-fork server); in-memory writes would reach only one of them
+worker_processes = 1
+
+# Shared secret for the /admin endpoints (sent as X-Admin-Token); without it they are disabled
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+# /debug/profile is only served when explicitly enabled
+PROFILING_ENABLED = os.environ.get('GRADE_PROFILING') == '1'
+MAX_PROFILE_SECONDS = 60
+
+# Number of records scored per vectorized model call in /predict/batch
+BATCH_CHUNK_SIZE = 512
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/jsonlines', 'application/json-seq')
 
 # HTML template for web interface
 HTML_TEMPLATE = """
@@ -172,60 +202,654 @@ HTML_TEMPLATE = """
 </html>
 """
 
+@app.before_request
+def _start_request_timer():
+    if METRICS.enabled:
+        g.request_start = time.perf_counter()
+
+@app.after_request
+def _record_request_metrics(response):
+    if METRICS.enabled and 'request_start' in g:
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        METRICS.observe('grade_http_request_duration_seconds',
+                        time.perf_counter() - g.request_start, {'endpoint': endpoint})
+        METRICS.inc('grade_http_requests_total', endpoint=endpoint, status=str(response.status_code))
+        if response.status_code >= 400:
+            METRICS.inc('grade_http_errors_total', endpoint=endpoint)
+    return response
+
 @app.route('/')
 def home():
     return render_template_string(HTML_TEMPLATE)
 
 @app.route('/predict', methods=['POST'])
 def predict_grade_api():
-    """API endpoint for grade prediction"""
+    """
+    API endpoint for grade prediction
+    
+    Send full 'student' / 'course' / 'interests' objects, or 'student_id' /
+    'course_id' to use the feature store (explicit fields override stored ones).
+    An optional 'tenant' (or X-Tenant header) selects that tenant's model.
+    With 'explain': true (or ?explain=true) the response also carries each
+    feature's contribution to the grade.
+    """
     try:
-        data = request.json
+        with METRICS.span('parse_json'):
+            data = request.json
+        
+        student_data = dict(data.get('student') or {})
+        course_data = dict(data.get('course') or {})
+        if 'student_id' in data:
+            student_data['student_id'] = data['student_id']
+        if 'course_id' in data:
+            course_data['course_id'] = data['course_id']
+        interests_data = data.get('interests')
         
-        student_data = data['student']
-        course_data = data['course']
-        interests_data = data['interests']
-        
-        predicted_grade = predictor.predict_grade(student_data, course_data, interests_data)
-        
-        # Performance interpretation
-        if predicted_grade >= 9.0:
-            message = "Excellent performance expected! 🎉"
-        elif predicted_grade >= 8.0:
-            message = "Very good performance expected! ✅"
-        elif predicted_grade >= 7.0:
-            message = "Good performance expected 📈"
-        elif predicted_grade >= 6.0:
-            message = "Average performance - consistent effort needed ⚠️"
+        active_predictor = current_predictor(_request_tenant(data))
+        if _explain_requested(data):
+            explanation = active_predictor.explain(student_data, course_data, interests_data)
+            predicted_grade = explanation.pop('predicted_grade')
+            return jsonify({
+                'success': True,
+                'predicted_grade': predicted_grade,
+                'message': performance_message(predicted_grade),
+                'explanation': explanation
+            })
+        if batcher is not None:
+            row = active_predictor.validate_record({
+                'student': student_data,
+                'course': course_data,
+                'interests': interests_data
+            })
+            predicted_grade = batcher.predict(active_predictor, row, timeout=MICRO_BATCH_TIMEOUT)
         else:
-            message = "Needs improvement - consider additional support 🚨"
+            predicted_grade = active_predictor.predict_grade(student_data, course_data, interests_data)
         
         return jsonify({
             'success': True,
             'predicted_grade': predicted_grade,
-            'message': message
+            'message': performance_message(predicted_grade)
+        })
+    
+    except UnknownTenantError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch_api():
+    """
+    API endpoint for batch grade prediction
+    
+    Accepts a JSON array of records (or {"records": [...]}) or an NDJSON body,
+    one record per line, which may be sent with chunked transfer encoding.
+    Results are streamed back as NDJSON in input order, one line per record.
+    The tenant is taken from the X-Tenant header or ?tenant= query parameter.
+    ?explain=true adds per-feature contributions to every line.
+    """
+    try:
+        active_predictor = current_predictor(_request_tenant())
+    except UnknownTenantError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+    except RuntimeError as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+    
+    if request.mimetype in NDJSON_MIMETYPES:
+        records = _iter_ndjson(request.stream, json_seq=request.mimetype == 'application/json-seq')
+    else:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            data = data.get('records')
+        if not isinstance(data, list):
+            return jsonify({
+                'success': False,
+                'error': 'Expected a JSON array of records or an NDJSON body'
+            }), 400
+        records = ((record, None) for record in data)
+    
+    return Response(
+        stream_with_context(_stream_batch_predictions(active_predictor, records, _explain_requested())),
+        mimetype='application/x-ndjson'
+    )
+
+@app.route('/recommend', methods=['POST'])
+def recommend_api():
+    """API endpoint ranking the course catalog for one student"""
+    try:
+        data = request.json
+        filters = data.get('filters', {})
+        
+        recommendations = current_predictor(_request_tenant(data)).recommend_courses(
+            data['student'],
+            data['interests'],
+            k=int(data.get('k', 5)),
+            domains=_as_list(filters.get('domains')),
+            credits=_as_list(filters.get('credits')),
+            min_difficulty=filters.get('min_difficulty'),
+            max_difficulty=filters.get('max_difficulty')
+        )
+        for course in recommendations:
+            course['message'] = performance_message(course['predicted_grade'])
+        
+        return jsonify({
+            'success': True,
+            'recommendations': recommendations
         })
     
+    except UnknownTenantError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 400
 
+@app.route('/whatif', methods=['POST'])
+def what_if_api():
+    """
+    Predicted grades while one or two inputs sweep a range
+    
+    Body: the /predict fields plus 'vary', a list of one or two axes like
+    {"feature": "attendance", "min": 60, "max": 90, "steps": 31}
+    (or {"feature": ..., "values": [...]}). 'grades' is a list for one
+    axis and a list of rows (first axis) for two.
+    """
+    try:
+        data = request.json
+        student_data = dict(data.get('student') or {})
+        course_data = dict(data.get('course') or {})
+        if 'student_id' in data:
+            student_data['student_id'] = data['student_id']
+        if 'course_id' in data:
+            course_data['course_id'] = data['course_id']
+        
+        vary = data.get('vary')
+        if isinstance(vary, dict):
+            vary = [vary]
+        if not isinstance(vary, list):
+            raise ValueError("'vary' must be a list of one or two axes")
+        
+        result = current_predictor(_request_tenant(data)).what_if(
+            student_data, course_data, data.get('interests'), vary
+        )
+        return jsonify({
+            'success': True,
+            'axes': result['axes'],
+            'grades': result['grades'].tolist()
+        })
+    
+    except UnknownTenantError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+def _as_list(value):
+    """Allow single filter values as well as lists"""
+    if value is None or isinstance(value, list):
+        return value
+    return [value]
+
+@app.route('/grades', methods=['POST'])
+def add_grades_api():
+    """
+    Record new grades in the feature store
+    
+    Body: a list (or {"records": [...]}) of {"student_id", "course_id", "grade"}
+    """
+    if feature_store is None:
+        return jsonify({'success': False, 'error': 'No feature store loaded'}), 503
+    rejected = _check_single_process()
+    if rejected:
+        return rejected
+    
+    try:
+        data = request.json
+        if isinstance(data, dict):
+            data = data['records']
+        student_ids = [record['student_id'] for record in data]
+        course_ids = [record['course_id'] for record in data]
+        added = feature_store.add_grades(student_ids, course_ids, [record['grade'] for record in data])
+        # Grade aggregates feed every prediction of those students and courses
+        _refresh_matrix(student_ids, course_ids)
+        return jsonify({'success': True, 'added': added})
+    
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/students/<student_id>', methods=['PUT'])
+def upsert_student_api(student_id):
+    """
+    Add a student or replace their profile
+    
+    Body: {"branch_code", "cgpa", "attendance", "previous_avg", "interests": [...]}
+    """
+    if feature_store is None:
+        return jsonify({'success': False, 'error': 'No feature store loaded'}), 503
+    rejected = _check_single_process()
+    if rejected:
+        return rejected
+    
+    try:
+        data = request.json
+        feature_store.upsert_student(
+            student_id, data['branch_code'], data['cgpa'], data['attendance'], data['previous_avg'],
+            data.get('interests', [])
+        )
+        _refresh_matrix(student_ids=[student_id])
+        return jsonify({'success': True, 'student_id': student_id})
+    
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/courses/<course_id>', methods=['PUT'])
+def upsert_course_api(course_id):
+    """
+    Add a course or replace its attributes
+    
+    Body: {"domain_tags", "difficulty_level", "credits", "theory_weight"}
+    """
+    if feature_store is None:
+        return jsonify({'success': False, 'error': 'No feature store loaded'}), 503
+    rejected = _check_single_process()
+    if rejected:
+        return rejected
+    
+    try:
+        data = request.json
+        feature_store.upsert_course(
+            course_id, data['domain_tags'], data['difficulty_level'], data['credits'], data['theory_weight']
+        )
+        _refresh_matrix(course_ids=[course_id])
+        return jsonify({'success': True, 'course_id': course_id})
+    
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+def _check_single_process():
+    """Error response for feature store writes when the store lives in several worker processes"""
+    if worker_processes > 1:
+        return jsonify({'success': False, 'error': f'Feature store updates would only reach one of '
+                                                  f'{worker_processes} worker processes; apply them with '
+                                                  f'the single-process server'}), 409
+    return None
+
+def _refresh_matrix(student_ids=(), course_ids=()):
+    """Recompute the matrix rows / columns of changed students and courses"""
+    if prediction_matrix is None:
+        return
+    active_predictor = current_predictor()
+    # After a model swap the whole matrix is rebuilt anyway
+    if prediction_matrix.ensure_current(active_predictor):
+        return
+    prediction_matrix.refresh_students(active_predictor, student_ids)
+    prediction_matrix.refresh_courses(active_predictor, course_ids)
+
+def _id_list(name):
+    """Comma-separated IDs of a query parameter, None when absent"""
+    value = request.args.get(name)
+    return [item for item in value.split(',') if item] if value else None
+
+@app.route('/matrix', methods=['GET'])
+def prediction_matrix_api():
+    """
+    Slice the materialized prediction matrix of the active model
+    
+    Query: students=S1,S2 and/or courses=C1,C2 select rows / columns (default
+    all). With top=N the response ranks instead: the N best courses of each
+    selected student, or with top_of=students the N best students of each
+    selected course.
+    """
+    if prediction_matrix is None:
+        return jsonify({'success': False, 'error': 'No prediction matrix (needs the feature store)'}), 503
+    
+    try:
+        prediction_matrix.ensure_current(current_predictor())
+        student_ids, course_ids = _id_list('students'), _id_list('courses')
+        top = request.args.get('top')
+        if top is None:
+            block = prediction_matrix.slice(student_ids, course_ids)
+            return jsonify({
+                'success': True,
+                'student_ids': block['student_ids'],
+                'course_ids': block['course_ids'],
+                'grades': block['grades'].tolist()
+            })
+        
+        top = int(top)
+        if top < 1:
+            raise ValueError("top must be at least 1")
+        top_of = request.args.get('top_of', 'courses')
+        if top_of == 'courses':
+            ranked = prediction_matrix.top_courses(student_ids, top, course_ids)
+            key = 'course_id'
+        elif top_of == 'students':
+            ranked = prediction_matrix.top_students(course_ids, top, student_ids)
+            key = 'student_id'
+        else:
+            raise ValueError("top_of must be 'courses' or 'students'")
+        return jsonify({
+            'success': True,
+            'top': {
+                owner: [{key: item_id, 'predicted_grade': grade} for item_id, grade in items]
+                for owner, items in ranked.items()
+            }
+        })
+    
+    except KeyError as e:
+        return jsonify({'success': False, 'error': e.args[0]}), 404
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+def current_predictor(tenant=None):
+    """
+    The live predictor (of a tenant, when one is given)
+    
+    Handlers call this once per request and keep the reference, so a model
+    swap or tenant eviction never changes the predictor halfway through a request.
+    """
+    if tenant is not None:
+        if tenant_pool is None:
+            raise UnknownTenantError("Multi-tenant serving is not enabled")
+        return tenant_pool.get(tenant)
+    active_predictor = registry.active if registry is not None else None
+    if active_predictor is None:
+        raise RuntimeError("Model not loaded")
+    return active_predictor
+
+def _request_tenant(data=None):
+    """Tenant key from the JSON body, the X-Tenant header or the query string"""
+    if isinstance(data, dict) and data.get('tenant'):
+        return data['tenant']
+    return request.headers.get('X-Tenant') or request.args.get('tenant')
+
+def _explain_requested(data=None):
+    """explain flag from the JSON body or the query string"""
+    if isinstance(data, dict) and 'explain' in data:
+        return bool(data['explain'])
+    return request.args.get('explain', '').lower() in ('1', 'true', 'yes')
+
+def performance_message(predicted_grade):
+    """Human readable interpretation of a predicted grade"""
+    if predicted_grade >= 9.0:
+        return "Excellent performance expected! 🎉"
+    elif predicted_grade >= 8.0:
+        return "Very good performance expected! ✅"
+    elif predicted_grade >= 7.0:
+        return "Good performance expected 📈"
+    elif predicted_grade >= 6.0:
+        return "Average performance - consistent effort needed ⚠️"
+    else:
+        return "Needs improvement - consider additional support 🚨"
+
+def _iter_ndjson(stream, json_seq=False):
+    """Yield (record, parse_error) pairs from an NDJSON stream without buffering the body
+
+    With json_seq (RFC 7464) each record starts with an ASCII record separator,
+    which is dropped before parsing.
+    """
+    for line in stream:
+        line = line.strip()
+        if json_seq:
+            line = line.lstrip(b'\x1e').strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line), None
+        except ValueError as e:
+            yield None, f"Invalid JSON: {e}"
+
+def _stream_batch_predictions(active_predictor, records, explain=False):
+    """Score records chunk by chunk and yield one NDJSON line per record"""
+    chunk = []
+    for index, (record, parse_error) in enumerate(records):
+        chunk.append((index, record, parse_error))
+        if len(chunk) >= BATCH_CHUNK_SIZE:
+            yield from _score_chunk(active_predictor, chunk, explain)
+            chunk = []
+    if chunk:
+        yield from _score_chunk(active_predictor, chunk, explain)
+
+def _score_chunk(active_predictor, chunk, explain=False):
+    """Validate a chunk, predict the valid rows in one call and emit lines in input order"""
+    results = {}
+    valid_indices = []
+    valid_rows = []
+    for index, record, parse_error in chunk:
+        if parse_error is not None:
+            results[index] = {'index': index, 'success': False, 'error': parse_error}
+            continue
+        try:
+            valid_rows.append(active_predictor.validate_record(record))
+            valid_indices.append(index)
+        except ValueError as e:
+            results[index] = {'index': index, 'success': False, 'error': str(e)}
+    
+    if valid_rows:
+        try:
+            grades = active_predictor.predict_batch(valid_rows)
+            for index, grade in zip(valid_indices, grades):
+                grade = float(grade)
+                results[index] = {
+                    'index': index,
+                    'success': True,
+                    'predicted_grade': grade,
+                    'message': performance_message(grade)
+                }
+            if explain:
+                explanation = active_predictor.explain_batch(valid_rows)
+                features = active_predictor.selected_features
+                for index, contributions, raw in zip(valid_indices, explanation['contributions'],
+                                                     explanation['raw_predictions']):
+                    results[index]['explanation'] = {
+                        'base_value': explanation['base_value'],
+                        'contributions': dict(zip(features, contributions.tolist())),
+                        'raw_prediction': float(raw)
+                    }
+        except Exception as e:
+            for index in valid_indices:
+                results[index] = {'index': index, 'success': False, 'error': str(e)}
+    
+    for index, _, _ in chunk:
+        yield json.dumps(results[index]) + "\n"
+
 @app.route('/health', methods=['GET'])
 def health_check():
+    predictor = registry.active if registry is not None else None
     return jsonify({
         'status': 'healthy',
         'model_loaded': predictor is not None,
-        'model_type': predictor.metadata['model_type'] if predictor else 'None'
+        'model_type': predictor.metadata['model_type'] if predictor else 'None',
+        'model_version': predictor.model_version if predictor else None,
+        'cache': predictor.get_cache_stats() if predictor else None,
+        'tenants': tenant_pool.stats() if tenant_pool is not None else None
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text-format metrics (stage latencies, request/error counters, cache counters)"""
+    extra = {}
+    predictor = registry.active if registry is not None else None
+    if predictor is not None and predictor.cache is not None:
+        cache_stats = predictor.cache.stats()
+        for key in ['hits', 'misses', 'evictions', 'expirations']:
+            extra[f'grade_cache_{key}_total'] = cache_stats[key]
+    body = METRICS.render_prometheus(extra)
+    if not METRICS.enabled:
+        body = "# Stage timings disabled (set GRADE_METRICS=1 or run_api.py --metrics)\n" + body
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+@app.route('/debug/profile', methods=['POST'])
+def sampling_profile():
+    """
+    Sample all request threads for ?seconds=N and return folded stacks
+    
+    Only available when GRADE_PROFILING=1 (or run_api.py --profiling).
+    """
+    if not PROFILING_ENABLED:
+        return jsonify({'success': False, 'error': 'Profiling is disabled'}), 404
+    denied = _check_admin_token()
+    if denied:
+        return denied
+    
+    seconds = min(float(request.args.get('seconds', 5)), MAX_PROFILE_SECONDS)
+    profiler = SamplingProfiler(interval=float(request.args.get('interval', 0.005)))
+    profiler.start()
+    time.sleep(seconds)
+    profiler.stop()
+    return Response(profiler.collapsed(top=int(request.args.get('top', 200))), mimetype='text/plain')
+
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 200 only after the model is loaded and warmed up"""
+    if not ready:
+        return jsonify({'ready': False}), 503
+    return jsonify({'ready': True, 'model_version': registry.active_version})
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    """Prediction cache statistics"""
+    predictor = registry.active if registry is not None else None
+    if predictor is None:
+        return jsonify({'success': False, 'error': 'Model not loaded'}), 503
+    return jsonify({
+        'success': True,
+        'cache': predictor.get_cache_stats(),
+        'micro_batching': batcher.stats() if batcher is not None else {'enabled': False},
+        'prediction_matrix': prediction_matrix.stats() if prediction_matrix is not None else None
     })
 
-def start_api(host='0.0.0.0', port=5000):
-    """Start the Flask API server"""
-    global predictor
+@app.route('/drift', methods=['GET'])
+def drift():
+    """
+    Input / prediction drift of the live model against its training profile
+    
+    Returns the last scheduled check (?refresh=true runs one now). Scores
+    cover the predictions this server process has made.
+    """
+    try:
+        predictor = current_predictor(_request_tenant())
+    except UnknownTenantError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+    except RuntimeError as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+    monitor = predictor.drift_monitor
+    if monitor is None:
+        return jsonify({'success': False, 'error': 'No drift reference for this model '
+                                                   '(train it or run `run_cli.py reference`)'}), 404
+    refresh = request.args.get('refresh', '').lower() in ('1', 'true', 'yes')
+    report = monitor.check() if refresh else monitor.report()
+    return jsonify(dict(report, success=True, model_version=predictor.model_version))
+
+@app.route('/admin/models', methods=['GET'])
+def model_versions():
+    """Active, previous and available model versions"""
+    denied = _check_admin_token()
+    if denied:
+        return denied
+    return jsonify(dict(registry.status(), success=True))
+
+@app.route('/admin/models/load', methods=['POST'])
+def load_model_version():
+    """
+    Load a model version in the background and swap it in when ready
+    
+    Body: {"version": "<name>"} (defaults to the newest version),
+    add "wait": true to block until the swap has happened.
+    """
+    denied = _check_admin_token()
+    if denied:
+        return denied
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        version = data.get('version') or registry.latest_version()
+        if data.get('wait'):
+            registry.activate(version)
+            return jsonify(dict(registry.status(), success=True))
+        
+        if not registry.activate_async(version):
+            return jsonify({'success': False, 'error': 'Another model version is already loading'}), 409
+        return jsonify(dict(registry.status(), success=True, loading_version=version)), 202
+    
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/admin/models/rollback', methods=['POST'])
+def rollback_model_version():
+    """Swap the previously active model version back in"""
+    denied = _check_admin_token()
+    if denied:
+        return denied
+    
+    try:
+        registry.rollback()
+        return jsonify(dict(registry.status(), success=True))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+def _check_admin_token():
+    """Error response unless ADMIN_TOKEN is set and the request carries it"""
+    if not ADMIN_TOKEN:
+        return jsonify({'success': False, 'error': 'Admin endpoints are disabled (set ADMIN_TOKEN)'}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+        return jsonify({'success': False, 'error': 'Forbidden'}), 403
+    return None
+
+def init_app(model_version=None, micro_batching=False, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+             max_wait_ms=DEFAULT_MAX_WAIT_MS, tenants_dir=None, max_tenant_models=DEFAULT_MAX_MODELS,
+             max_tenant_memory_mb=None, use_lookup=False):
+    """
+    Load the feature store and model, warm up the request path and mark the app ready
+    
+    Tenant models under tenants_dir (default: ./tenants if it exists) are
+    loaded lazily on their first request. use_lookup serves on-grid inputs
+    from each model's prediction lookup tensor when one has been built.
+    With a feature store, the student x course prediction matrix of the
+    active model is materialized under ./views and served from /matrix.
+    """
+    global registry, feature_store, batcher, tenant_pool, prediction_matrix, ready
+    ready = False
+    batcher = MicroBatcher(max_batch_size, max_wait_ms) if micro_batching else None
+    tenants_dir = tenants_dir or DEFAULT_TENANTS_DIR
+    if os.path.isdir(tenants_dir):
+        max_bytes = int(max_tenant_memory_mb * 1024 * 1024) if max_tenant_memory_mb else None
+        tenant_pool = TenantModelPool(tenants_dir, max_tenant_models, max_bytes, use_lookup=use_lookup)
+        print(f"🏫 Multi-tenant serving from {tenants_dir} ({len(tenant_pool.list_tenants())} tenants)")
+    else:
+        tenant_pool = None
+    if os.path.isdir(DEFAULT_DATA_DIR):
+        feature_store = FeatureStore.from_csv(DEFAULT_DATA_DIR)
+    registry = ModelRegistry(feature_store=feature_store, use_lookup=use_lookup)
+    registry.activate(model_version)
+    prediction_matrix = None
+    if feature_store is not None:
+        try:
+            prediction_matrix = PredictionMatrix.for_predictor(registry.active)
+        except FileNotFoundError as e:
+            print(f"⚠️  Prediction matrix disabled: {e}")
+    
+    # Run real requests through Flask so routing, JSON and the model are all warm
+    client = app.test_client()
+    for _ in range(3):
+        response = client.post('/predict', json=WARMUP_RECORD)
+        if response.status_code != 200:
+            raise RuntimeError(f"Warm-up prediction failed: {response.get_json()}")
+    # Warm-up requests are not traffic
+    registry.active.reset_cache_stats()
+    if batcher is not None:
+        batcher.reset_stats()
+    if registry.active.drift_monitor is not None:
+        registry.active.drift_monitor.reset()
+    ready = True
+    print(f"✅ Model loaded successfully!")
+
+def start_api(host='0.0.0.0', port=5000, model_version=None, **app_options):
+    """Start the Flask API server (app_options are passed to init_app)"""
     try:
-        predictor = GradePredictor()
-        print(f"✅ Model loaded successfully!")
+        init_app(model_version, **app_options)
         print(f"🌐 Starting web server at http://{host}:{port}")
         app.run(host=host, port=port, debug=False)
     except Exception as e: